@@ -0,0 +1,616 @@
+import mmap
+import struct
+from bisect import bisect_left
+from collections import defaultdict
+
+# File layout (all integers little-endian):
+#   header       magic, version and corpus statistics plus section offsets
+#   strings      UTF-8 pool holding terms, document ids and humor types
+#   humor types  (string offset, length) per distinct humor_type
+#   documents    fixed-width rows: id offset/length, humor type, emoji, score,
+#                document length, tf-idf norm and static prior
+#   terms        fixed-width rows sorted by term: term offset/length, doc freq,
+#                postings offset/length, max weight
+#   postings     per term: a partition directory (varint partition count,
+#                then humor type, posting count and byte length per
+#                partition) followed by one partition per humor type, and
+#                last the impact segment: fixed-width (doc ordinal, uint16
+#                weight) entries of all the term's postings by descending
+#                decoded weight x prior. A partition is a skip table, one (last doc ordinal, block
+#                offset) pair per block of POSTING_BLOCK_SIZE postings, then
+#                the blocks, each holding varint doc-ordinal gaps, varint term
+#                frequencies, then uint16 weights
+MAGIC = b"HDNIDX01"
+VERSION = 6
+HEADER = struct.Struct("<8sIIIQQQddQQQQQ")
+HUMOR_TYPE_ENTRY = struct.Struct("<QI")
+DOC_ENTRY = struct.Struct("<QIHBdIdd")
+# The humor type field of a DOC_ENTRY, read alone by posting lookups
+DOC_HUMOR_TYPE = struct.Struct("<H")
+DOC_HUMOR_TYPE_OFFSET = struct.calcsize("<QI")
+# Header flag set when postings carry real term frequencies
+HAS_TERM_FREQS = 1
+TERM_ENTRY = struct.Struct("<QIIQIf")
+WEIGHT_LEVELS = 65535
+# Postings decoded to find a single one. Blocks are decoded posting by posting,
+# so larger ones only make lookups dearer
+POSTING_BLOCK_SIZE = 16
+SKIP_ENTRY = struct.Struct("<II")
+IMPACT_ENTRY = struct.Struct("<IH")
+# Impact segment entries decoded by the first read of a term, doubled by each
+# read past the decoded ones
+IMPACT_CHUNK = 64
+
+
+def encode_varint(value, out):
+    """Append value to the bytearray out as a LEB128 varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varints(data, count, pos=0):
+    """Decode count varints from data starting at pos.
+
+    Returns:
+        tuple: The decoded values and the position after the last one.
+    """
+    values = []
+    for _ in range(count):
+        value = 0
+        shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        values.append(value)
+    return values, pos
+
+
+def doc_sort_key(doc_id):
+    """Order numeric ids numerically and any other ids after them as text."""
+    doc_id = str(doc_id)
+    return (0, int(doc_id), "") if doc_id.isdigit() else (1, 0, doc_id)
+
+
+def is_binary_index(path):
+    """Return True if the file at path starts with the binary index magic."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class BinaryIndexWriter:
+    """Serializes a content index into the compact binary format."""
+
+    @staticmethod
+    def write(content_index, output_path, term_freq=None, doc_stats=None, doc_priors=None):
+        """Write a content index to output_path, see to_bytes."""
+        with open(output_path, "wb") as f:
+            f.write(BinaryIndexWriter.to_bytes(content_index, term_freq, doc_stats, doc_priors))
+        return output_path
+
+    @staticmethod
+    def to_bytes(content_index, term_freq=None, doc_stats=None, doc_priors=None):
+        """Serialize a content index ({term: [posting, ...]}) into the binary format.
+
+        Document metadata is stored once in the document table, postings hold
+        only delta-encoded document ordinals, term frequencies and weights
+        quantized to 16 bits relative to the largest weight in the index.
+        Each term's postings are partitioned by humor type so a filtered read
+        decodes only the partitions it asks for. The partitions are split into
+        blocks behind a skip table, so a single posting is found by decoding
+        one block, see PostingLookup. The postings are repeated in impact
+        order, so search_by_impact reads a prefix of them and sorts nothing.
+
+        Args:
+            content_index (dict): The index produced by Indexer.build_index.
+            term_freq (dict, optional): term -> doc_id -> tf. Without it term
+                frequencies and document lengths are stored as zero.
+            doc_stats (dict, optional): doc_id -> {'length', 'norm'}. Norms
+                are computed from the weights when it is missing.
+            doc_priors (dict, optional): doc_id -> static prior, see
+                Indexer.static_prior. Documents without one get 1.0.
+
+        Returns:
+            bytes: The index, to write to a file or copy into shared memory.
+        """
+        documents = {}
+        max_weight = 0.0
+        total_postings = 0
+        for postings in content_index.values():
+            for posting in postings:
+                documents.setdefault(str(posting["id"]), posting)
+                max_weight = max(max_weight, float(posting["weight"]))
+                total_postings += 1
+
+        doc_ids = sorted(documents, key=doc_sort_key)
+        priors = [float((doc_priors or {}).get(doc_id, 1.0)) for doc_id in doc_ids]
+        if doc_stats is None:
+            doc_stats = {}
+            for term, postings in content_index.items():
+                for posting in postings:
+                    stats = doc_stats.setdefault(str(posting["id"]), {"length": 0, "norm": 0.0})
+                    stats["length"] += term_freq.get(term, {}).get(posting["id"], 0) if term_freq else 0
+                    stats["norm"] += float(posting["weight"]) ** 2
+            for stats in doc_stats.values():
+                stats["norm"] = stats["norm"] ** 0.5
+        total_length = 0
+        doc_ordinals = {doc_id: ordinal for ordinal, doc_id in enumerate(doc_ids)}
+        humor_types = sorted({str(documents[doc_id]["humor_type"]) for doc_id in doc_ids})
+        humor_type_ordinals = {humor_type: ordinal for ordinal, humor_type in enumerate(humor_types)}
+
+        strings = bytearray()
+
+        def add_string(value):
+            encoded = value.encode("utf-8")
+            offset = len(strings)
+            strings.extend(encoded)
+            return offset, len(encoded)
+
+        humor_type_table = bytearray()
+        for humor_type in humor_types:
+            humor_type_table.extend(HUMOR_TYPE_ENTRY.pack(*add_string(humor_type)))
+
+        doc_table = bytearray()
+        for doc_id, prior in zip(doc_ids, priors):
+            document = documents[doc_id]
+            stats = doc_stats.get(doc_id, {"length": 0, "norm": 0.0})
+            total_length += stats["length"]
+            id_offset, id_length = add_string(doc_id)
+            doc_table.extend(DOC_ENTRY.pack(
+                id_offset,
+                id_length,
+                humor_type_ordinals[str(document["humor_type"])],
+                1 if document["emoji_presence"] else 0,
+                float(document["humor_type_score"]),
+                stats["length"],
+                float(stats["norm"]),
+                prior,
+            ))
+
+        term_table = bytearray()
+        postings_data = bytearray()
+        scale = WEIGHT_LEVELS / max_weight if max_weight > 0 else 0.0
+        weight_step = max_weight / WEIGHT_LEVELS
+        for term in sorted(content_index):
+            term_freqs = term_freq.get(term, {}) if term_freq else {}
+            postings = sorted(
+                (
+                    (doc_ordinals[str(posting["id"])], term_freqs.get(posting["id"], 0), float(posting["weight"]))
+                    for posting in content_index[term]
+                ),
+                key=lambda entry: entry[0],
+            )
+            partitions = defaultdict(list)
+            for entry in postings:
+                partitions[humor_type_ordinals[str(documents[doc_ids[entry[0]]]["humor_type"])]].append(entry)
+
+            postings_offset = len(postings_data)
+            directory = bytearray()
+            body = bytearray()
+            encode_varint(len(partitions), directory)
+            for humor_type in sorted(partitions):
+                partition = partitions[humor_type]
+                skip_table = bytearray()
+                blocks = bytearray()
+                previous = 0
+                for block_start in range(0, len(partition), POSTING_BLOCK_SIZE):
+                    block = partition[block_start:block_start + POSTING_BLOCK_SIZE]
+                    skip_table.extend(SKIP_ENTRY.pack(block[-1][0], len(blocks)))
+                    for ordinal, _, _ in block:
+                        encode_varint(ordinal - previous, blocks)
+                        previous = ordinal
+                    for _, tf, _ in block:
+                        encode_varint(tf, blocks)
+                    for _, _, weight in block:
+                        blocks.extend(struct.pack("<H", min(WEIGHT_LEVELS, round(weight * scale))))
+                body.extend(skip_table)
+                body.extend(blocks)
+                encode_varint(humor_type, directory)
+                encode_varint(len(partition), directory)
+                encode_varint(len(skip_table) + len(blocks), directory)
+            # Rank by the weight the reader decodes, so engines over the file
+            # compute the same impacts in the same order
+            levels = [min(WEIGHT_LEVELS, round(weight * scale)) for _, _, weight in postings]
+            impacts = [
+                round(level * weight_step, 4) * priors[ordinal] for (ordinal, _, _), level in zip(postings, levels)
+            ]
+            for position in sorted(range(len(postings)), key=lambda position: -impacts[position]):
+                body.extend(IMPACT_ENTRY.pack(postings[position][0], levels[position]))
+            postings_data.extend(directory)
+            postings_data.extend(body)
+
+            term_offset, term_length = add_string(term)
+            term_table.extend(TERM_ENTRY.pack(
+                term_offset,
+                term_length,
+                len(postings),
+                postings_offset,
+                len(postings_data) - postings_offset,
+                max((weight for _, _, weight in postings), default=0.0),
+            ))
+
+        strings_offset = HEADER.size
+        humor_types_offset = strings_offset + len(strings)
+        docs_offset = humor_types_offset + len(humor_type_table)
+        terms_offset = docs_offset + len(doc_table)
+        postings_offset = terms_offset + len(term_table)
+
+        return b"".join([
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(humor_types),
+                HAS_TERM_FREQS if term_freq else 0,
+                len(doc_ids),
+                len(content_index),
+                total_postings,
+                max_weight,
+                total_length / len(doc_ids) if doc_ids else 0.0,
+                strings_offset,
+                humor_types_offset,
+                docs_offset,
+                terms_offset,
+                postings_offset,
+            ),
+            strings,
+            humor_type_table,
+            doc_table,
+            term_table,
+            postings_data,
+        ])
+
+
+class BinaryIndexReader:
+    """Memory-mapped reader for the binary index format.
+
+    Opening the file only parses the header; term lookups binary-search the
+    mapped term table and only the postings of requested terms are decoded.
+    The index can also be read from a buffer already in memory, such as a
+    shared memory block, see SharedIndex. The number of postings decoded is
+    kept in postings_decoded.
+    """
+
+    def __init__(self, path=None, buffer=None):
+        """
+        Args:
+            path (str): The index file, mapped read-only.
+            buffer (optional): A bytes-like object holding the index, read in
+                place of a file. Its owner keeps it alive and releases it.
+        """
+        self.path = path
+        if buffer is None:
+            self._file = open(path, "rb")
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._file = None
+            self._buffer = buffer
+        (
+            magic,
+            self.version,
+            self.humor_type_count,
+            flags,
+            self.doc_count,
+            self.term_count,
+            self.total_postings,
+            self.max_weight,
+            self.avg_doc_length,
+            self._strings_offset,
+            self._humor_types_offset,
+            self._docs_offset,
+            self._terms_offset,
+            self._postings_offset,
+        ) = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path or 'Buffer'} is not a binary content index")
+        if self.version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported binary index version {self.version} in {path or 'buffer'}")
+        self.has_term_freqs = bool(flags & HAS_TERM_FREQS)
+        self._weight_step = self.max_weight / WEIGHT_LEVELS
+        self.postings_decoded = 0
+        self._humor_types = [
+            self._string(*HUMOR_TYPE_ENTRY.unpack_from(self._buffer, self._humor_types_offset + i * HUMOR_TYPE_ENTRY.size))
+            for i in range(self.humor_type_count)
+        ]
+
+    def close(self):
+        if self._file is not None:
+            self._buffer.close()
+            self._file.close()
+            self._file = None
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.term_count
+
+    def __contains__(self, term):
+        return self._find_term(term) is not None
+
+    def _string(self, offset, length):
+        start = self._strings_offset + offset
+        return str(self._buffer[start:start + length], "utf-8")
+
+    def _term_entry(self, position):
+        return TERM_ENTRY.unpack_from(self._buffer, self._terms_offset + position * TERM_ENTRY.size)
+
+    def term_at(self, position):
+        term_offset, term_length = self._term_entry(position)[:2]
+        return self._string(term_offset, term_length)
+
+    def _find_term(self, term):
+        # Binary search over the sorted, fixed-width term table
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.term_at(middle) < term:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.term_count and self.term_at(low) == term:
+            return self._term_entry(low)
+        return None
+
+    def terms(self):
+        """Iterate over all terms in sorted order."""
+        for position in range(self.term_count):
+            yield self.term_at(position)
+
+    def doc_freq(self, term):
+        entry = self._find_term(term)
+        return entry[2] if entry else 0
+
+    def max_term_weight(self, term):
+        entry = self._find_term(term)
+        return entry[5] if entry else 0.0
+
+    def _partitions(self, entry):
+        """Read a term's partition directory.
+
+        Returns:
+            tuple: A list of (humor_type, posting_count, start) per partition,
+                where start is the absolute position of the partition's
+                postings, and the position of the impact segment after them.
+        """
+        pos = self._postings_offset + entry[3]
+        (partition_count,), pos = decode_varints(self._buffer, 1, pos)
+        directory, pos = decode_varints(self._buffer, partition_count * 3, pos)
+        partitions = []
+        for i in range(0, len(directory), 3):
+            humor_type, count, length = directory[i:i + 3]
+            partitions.append((self._humor_types[humor_type], count, pos))
+            pos += length
+        return partitions, pos
+
+    def _skip_entry(self, start, block):
+        return SKIP_ENTRY.unpack_from(self._buffer, start + block * SKIP_ENTRY.size)
+
+    def _decode_block(self, count, start, block):
+        """Decode one block of the partition of count postings at start.
+
+        Returns:
+            tuple: The block's (ordinals, term_freqs, weights) lists.
+        """
+        block_count = -(-count // POSTING_BLOCK_SIZE)
+        size = min(POSTING_BLOCK_SIZE, count - block * POSTING_BLOCK_SIZE)
+        ordinal = self._skip_entry(start, block - 1)[0] if block else 0
+        offset = self._skip_entry(start, block)[1]
+        gaps, pos = decode_varints(self._buffer, size, start + block_count * SKIP_ENTRY.size + offset)
+        term_freqs, pos = decode_varints(self._buffer, size, pos)
+        levels = struct.unpack_from(f"<{size}H", self._buffer, pos)
+        ordinals = []
+        for gap in gaps:
+            ordinal += gap
+            ordinals.append(ordinal)
+        weights = [round(level * self._weight_step, 4) for level in levels]
+        self.postings_decoded += size
+        return ordinals, term_freqs, weights
+
+    def _find_block(self, count, start, ordinal):
+        """Return the first block of a partition whose last ordinal is >= ordinal, or None."""
+        low, high = 0, -(-count // POSTING_BLOCK_SIZE)
+        while low < high:
+            middle = (low + high) // 2
+            if self._skip_entry(start, middle)[0] < ordinal:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low * POSTING_BLOCK_SIZE < count else None
+
+    def _decode_partition(self, count, start):
+        ordinals, term_freqs, weights = [], [], []
+        for block in range(-(-count // POSTING_BLOCK_SIZE)):
+            block_ordinals, block_term_freqs, block_weights = self._decode_block(count, start, block)
+            ordinals.extend(block_ordinals)
+            term_freqs.extend(block_term_freqs)
+            weights.extend(block_weights)
+        return ordinals, term_freqs, weights
+
+    def partition_counts(self, term):
+        """Return humor_type -> number of postings of term, without decoding them."""
+        entry = self._find_term(term)
+        if entry is None:
+            return {}
+        return {humor_type: count for humor_type, count, _ in self._partitions(entry)[0]}
+
+    def term_postings(self, term, humor_types=None):
+        """Decode the postings of term as (ordinals, term_freqs, weights) lists.
+
+        Args:
+            term (str): The term to read.
+            humor_types (iterable, optional): Only decode the partitions of these
+                humor types. Postings are returned in ordinal order either way.
+        """
+        entry = self._find_term(term)
+        if entry is None:
+            return [], [], []
+        partitions, _ = self._partitions(entry)
+        if humor_types is not None:
+            humor_types = {str(humor_type) for humor_type in humor_types}
+            partitions = [partition for partition in partitions if partition[0] in humor_types]
+        decoded = [self._decode_partition(count, start) for _, count, start in partitions]
+        if not decoded:
+            return [], [], []
+        if len(decoded) == 1:
+            return decoded[0]
+        merged = sorted(
+            posting for ordinals, term_freqs, weights in decoded
+            for posting in zip(ordinals, term_freqs, weights)
+        )
+        return tuple(list(column) for column in zip(*merged))
+
+    def posting_lookup(self, term):
+        """Return a PostingLookup over the postings of term, or None if it is not indexed."""
+        entry = self._find_term(term)
+        if entry is None:
+            return None
+        return PostingLookup(self, self._partitions(entry)[0])
+
+    def impact_segment(self, term):
+        """Return the ImpactSegment of term, or None if it is not indexed.
+
+        The impact of a posting is its decoded weight times its document's
+        prior, ordered when the index was written.
+        """
+        entry = self._find_term(term)
+        if entry is None:
+            return None
+        _, pos = self._partitions(entry)
+        return ImpactSegment(self, entry[2], pos)
+
+    def postings(self, term):
+        """Decode the postings of term as a list of (doc_ordinal, weight)."""
+        ordinals, _, weights = self.term_postings(term)
+        return list(zip(ordinals, weights))
+
+    def document(self, ordinal):
+        """Return the metadata of the document with the given ordinal."""
+        id_offset, id_length, humor_type, emoji_presence, humor_type_score, _, _, _ = DOC_ENTRY.unpack_from(
+            self._buffer, self._docs_offset + ordinal * DOC_ENTRY.size
+        )
+        return {
+            "id": self._string(id_offset, id_length),
+            "humor_type": self._humor_types[humor_type],
+            "emoji_presence": bool(emoji_presence),
+            "humor_type_score": humor_type_score,
+        }
+
+    def doc_humor_type(self, ordinal):
+        """Return the humor type of a document without decoding the rest of its entry."""
+        position = self._docs_offset + ordinal * DOC_ENTRY.size + DOC_HUMOR_TYPE_OFFSET
+        return self._humor_types[DOC_HUMOR_TYPE.unpack_from(self._buffer, position)[0]]
+
+    def doc_stats(self):
+        """Return the (lengths, norms) of all documents in ordinal order."""
+        lengths = []
+        norms = []
+        for entry in DOC_ENTRY.iter_unpack(self._buffer[self._docs_offset:self._docs_offset + self.doc_count * DOC_ENTRY.size]):
+            lengths.append(entry[5])
+            norms.append(entry[6])
+        return lengths, norms
+
+    def doc_priors(self):
+        """Return the static prior of every document in ordinal order."""
+        return [
+            entry[7] for entry in
+            DOC_ENTRY.iter_unpack(self._buffer[self._docs_offset:self._docs_offset + self.doc_count * DOC_ENTRY.size])
+        ]
+
+    def content(self, term):
+        """Return the postings of term in the JSON content_index shape."""
+        content = []
+        for ordinal, weight in self.postings(term):
+            posting = self.document(ordinal)
+            posting["weight"] = weight
+            content.append(posting)
+        return content
+
+    def to_content_index(self):
+        """Decode the whole index into a {term: [posting, ...]} dict."""
+        return {term: self.content(term) for term in self.terms()}
+
+
+class ImpactSegment:
+    """The postings of one term as (doc_ordinal, weight) pairs by descending impact.
+
+    The entries are fixed width, so they are decoded in chunks as they are
+    indexed and a search that stops early never decodes the rest.
+    """
+
+    def __init__(self, reader, count, start):
+        """
+        Args:
+            reader (BinaryIndexReader): The index the term is read from.
+            count (int): The term's number of postings.
+            start (int): The absolute position of the segment.
+        """
+        self._reader = reader
+        self._count = count
+        self._start = start
+        self._entries = []
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        if position >= len(self._entries):
+            begin = len(self._entries)
+            end = min(self._count, max(position + 1, 2 * begin, IMPACT_CHUNK))
+            data = self._reader._buffer[self._start + begin * IMPACT_ENTRY.size:self._start + end * IMPACT_ENTRY.size]
+            weight_step = self._reader._weight_step
+            self._entries.extend(
+                (ordinal, round(level * weight_step, 4)) for ordinal, level in IMPACT_ENTRY.iter_unpack(data)
+            )
+            self._reader.postings_decoded += end - begin
+        return self._entries[position]
+
+
+class PostingLookup:
+    """Finds single postings of one term through its skip tables.
+
+    A document's postings can only be in the partition of its humor type, so
+    a lookup reads that from the document table, binary-searches the
+    partition's skip table for the block that can hold the ordinal and decodes
+    only that block. Decoded blocks are kept, so however the ordinals are
+    probed no block is decoded twice.
+    """
+
+    def __init__(self, reader, partitions):
+        """
+        Args:
+            reader (BinaryIndexReader): The index the term is read from.
+            partitions (list): The term's (humor_type, posting_count, start) partitions.
+        """
+        self._reader = reader
+        self._partitions = {humor_type: (count, start) for humor_type, count, start in partitions}
+        self._blocks = {}  # (humor_type, block) -> (ordinals, term_freqs, weights)
+
+    def find(self, ordinal):
+        """Return the (term_freq, weight) of the document with this ordinal, or None."""
+        humor_type = self._reader.doc_humor_type(ordinal)
+        if humor_type not in self._partitions:
+            return None
+        count, start = self._partitions[humor_type]
+        block = self._reader._find_block(count, start, ordinal)
+        if block is None:
+            return None
+        if (humor_type, block) not in self._blocks:
+            self._blocks[humor_type, block] = self._reader._decode_block(count, start, block)
+        ordinals, term_freqs, weights = self._blocks[humor_type, block]
+        position = bisect_left(ordinals, ordinal)
+        if position < len(ordinals) and ordinals[position] == ordinal:
+            return term_freqs[position], weights[position]
+        return None
@@ -0,0 +1,125 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+# Firestore limits a batched write to 500 operations and 10 MiB per request
+MAX_BATCH_WRITES = 500
+MAX_BATCH_BYTES = 9 * 1024 * 1024
+
+
+@dataclass
+class UploadStats:
+    collection: str
+    written: int = 0
+    failed: int = 0
+    batches: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    failed_ids: list = field(default_factory=list)
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.written / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.collection}: wrote {self.written} documents in {self.batches} batches "
+                f"({self.failed} failed, {self.retries} retries) in {self.seconds:.2f}s "
+                f"[{self.docs_per_second:.1f} docs/s]")
+
+
+class FirestoreUploader:
+    """Writes documents to Firestore in batched commits over one shared client.
+
+    Documents are grouped into batches that respect Firestore's per-batch
+    limits, a bounded thread pool commits several batches at a time, and a
+    failed commit is retried with exponential backoff before its documents are
+    counted as failed.
+    """
+
+    def __init__(self, db, batch_size: int = MAX_BATCH_WRITES, max_workers: int = 8,
+                 max_retries: int = 5, backoff_seconds: float = 0.5, max_batch_bytes: int = MAX_BATCH_BYTES):
+        self.db = db
+        self.batch_size = min(batch_size, MAX_BATCH_WRITES)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_batch_bytes = max_batch_bytes
+        self._lock = threading.Lock()
+
+    def upload(self, collection_path: str, documents):
+        """Write (doc_id, data) pairs into collection_path.
+
+        Returns:
+            UploadStats: Counts and throughput of the upload.
+        """
+        return self.write(((collection_path, doc_id, data) for doc_id, data in documents), collection_path)
+
+    def delete(self, collection_path: str, doc_ids):
+        """Delete the given document ids from collection_path in batches."""
+        return self.write(((collection_path, doc_id, None) for doc_id in doc_ids), collection_path)
+
+    def write(self, operations, label: str = 'documents'):
+        """Apply (collection_path, doc_id, data) operations across collections.
+
+        An operation whose data is None deletes the document. Failed ids are
+        reported as 'collection_path/doc_id'.
+        """
+        stats = UploadStats(collection=label)
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = set()
+            for batch in self._batches(operations):
+                # Keep at most two batches per worker queued so large uploads
+                # do not materialize every batch in memory
+                if len(in_flight) >= self.max_workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                in_flight.add(executor.submit(self._commit, batch, stats))
+            wait(in_flight)
+
+        stats.seconds = time.perf_counter() - start
+        print(f"Upload finished: {stats}")
+        return stats
+
+    def _batches(self, operations):
+        batch = []
+        batch_bytes = 0
+        for collection_path, doc_id, data in operations:
+            size = len(json.dumps(data, default=str)) if data is not None else 0
+            if batch and (len(batch) >= self.batch_size or batch_bytes + size > self.max_batch_bytes):
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append((collection_path, doc_id, data))
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def _commit(self, batch, stats):
+        for attempt in range(self.max_retries + 1):
+            try:
+                write_batch = self.db.batch()
+                for collection_path, doc_id, data in batch:
+                    document = self.db.collection(collection_path).document(doc_id)
+                    if data is None:
+                        write_batch.delete(document)
+                    else:
+                        write_batch.set(document, data)
+                write_batch.commit()
+                with self._lock:
+                    stats.written += len(batch)
+                    stats.batches += 1
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Batch of {len(batch)} documents failed after {attempt + 1} attempts: {e}")
+                    with self._lock:
+                        stats.failed += len(batch)
+                        stats.failed_ids.extend(f"{collection_path}/{doc_id}" for collection_path, doc_id, _ in batch)
+                    return False
+                with self._lock:
+                    stats.retries += 1
+                time.sleep(self.backoff_seconds * (2 ** attempt) * (1 + random.random()))
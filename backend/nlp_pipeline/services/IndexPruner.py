@@ -0,0 +1,145 @@
+import json
+import random
+from tabulate import tabulate
+from backend.nlp_pipeline.services.QueryEngine import QueryEngine
+
+
+class IndexPruner:
+    """Offline static pruning of a content index.
+
+    Low-impact postings of common terms rarely reach a top-k result but are
+    stored, uploaded and read like any other. The pruner drops postings below
+    a global or per-term impact threshold while always keeping the best
+    keep_top postings of every term, and reports how much smaller each pruning
+    level makes the index against how much of the unpruned top-k it preserves
+    on a sample of queries.
+    """
+
+    def __init__(self, content_index, doc_priors=None):
+        """
+        Args:
+            content_index (dict): The index produced by Indexer.build_index.
+            doc_priors (dict, optional): doc_id -> static prior. A posting's
+                impact is its weight times its document's prior, or just its
+                weight without priors.
+        """
+        self.content_index = content_index
+        self.doc_priors = doc_priors or {}
+
+    def impact(self, posting):
+        return posting['weight'] * self.doc_priors.get(posting['id'], 1.0)
+
+    def prune(self, min_impact: float = 0.0, term_fraction: float = 0.0, keep_top: int = 0):
+        """Return a pruned copy of the content index.
+
+        Args:
+            min_impact (float): Global threshold; postings below it are dropped.
+            term_fraction (float): Per-term threshold as a fraction of the
+                term's highest impact, so rare and common terms are pruned
+                relative to their own best postings.
+            keep_top (int): Postings of every term that are kept regardless of
+                the thresholds.
+
+        Returns:
+            dict: {term: [posting, ...]} with the surviving postings in their
+                original order. Terms that lose every posting are dropped.
+        """
+        pruned = {}
+        for term, content in self.content_index.items():
+            impacts = [self.impact(posting) for posting in content]
+            if not impacts:
+                continue
+            threshold = max(min_impact, term_fraction * max(impacts))
+            protected = set(sorted(range(len(content)), key=lambda i: -impacts[i])[:keep_top])
+            kept = [
+                posting for i, posting in enumerate(content)
+                if impacts[i] >= threshold or i in protected
+            ]
+            if kept:
+                pruned[term] = kept
+        return pruned
+
+    def sample_queries(self, count: int = 100, terms_per_query: int = 2, seed: int = 0):
+        """Draw query term weights, picking terms in proportion to their document frequency.
+
+        Frequent terms are the ones pruning affects most and the ones users
+        type most, so they are sampled more often.
+        """
+        rng = random.Random(seed)
+        terms = sorted(self.content_index)
+        doc_freqs = [len(self.content_index[term]) for term in terms]
+        queries = []
+        for _ in range(count):
+            query_terms = set(rng.choices(terms, weights=doc_freqs, k=terms_per_query))
+            queries.append({term: round(1.0 / len(query_terms), 4) for term in query_terms})
+        return queries
+
+    def report(self, levels, queries, k: int = 10):
+        """Measure the size and top-k overlap of each pruning level.
+
+        Args:
+            levels (list): Keyword arguments for prune, one dict per level.
+            queries (list): Query term weights, see sample_queries.
+            k (int): Result depth the overlap is measured at.
+
+        Returns:
+            list: One row per level with its postings, JSON size, size relative
+                to the unpruned index and mean top-k overlap.
+        """
+        full_engine = QueryEngine(self.content_index, doc_priors=self.doc_priors)
+        full_results = [self._top_k(full_engine, query, k) for query in queries]
+        full_size = self.index_size(self.content_index)
+        full_postings = sum(len(content) for content in self.content_index.values())
+
+        rows = []
+        for level in levels:
+            pruned = self.prune(**level)
+            engine = QueryEngine(pruned, doc_priors=self.doc_priors)
+            overlaps = [
+                len(expected & self._top_k(engine, query, k)) / len(expected)
+                for query, expected in zip(queries, full_results)
+                if expected
+            ]
+            size = self.index_size(pruned)
+            rows.append({
+                'level': ', '.join(f"{name}={value}" for name, value in level.items()) or 'unpruned',
+                'postings': sum(len(content) for content in pruned.values()),
+                'postings_kept': round(sum(len(content) for content in pruned.values()) / full_postings, 4) if full_postings else 1.0,
+                'bytes': size,
+                'size_ratio': round(size / full_size, 4) if full_size else 1.0,
+                f'top{k}_overlap': round(sum(overlaps) / len(overlaps), 4) if overlaps else 1.0,
+            })
+        return rows
+
+    def _top_k(self, engine, query, k):
+        if self.doc_priors:
+            return {content_id for content_id, _ in engine.search_by_impact(query, k)}
+        return {content_id for content_id, _ in engine.search(query, k)}
+
+    @staticmethod
+    def index_size(content_index):
+        """Size in bytes of the index serialized as compact JSON."""
+        return len(json.dumps(content_index, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def print_report(rows):
+        print(tabulate([list(row.values()) for row in rows], headers=list(rows[0].keys()) if rows else [], tablefmt="grid"))
+
+    def write(self, output_path: str, **level):
+        """Write the index pruned at one level to output_path."""
+        with open(output_path, 'w') as f:
+            json.dump(self.prune(**level), f, indent=4)
+        return output_path
+
+
+if __name__ == "__main__":
+    with open("backend/nlp_pipeline/data/content_index.json", 'r') as f:
+        pruner = IndexPruner(json.load(f))
+    levels = [
+        {},
+        {'term_fraction': 0.1, 'keep_top': 50},
+        {'term_fraction': 0.25, 'keep_top': 50},
+        {'term_fraction': 0.5, 'keep_top': 20},
+        {'min_impact': 1.0, 'keep_top': 20},
+    ]
+    IndexPruner.print_report(pruner.report(levels, pruner.sample_queries()))
@@ -1,8 +1,28 @@
 import math
 import csv
 import json
+import hashlib
+import heapq
+import os
+import tempfile
+import time
 from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
 from backend.shared_utils.services.DataPreprocessor import DataPreprocessor
+from backend.shared_utils.services.TokenCache import TOKEN_CACHE_PATH
+from backend.shared_utils.services.Tokenizer import has_emoji
+from backend.shared_utils.services.SynonymTable import (
+    MAX_EXPANSIONS, SYNONYM_TABLE_PATH, SynonymTable, build_synonym_table, terms_version, wordnet_synonyms,
+)
+from backend.nlp_pipeline.services.BinaryIndex import BinaryIndexReader, BinaryIndexWriter, is_binary_index
+from backend.nlp_pipeline.services.NormalizedIndex import NormalizedIndex, is_normalized_index
+from backend.nlp_pipeline.services.QueryEngine import OverlayQueryEngine, QueryEngine
+from backend.nlp_pipeline.services.SharedIndex import SharedIndex
+from backend.nlp_pipeline.services.ShardedIndex import GLOBAL_STATS_FILE, SHARD_FILE, shard_for
+from backend.nlp_pipeline.services.FirestoreUploader import FirestoreUploader
+from backend.nlp_pipeline.services.PositionalIndex import PositionalIndex, positions_by_term
+from functools import partial
 from multiprocessing import Pool, cpu_count
 
 # Initialize Firestore
@@ -10,13 +30,237 @@ import firebase_admin
 from firebase_admin import credentials, firestore
 from tabulate import tabulate
 
+# Preprocessing resources owned by the current process. Pool workers load them
+# once in init_worker and reuse them for every record they are sent.
+_worker_preprocessor = None
+
+def init_worker(token_cache_path: str = TOKEN_CACHE_PATH):
+    """Load the stopwords, spell checker, stemmer and token cache once per worker process."""
+    global _worker_preprocessor
+    _worker_preprocessor = DataPreprocessor(token_cache_path=token_cache_path)
+    _worker_preprocessor.get_spell_checker()
+    _worker_preprocessor.get_stemmer()
+
+def get_worker_preprocessor():
+    """Return this process's DataPreprocessor, loading it on first use."""
+    if _worker_preprocessor is None:
+        init_worker()
+    return _worker_preprocessor
+
+def build_partial_index(records, positional=False):
+    """Map step: build the inverted index for one shard of records in a worker.
+
+    Args:
+        records (list): The shard's records.
+        positional (bool): Also encode each term's token offsets per document.
+
+    Returns:
+        list: (term, doc_freq, [(doc_id, tf), ...]) entries sorted by term. With
+            positional set, postings are (doc_id, tf, encoded_offsets).
+    """
+    data_pp = get_worker_preprocessor()
+    shard_index = defaultdict(dict)
+    shard_positions = defaultdict(dict)  # term -> doc_id -> encoded offsets
+    doc_ids = set()
+    for record, term_data in zip(records, Indexer.process_batch(records, data_pp)):
+        if record['id'] in doc_ids:
+            raise ValueError(f"Document id {record['id']} occurs more than once in a shard")
+        doc_ids.add(record['id'])
+        for term, doc_id in term_data:
+            postings = shard_index[term]
+            postings[doc_id] = postings.get(doc_id, 0) + 1
+        if positional and term_data:
+            doc_id = term_data[0][1]
+            for term, encoded in positions_by_term([term for term, _ in term_data]).items():
+                shard_positions[term][doc_id] = encoded
+
+    if positional:
+        return [
+            (term, len(postings), [(doc_id, tf, shard_positions[term][doc_id]) for doc_id, tf in postings.items()])
+            for term, postings in sorted(shard_index.items())
+        ]
+    return [
+        (term, len(postings), list(postings.items()))
+        for term, postings in sorted(shard_index.items())
+    ]
+
+def merge_partial_indexes(partial_indexes):
+    """Reduce step: k-way merge of term-sorted partial indexes.
+
+    Shards hold disjoint documents, so a term's document frequency is the sum
+    over shards and its postings are the shard postings in shard order.
+
+    Raises:
+        ValueError: If a document id has postings in more than one shard,
+            which would count it twice in the document frequency.
+
+    Yields:
+        tuple: (term, doc_freq, [(doc_id, tf), ...]) in term order.
+    """
+    merged = heapq.merge(*partial_indexes, key=itemgetter(0))
+    for term, entries in groupby(merged, key=itemgetter(0)):
+        doc_freq = 0
+        postings = []
+        doc_ids = set()
+        for _, shard_doc_freq, shard_postings in entries:
+            shard_doc_ids = {posting[0] for posting in shard_postings}
+            if not doc_ids.isdisjoint(shard_doc_ids):
+                raise ValueError(f"Document ids {sorted(doc_ids & shard_doc_ids)} occur in more than one shard")
+            doc_ids |= shard_doc_ids
+            doc_freq += shard_doc_freq
+            postings.extend(shard_postings)
+        yield term, doc_freq, postings
+
+def unique_records(records):
+    """Yield records whose id was not seen before, keeping the first of each id.
+
+    A document indexed twice would be counted twice in the document
+    frequencies, so later records with a seen id are skipped.
+    """
+    seen = set()
+    for record in records:
+        if record['id'] in seen:
+            print(f"Skipping duplicate record with id {record['id']}")
+            continue
+        seen.add(record['id'])
+        yield record
+
+def chunk_records(records, chunk_size):
+    """Split records into consecutive lists of at most chunk_size records."""
+    return [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+
+# Rough in-memory cost of one buffered posting with its metadata, used to turn
+# a memory budget into a number of postings per run
+POSTING_SIZE_ESTIMATE = 200
+# Run files merged at once, kept well below the usual open file limit
+MAX_MERGE_FAN_IN = 64
+
+# Firestore collection holding the index, and the postings stored per document
+# so a frequent term never approaches the 1 MiB document limit
+INDEX_COLLECTION = 'content_index'
+POSTINGS_PAGE_SIZE = 500
+
+# Published index versions live under content_index_versions/{version}/terms,
+# and the pointer document names the one clients should read
+INDEX_VERSIONS_COLLECTION = 'content_index_versions'
+INDEX_POINTER_COLLECTION = 'index_meta'
+INDEX_POINTER_DOCUMENT = 'content_index'
+
+# Popularity and quality signals of Post and Content that feed the static prior
+PRIOR_SIGNALS = ('likes', 'retweets', 'comments', 'humor_score')
+PRIOR_WEIGHT = 0.1
+
+def static_prior(record):
+    """Index-time quality prior of a record, independent of any query.
+
+    Engagement is log-damped so a viral post cannot drown out relevance, and
+    the humor detector's score is added on top. A record without signals gets
+    the neutral prior 1.0, so its impact equals its TF-IDF weight.
+    """
+    comments = record.get('comments') or 0
+    if isinstance(comments, (list, tuple)):
+        comments = len(comments)
+    engagement = (record.get('likes') or 0) + 2 * (record.get('retweets') or 0) + comments
+    return round(1.0 + PRIOR_WEIGHT * (math.log1p(engagement) + (record.get('humor_score') or 0.0)), 4)
+
+def read_records(csv_file_path):
+    """Stream the content records of a CSV file one row at a time.
+
+    Prior signal columns are optional and only read when the file has them.
+    """
+    with open(csv_file_path, 'r') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            record = {
+                'id': row['id'],
+                'text': row['text'],
+                'emoji_presence': row['emoji_presence'].lower() == 'true' if row.get('emoji_presence') else has_emoji(row['text']),
+                'humor_type': row['humor_type'],
+                'humor_type_score': float(row['humor_type_score'])
+            }
+            for signal in PRIOR_SIGNALS:
+                if row.get(signal):
+                    record[signal] = float(row[signal])
+            yield record
+
+def write_posting_run(block, run_dir, run_number):
+    """Write a term-sorted block of postings to a run file, one term per line."""
+    run_path = os.path.join(run_dir, f"run_{run_number:05d}.jsonl")
+    with open(run_path, 'w') as run_file:
+        for term in sorted(block):
+            postings = block[term]
+            run_file.write(json.dumps([term, len(postings), postings]) + "\n")
+    print(f"Wrote posting run {run_number} with {len(block)} terms")
+    return run_path
+
+def read_posting_run(run_path):
+    """Stream the (term, doc_freq, postings) entries of a run file."""
+    with open(run_path, 'r') as run_file:
+        for line in run_file:
+            yield tuple(json.loads(line))
+
+def merge_posting_runs(run_paths, run_dir, fan_in=MAX_MERGE_FAN_IN):
+    """Merge run files in passes until at most fan_in of them are left.
+
+    Each pass merges groups of fan_in consecutive runs into one, so no more
+    than fan_in run files are ever open at once however many runs a small
+    memory budget produced. Consecutive runs keep the postings in document
+    order.
+
+    Returns:
+        list: The paths of the remaining runs, in order.
+    """
+    merge_pass = 0
+    while len(run_paths) > fan_in:
+        merged_paths = []
+        for number, start in enumerate(range(0, len(run_paths), fan_in)):
+            group = run_paths[start:start + fan_in]
+            if len(group) == 1:
+                merged_paths.append(group[0])
+                continue
+            merged_path = os.path.join(run_dir, f"merge_{merge_pass:02d}_{number:05d}.jsonl")
+            with open(merged_path, 'w') as run_file:
+                for entry in merge_partial_indexes([read_posting_run(run_path) for run_path in group]):
+                    run_file.write(json.dumps(entry) + "\n")
+            for run_path in group:
+                os.remove(run_path)
+            merged_paths.append(merged_path)
+        print(f"Merged {len(run_paths)} posting runs into {len(merged_paths)}")
+        run_paths = merged_paths
+        merge_pass += 1
+    return run_paths
+
 class Indexer:
-    def __init__(self):
+    def __init__(self, positional: bool = False, token_cache_path: str = TOKEN_CACHE_PATH):
         self.index = defaultdict(Indexer.default_index_entry)
         self.term_freq = defaultdict(Indexer.default_term_freq_entry)  # term -> doc_id -> freq
         self.doc_count = 0  # Total documents
         self.term_doc_count = defaultdict(int)  # term -> number of docs containing it
         self.content_index = defaultdict(list)  # Change from int to list
+        self.doc_stats = {}  # doc_id -> {'length': terms in doc, 'norm': tf-idf vector length}
+        self.documents = {}  # doc_id -> record metadata
+        self.doc_priors = {}  # doc_id -> static quality prior, see static_prior
+        self.doc_terms = None  # doc_id -> term -> freq, derived on the first incremental update
+
+        # Token offsets for phrase and proximity queries, only kept when asked for
+        self.positional_index = PositionalIndex() if positional else None
+
+        # Incremental updates since content_index was last materialized, and the
+        # fraction of the corpus they may reach before compact() runs
+        self.pending_updates = 0
+        self.compaction_threshold = 0.1
+        # The updates themselves, which query_engine() merges over an engine
+        # built once per compaction: the term frequencies of documents added
+        # since (doc_id -> term -> freq, in order, and term -> doc_id -> freq)
+        # and the ids of content_index documents deleted or replaced since
+        self.added_docs = {}
+        self.added_postings = defaultdict(dict)
+        self.deleted_docs = set()
+        self._base_engine = None
+        self._engine = None
+
+        # Per-token preprocessing results shared by the workers of every build
+        self.token_cache_path = token_cache_path
 
         # Firestore client initialization moved to a separate method
         self.db = None
@@ -35,24 +279,24 @@ class Indexer:
 
     def initialize_firestore(self):
         """Initialize the Firestore client."""
-        cred = credentials.Certificate("backend/nlp_pipeline/config/hodien-f5535-firebase-adminsdk-fbsvc-dd2b2fc2a9.json")
-        firebase_admin.initialize_app(cred)
+        if not firebase_admin._apps:
+            cred = credentials.Certificate("backend/nlp_pipeline/config/hodien-f5535-firebase-adminsdk-fbsvc-dd2b2fc2a9.json")
+            firebase_admin.initialize_app(cred)
         self.db = firestore.client()
 
-    def process_record(self, record):
-        data_pp = DataPreprocessor()
+    @staticmethod
+    def process_record(record, data_pp=None):
+        if data_pp is None:
+            data_pp = get_worker_preprocessor()
         doc_id = record['id']
-        tokens = data_pp.tokenize(record['text'])
-        print("tokens:", tokens)
-        spell_checked_tokens = data_pp.correct_spelling(tokens)
-        print("spell_checked_tokens:", spell_checked_tokens)
-        stop_word_free_tokens = data_pp.remove_stop_words(spell_checked_tokens)
-        print("stop_word_free_tokens:", stop_word_free_tokens)
-        normalized_tokens = data_pp.normalize(stop_word_free_tokens)
-        print("normalized_tokens:", normalized_tokens)
-        terms = data_pp.stem_tokens(normalized_tokens)
+        result = data_pp.stem_many([record['text']])[0]
+        print("tokens:", result['tokens'])
+        print("spell_checked_tokens:", result['corrected_tokens'])
+        print("stop_word_free_tokens:", result['filtered_tokens'])
+        print("normalized_tokens:", result['normalized_tokens'])
+        terms = result['stemmed_tokens']
         print("terms:", terms)
-        
+
         print(f"Processing ${doc_id}")
 
         term_data = []
@@ -60,42 +304,60 @@ class Indexer:
             term_data.append((term, doc_id))
         return term_data, record
 
-    def build_index(self, csv_file_path: str):
+    @staticmethod
+    def process_batch(records, data_pp=None):
+        """Preprocess many records at once, each distinct token only once.
+
+        Most token occurrences in a corpus repeat a word seen before, so the
+        batch is preprocessed with DataPreprocessor.stem_many and every record
+        gets the same terms process_record would give it.
+
+        Returns:
+            list: The (term, doc_id) term data of each record, in record order.
+        """
+        if data_pp is None:
+            data_pp = get_worker_preprocessor()
+        results = data_pp.stem_many([record['text'] for record in records])
+        return [
+            [(term, record['id']) for term in result['stemmed_tokens']]
+            for record, result in zip(records, results)
+        ]
+
+    def build_index(self, csv_file_path: str, chunk_size: int = None,
+                    output_path: str = 'backend/nlp_pipeline/data/content_index.json'):
         """
         tokens: Dict[content_id, List[str]]
         contents: List[Content]
-        """
-        # Initialize NLP tools
-        data_pp = DataPreprocessor()
 
+        Args:
+            csv_file_path (str): Path to the CSV file containing content.
+            chunk_size (int, optional): Records per shard sent to a worker. Defaults
+                to splitting the corpus into a few shards per worker.
+            output_path (str): Where to write the content index JSON.
+        """
         # 1. Read CSV
-        records = []
-        with open(csv_file_path, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                records.append({
-                    'id': row['id'],
-                    'text': row['text'],
-                    'emoji_presence': row['emoji_presence'].lower() == 'true',
-                    'humor_type': row['humor_type'],
-                    'humor_type_score': float(row['humor_type_score'])
-                })
-                
-        self.doc_count = len(records)
+        records = list(unique_records(read_records(csv_file_path)))
 
-        # Parallel processing
-        with Pool(cpu_count()) as pool:
-            results = pool.map(self.process_record, records)
+        self.doc_count = len(records)
 
-        for term_data, record in results:
-            doc_id = record['id']
-            for term, doc_id in term_data:
-                self.term_freq[term][doc_id] += 1
-                self.term_doc_count[term] += 1 if self.term_freq[term][doc_id] == 1 else 0
+        # Map: every worker loads the preprocessing resources once and builds a
+        # partial index with term and document frequencies for its shard
+        workers = cpu_count()
+        if chunk_size is None:
+            chunk_size = max(1, math.ceil(len(records) / (workers * 4)))
+        with Pool(workers, initializer=init_worker, initargs=(self.token_cache_path,)) as pool:
+            map_shard = partial(build_partial_index, positional=self.positional_index is not None)
+            partial_indexes = pool.map(map_shard, chunk_records(records, chunk_size))
 
-        # Firestore operations (ensure this is done outside multiprocessing)
-        if self.db is None:
-            self.initialize_firestore()
+        # Reduce: merge the shards into the global term statistics
+        for term, doc_freq, postings in merge_partial_indexes(partial_indexes):
+            if self.positional_index is not None:
+                for doc_id, tf, encoded in postings:
+                    self.term_freq[term][doc_id] = tf
+                    self.positional_index.add_encoded(term, doc_id, encoded)
+            else:
+                self.term_freq[term].update(postings)
+            self.term_doc_count[term] += doc_freq
 
         # Display the term_doc_count dictionary as a table
         # term_doc_count_table = [
@@ -104,6 +366,194 @@ class Indexer:
         # print(tabulate(term_doc_count_table, headers=["Term", "Document Count"], tablefmt="grid"))
         
         # 3. Calculate TF-IDF weights
+        self.compute_content_index(records)
+                
+        # term_freq_table = [
+        #     [term, doc_id, freq, freq, round(math.log(self.doc_count / (self.term_doc_count[term] + 1)), 4)]
+        #     for term, docs in self.term_freq.items()
+        #     for doc_id, freq in docs.items()
+        # ]
+        # print(tabulate(term_freq_table, headers=["Term", "Document ID", "Frequency", "TF", "IDF"], tablefmt="grid"))
+
+        # 4. Write index to a JSON file
+        with open(output_path, 'w') as json_file:
+            json.dump(self.content_index, json_file, indent=4)
+
+        # 5. Push to Firestore
+        # self.push_index_to_firestore()
+        
+        return self.content_index
+
+    def build_index_external(self, csv_file_path: str, output_path: str = 'backend/nlp_pipeline/data/content_index.json',
+                             memory_budget_mb: float = 256, chunk_size: int = 1000,
+                             merge_fan_in: int = MAX_MERGE_FAN_IN):
+        """Build the content index with bounded memory (SPIMI).
+
+        The corpus is read in chunks and the workers' partial indexes are
+        collected in an in-memory block. Whenever the block exceeds the memory
+        budget it is written to disk as a term-sorted run. The runs are then
+        k-way merged, in several passes when there are more than merge_fan_in
+        of them, and the index is streamed to output_path, so neither the
+        records nor the full index are ever held in memory. Static priors grow
+        with the corpus and the JSON index has no place for them, so this
+        build does not collect them.
+
+        Args:
+            csv_file_path (str): Path to the CSV file containing content.
+            output_path (str): Where to write the content index JSON.
+            memory_budget_mb (float): Approximate memory for buffered postings.
+            chunk_size (int): Records per shard sent to a worker.
+            merge_fan_in (int): Most run files open at once while merging.
+
+        Raises:
+            ValueError: If a document id occurs more than once, whether in the
+                same chunk, batch or run or not. The records are streamed, so
+                duplicates are rejected rather than dropped. Also
+                raised for an Indexer built with positional=True, since the
+                positional index is only kept in memory by build_index.
+
+        Returns:
+            str: The path of the written content index.
+        """
+        if self.positional_index is not None:
+            raise ValueError("build_index_external cannot keep positions; use build_index for a positional index")
+        max_postings = max(1, int(memory_budget_mb * 1024 * 1024 / POSTING_SIZE_ESTIMATE))
+        workers = cpu_count()
+        self.doc_count = 0
+
+        with tempfile.TemporaryDirectory() as run_dir, \
+                Pool(workers, initializer=init_worker, initargs=(self.token_cache_path,)) as pool:
+            run_paths = []
+            block = defaultdict(list)
+            block_postings = 0
+            # Ids are far smaller than postings, so every id read is kept to
+            # catch a duplicate before its postings reach a block
+            seen_ids = set()
+
+            records = read_records(csv_file_path)
+            while True:
+                # Read only as many records as the workers process in one round
+                batch = [record for _, record in zip(range(workers * chunk_size), records)]
+                if not batch:
+                    break
+                for record in batch:
+                    if record['id'] in seen_ids:
+                        raise ValueError(f"Document id {record['id']} occurs more than once")
+                    seen_ids.add(record['id'])
+                self.doc_count += len(batch)
+                metadata = {record['id']: record for record in batch}
+
+                for partial_index in pool.imap(build_partial_index, chunk_records(batch, chunk_size)):
+                    for term, _, postings in partial_index:
+                        for doc_id, tf in postings:
+                            record = metadata[doc_id]
+                            block[term].append([doc_id, tf, record['humor_type'],
+                                                record['emoji_presence'], record['humor_type_score']])
+                        block_postings += len(postings)
+
+                    if block_postings >= max_postings:
+                        run_paths.append(write_posting_run(block, run_dir, len(run_paths)))
+                        block = defaultdict(list)
+                        block_postings = 0
+
+            if block:
+                run_paths.append(write_posting_run(block, run_dir, len(run_paths)))
+            del block
+
+            # Merge the runs and stream the weighted postings term by term
+            run_paths = merge_posting_runs(run_paths, run_dir, merge_fan_in)
+            runs = [read_posting_run(run_path) for run_path in run_paths]
+            with open(output_path, 'w') as json_file:
+                json_file.write('{')
+                separator = '\n'
+                for term, doc_freq, postings in merge_partial_indexes(runs):
+                    idf = math.log(self.doc_count / float(doc_freq))
+                    content = [
+                        {
+                            'id': doc_id,
+                            'humor_type': humor_type,
+                            'emoji_presence': emoji_presence,
+                            'humor_type_score': humor_type_score,
+                            'weight': round(tf * idf, 4)
+                        }
+                        for doc_id, tf, humor_type, emoji_presence, humor_type_score in postings
+                    ]
+                    json_file.write(separator + json.dumps(term) + ': ' + json.dumps(content))
+                    separator = ',\n'
+                json_file.write('\n}\n')
+
+        return output_path
+
+    def build_shards(self, csv_file_path: str, shard_count: int,
+                     output_dir: str = 'backend/nlp_pipeline/data/shards'):
+        """Build a document-partitioned index of shard_count shards.
+
+        Every document goes to one shard by a hash of its id. Each shard is
+        indexed with its own local statistics in a separate worker and written
+        as a binary index with term frequencies; the global document count and
+        document frequencies are written next to them so a ShardCoordinator
+        can score every shard with the corpus-wide IDF.
+
+        Raises:
+            ValueError: For an Indexer built with positional=True, since shard
+                files do not store positions.
+
+        Returns:
+            list: The paths of the written shard files.
+        """
+        if self.positional_index is not None:
+            raise ValueError("build_shards cannot keep positions; use build_index for a positional index")
+        records = list(unique_records(read_records(csv_file_path)))
+        shard_records = [[] for _ in range(shard_count)]
+        for record in records:
+            shard_records[shard_for(record['id'], shard_count)].append(record)
+
+        with Pool(min(shard_count, cpu_count()), initializer=init_worker, initargs=(self.token_cache_path,)) as pool:
+            partial_indexes = pool.map(build_partial_index, shard_records)
+
+        os.makedirs(output_dir, exist_ok=True)
+        doc_freqs = defaultdict(int)
+        shard_paths = []
+        for number, (records_of_shard, partial_index) in enumerate(zip(shard_records, partial_indexes)):
+            shard = Indexer()
+            shard.doc_count = len(records_of_shard)
+            for term, doc_freq, postings in partial_index:
+                shard.term_freq[term].update(postings)
+                shard.term_doc_count[term] = doc_freq
+                doc_freqs[term] += doc_freq
+            shard.compute_content_index(records_of_shard)
+            shard_paths.append(shard.write_binary_index(os.path.join(output_dir, SHARD_FILE.format(number))))
+            print(f"Wrote shard {number} with {shard.doc_count} documents")
+
+        self.doc_count = len(records)
+        with open(os.path.join(output_dir, GLOBAL_STATS_FILE), 'w') as f:
+            json.dump({'shard_count': shard_count, 'doc_count': len(records), 'doc_freqs': doc_freqs}, f)
+        return shard_paths
+
+    def compute_content_index(self, records):
+        """Attach TF-IDF weights and document metadata to every posting.
+
+        Records are kept in a store keyed by document id, so each posting reads
+        its metadata in constant time instead of scanning all records. The
+        length and tf-idf norm of every document are collected on the way so
+        length-normalized scoring models need no reindex.
+
+        Args:
+            records (list): The records the term frequencies were computed from.
+        """
+        record_store = {}
+        for record in records:
+            record_store.setdefault(record['id'], record)
+        self.documents = record_store
+        self.added_docs = {}
+        self.added_postings = defaultdict(dict)
+        self.deleted_docs = set()
+        self._base_engine = None
+        self._engine = None
+        self.doc_priors = {doc_id: static_prior(record) for doc_id, record in record_store.items()}
+        doc_lengths = defaultdict(int)
+        squared_norms = defaultdict(float)
+
         for term in self.term_freq:
             idf = math.log(self.doc_count / float(self.term_doc_count[term]))  # Avoid division by zero
             for doc_id in self.term_freq[term]:
@@ -114,8 +564,9 @@ class Indexer:
                     print(f"Error: Term frequency (tf) is zero for term '{term}' in document '{doc_id}'")
                 
                 weight = round(tf * idf,4)
-                # Find record for metadata
-                record = next(r for r in records if r['id'] == doc_id)
+                doc_lengths[doc_id] += tf
+                squared_norms[doc_id] += weight * weight
+                record = record_store[doc_id]
                 self.content_index[term].append({
                     'id': doc_id,
                     'humor_type': record['humor_type'],
@@ -123,42 +574,323 @@ class Indexer:
                     'humor_type_score': record['humor_type_score'],
                     'weight': weight
                 })
-                
-        # term_freq_table = [
-        #     [term, doc_id, freq, freq, round(math.log(self.doc_count / (self.term_doc_count[term] + 1)), 4)]
-        #     for term, docs in self.term_freq.items()
-        #     for doc_id, freq in docs.items()
-        # ]
-        # print(tabulate(term_freq_table, headers=["Term", "Document ID", "Frequency", "TF", "IDF"], tablefmt="grid"))
 
-        # 4. Write index to a JSON file
-        with open('backend/nlp_pipeline/data/content_index.json', 'w') as json_file:
-            json.dump(self.content_index, json_file, indent=4)
+        for doc_id, length in doc_lengths.items():
+            self.doc_stats[doc_id] = {'length': length, 'norm': round(math.sqrt(squared_norms[doc_id]), 4)}
 
-        # 5. Push to Firestore
-        # self.push_index_to_firestore()
-        
         return self.content_index
 
+    def idf(self, term: str):
+        """Inverse document frequency of term from the live corpus statistics."""
+        doc_freq = self.term_doc_count.get(term, 0)
+        if not doc_freq or not self.doc_count:
+            return 0.0
+        return math.log(self.doc_count / float(doc_freq))
+
+    def get_postings(self, term: str):
+        """Return the postings of term weighted with the live IDF.
+
+        Unlike content_index, which is only refreshed by compact(), these
+        weights always reflect documents added or deleted since the last build.
+        """
+        term_freqs = self.term_freq.get(term)
+        if not term_freqs:
+            return []
+        idf = self.idf(term)
+        postings = []
+        for doc_id, tf in term_freqs.items():
+            record = self.documents[doc_id]
+            postings.append({
+                'id': doc_id,
+                'humor_type': record['humor_type'],
+                'emoji_presence': record['emoji_presence'],
+                'humor_type_score': record['humor_type_score'],
+                'weight': round(tf * idf, 4)
+            })
+        return postings
+
+    def document_norm(self, doc_id):
+        """Length of a document's tf-idf vector under the live IDF, rounded like build_index."""
+        squared_norm = 0.0
+        for term, tf in self.doc_terms[doc_id].items():
+            weight = round(tf * self.idf(term), 4)
+            squared_norm += weight * weight
+        return round(math.sqrt(squared_norm), 4)
+
+    def _ensure_doc_terms(self):
+        """Derive the per-document term frequencies needed to delete documents.
+
+        The engine over content_index is built here too, before the first
+        update changes the statistics it reads.
+        """
+        self._query_base_engine()
+        if self.doc_terms is None:
+            self.doc_terms = defaultdict(dict)
+            for term, term_freqs in self.term_freq.items():
+                for doc_id, tf in term_freqs.items():
+                    self.doc_terms[doc_id][term] = tf
+
+    def add_documents(self, records, data_pp=None):
+        """Index new records in place without rebuilding the index.
+
+        Records whose id is already indexed replace the existing document.
+        The new documents get their norms under the live IDF, and
+        query_engine() finds them before the next compact(). Other documents
+        keep their norms until then, see OverlayQueryEngine.
+
+        Args:
+            records (list): Records with the same fields build_index reads.
+            data_pp (DataPreprocessor, optional): Preprocessor to reuse.
+        """
+        self._ensure_doc_terms()
+        records = list(records)
+        for record, term_data in zip(records, Indexer.process_batch(records, data_pp)):
+            doc_id = record['id']
+            if doc_id in self.documents:
+                self._remove_document(doc_id)
+
+            doc_terms = defaultdict(int)
+            for term, _ in term_data:
+                doc_terms[term] += 1
+            if self.positional_index is not None:
+                self.positional_index.add_document(doc_id, [term for term, _ in term_data])
+            for term, tf in doc_terms.items():
+                self.term_freq[term][doc_id] = tf
+                self.term_doc_count[term] += 1
+                self.added_postings[term][doc_id] = tf
+
+            self.documents[doc_id] = record
+            self.doc_priors[doc_id] = static_prior(record)
+            self.doc_terms[doc_id] = dict(doc_terms)
+            self.added_docs[doc_id] = self.doc_terms[doc_id]
+            self.doc_count += 1
+            self.doc_stats[doc_id] = {'length': sum(doc_terms.values()), 'norm': self.document_norm(doc_id)}
+
+        self._record_updates(len(records))
+
+    def delete_documents(self, doc_ids):
+        """Remove documents from the index in place.
+
+        Returns:
+            int: The number of documents that were indexed and removed.
+        """
+        self._ensure_doc_terms()
+        removed = 0
+        for doc_id in doc_ids:
+            if doc_id in self.documents:
+                self._remove_document(doc_id)
+                removed += 1
+        self._record_updates(removed)
+        return removed
+
+    def update_document(self, record, data_pp=None):
+        """Replace the indexed content of a single record."""
+        self.add_documents([record], data_pp)
+
+    def _remove_document(self, doc_id):
+        """Remove a document from the live statistics and return its terms."""
+        if self.positional_index is not None:
+            self.positional_index.remove_document(doc_id, self.doc_terms.get(doc_id, {}))
+        doc_terms = self.doc_terms.pop(doc_id, {})
+        if self.added_docs.pop(doc_id, None) is not None:
+            for term in doc_terms:
+                del self.added_postings[term][doc_id]
+                if not self.added_postings[term]:
+                    del self.added_postings[term]
+        else:
+            self.deleted_docs.add(doc_id)
+        for term in doc_terms:
+            del self.term_freq[term][doc_id]
+            self.term_doc_count[term] -= 1
+            if not self.term_doc_count[term]:
+                del self.term_freq[term]
+                del self.term_doc_count[term]
+        del self.documents[doc_id]
+        self.doc_priors.pop(doc_id, None)
+        self.doc_stats.pop(doc_id, None)
+        self.doc_count -= 1
+        return doc_terms
+
+    def _record_updates(self, count):
+        self._engine = None
+        self.pending_updates += count
+        if self.pending_updates > self.compaction_threshold * max(self.doc_count, 1):
+            self.compact()
+
+    def compact(self):
+        """Rematerialize content_index and document norms from the live statistics."""
+        self.content_index = defaultdict(list)
+        self.doc_stats = {}
+        self.compute_content_index(list(self.documents.values()))
+        self.pending_updates = 0
+        return self.content_index
+
+    def query_terms(self, text: str, data_pp=None):
+        """Run query text through the same pipeline used to index documents."""
+        if data_pp is None:
+            data_pp = get_worker_preprocessor()
+        return data_pp.stem_many([text])[0]['stemmed_tokens']
+
+    def phrase_search(self, phrase: str, data_pp=None):
+        """Return the ids of documents containing phrase as consecutive terms.
+
+        Raises:
+            ValueError: If the index was built without positions.
+        """
+        if self.positional_index is None:
+            raise ValueError("Phrase queries need an Indexer built with positional=True")
+        return self.positional_index.phrase_query(self.query_terms(phrase, data_pp))
+
+    def proximity_search(self, text: str, window: int, data_pp=None):
+        """Return the ids of documents with every query term within window terms.
+
+        Raises:
+            ValueError: If the index was built without positions.
+        """
+        if self.positional_index is None:
+            raise ValueError("Proximity queries need an Indexer built with positional=True")
+        return self.positional_index.proximity_query(self.query_terms(text, data_pp), window)
+
+    def boolean_search(self, must_contain=(), can_contain=(), must_not_contain=(), k: int = 10, data_pp=None):
+        """Search the index with AND/OR/NOT clauses of raw keywords.
+
+        Keywords go through the indexing pipeline, so they match the stemmed
+        index terms. Keywords that preprocess to nothing, like stop words, are
+        dropped from their clause.
+
+        Args:
+            must_contain (str or list): Keywords every result contains.
+            can_contain (str or list): Keywords of which a result contains at least one.
+            must_not_contain (str or list): Keywords no result contains.
+            k (int): Number of results to return.
+            data_pp (DataPreprocessor, optional): Preprocessor to reuse.
+
+        Returns:
+            list: (content_id, score) tuples ordered by descending score.
+        """
+        def terms(keywords):
+            if isinstance(keywords, str):
+                keywords = keywords.split()
+            return [term for keyword in keywords for term in self.query_terms(keyword, data_pp)]
+
+        return self.query_engine().boolean_search(
+            must=terms(must_contain), should=terms(can_contain), must_not=terms(must_not_contain), k=k)
+
+    def search_scrap_query(self, scrap_query, k: int = 10, data_pp=None):
+        """Run the keyword clauses of a ScrapQuery against the local index."""
+        return self.boolean_search(scrap_query.mustContain, scrap_query.canContain, k=k, data_pp=data_pp)
+
+    def write_binary_index(self, output_path: str = 'backend/nlp_pipeline/data/content_index.bin'):
+        """Write the content index in the compact, memory-mappable binary format."""
+        return BinaryIndexWriter.write(self.content_index, output_path, term_freq=self.term_freq, doc_stats=self.doc_stats,
+                                       doc_priors=self.doc_priors)
+
+    def write_normalized_index(self, output_path: str = 'backend/nlp_pipeline/data/content_index_normalized.json'):
+        """Write the content index with document attributes stored once in a document table."""
+        return NormalizedIndex.from_content_index(self.content_index, self.doc_priors).write(output_path)
+
+    def write_shared_index(self, output_path: str = 'backend/nlp_pipeline/data/content_index.shm'):
+        """Write the binary index that server workers map with SharedIndex.open().
+
+        The file is an ordinary binary index, so load_index and
+        push_index_to_firestore read it as well.
+        """
+        return SharedIndex.write(self.content_index, output_path, term_freq=self.term_freq, doc_stats=self.doc_stats,
+                                 doc_priors=self.doc_priors)
+
+    def publish_shared_index(self, name: str = None):
+        """Publish the index into a shared memory block for server workers to attach to.
+
+        Returns:
+            SharedIndex: The owning handle; close() it to unlink the block.
+        """
+        return SharedIndex.publish(self.content_index, term_freq=self.term_freq, doc_stats=self.doc_stats, name=name,
+                                   doc_priors=self.doc_priors)
+
+    def write_synonym_table(self, output_path: str = SYNONYM_TABLE_PATH, max_expansions: int = MAX_EXPANSIONS,
+                            synonyms_of=wordnet_synonyms, data_pp=None):
+        """Precompute query expansions for the index terms.
+
+        Each synonym is preprocessed like indexed text and only kept when it
+        lands on another index term, so DataPreprocessor's expansion becomes a
+        lookup that never adds terms the index does not have. The table records
+        the terms_version of the index, see query_preprocessor.
+
+        Args:
+            output_path (str): Where the table is written.
+            max_expansions (int): Synonyms kept per term.
+            synonyms_of (callable, optional): term -> {synonym: weight}. Defaults to WordNet.
+            data_pp (DataPreprocessor, optional): Preprocessor to reuse.
+        """
+        if data_pp is None:
+            data_pp = get_worker_preprocessor()
+
+        def to_terms(words):
+            results = data_pp.stem_many(words)
+            return [result['stemmed_tokens'][0] if len(result['stemmed_tokens']) == 1 else None for result in results]
+
+        table = build_synonym_table(self.content_index, to_terms, max_expansions, synonyms_of)
+        print(f"Built synonyms for {len(table)} of {len(self.content_index)} terms")
+        return SynonymTable.write(table, output_path, max_expansions, terms_version(self.content_index))
+
+    def query_preprocessor(self, synonym_table_path: str = SYNONYM_TABLE_PATH):
+        """Create a DataPreprocessor that expands queries with this index's synonym table.
+
+        The first expansion raises ValueError if the table was written for an
+        index with other terms.
+        """
+        return DataPreprocessor(synonym_table_path=synonym_table_path, index_version=terms_version(self.content_index))
+
+    def _query_base_engine(self):
+        """Return the engine over content_index, built once per compaction."""
+        if self._base_engine is None:
+            self._base_engine = QueryEngine(self.content_index, term_freq=self.term_freq, doc_stats=self.doc_stats,
+                                            doc_priors=self.doc_priors)
+        return self._base_engine
+
+    def query_engine(self):
+        """Return a QueryEngine over the live index with its term and document statistics.
+
+        Documents added or deleted since the last compact() are already
+        reflected: their postings are merged over the engine of content_index
+        term by term as queries read them, see OverlayQueryEngine. The engine
+        is reused until the next update.
+        """
+        base_engine = self._query_base_engine()
+        if not self.pending_updates:
+            return base_engine
+        if self._engine is None:
+            self._engine = OverlayQueryEngine(
+                base_engine, list(self.added_docs), self.added_postings, self.deleted_docs, self.idf,
+                self.documents, self.doc_stats, doc_priors=self.doc_priors)
+        return self._engine
+
     @staticmethod
-    def upload_index_term(term_data, db=None):
-        """Upload a single term and its content to Firestore with validation."""
-        # Validate term_data structure
-        if not isinstance(term_data, (list, tuple)) or len(term_data) != 3:
-            print(f"Skipping invalid term_data structure: {term_data}")
-            return
+    def load_index(index_file_path: str):
+        """Load a content index from a JSON, normalized JSON or binary index file.
 
-        term, content, collection_path = term_data
+        A normalized index is returned as a NormalizedIndex, which joins postings
+        with the document table only for the terms that are read.
+        """
+        if is_binary_index(index_file_path):
+            with BinaryIndexReader(index_file_path) as reader:
+                return reader.to_content_index()
+        with open(index_file_path, 'r') as f:
+            data = json.load(f)
+        return NormalizedIndex.from_dict(data) if is_normalized_index(data) else data
 
+    @staticmethod
+    def validate_index_term(term, content):
+        """Check that a term and its postings can be uploaded."""
         # Validate term
         if not term or not isinstance(term, str) or not term.strip():
-            print(f"Skipping upload: Invalid or empty term '{term}' in term_data: {term_data}")
-            return
+            print(f"Skipping upload: Invalid or empty term '{term}'")
+            return False
 
         # Validate content
         if not isinstance(content, list) or not content:
             print(f"Skipping upload: Content for term '{term}' is missing or not a list: {content}")
-            return
+            return False
 
         # Check required fields in each content item
         required_fields = ['id', 'humor_type', 'emoji_presence', 'humor_type_score', 'weight']
@@ -169,7 +901,20 @@ class Indexer:
             ]
             if missing_fields:
                 print(f"Skipping upload: Content item at index {idx} for term '{term}' is missing fields: {missing_fields}")
-                return
+                return False
+        return True
+
+    @staticmethod
+    def upload_index_term(term_data, db=None):
+        """Upload a single term and its content to Firestore with validation."""
+        # Validate term_data structure
+        if not isinstance(term_data, (list, tuple)) or len(term_data) != 3:
+            print(f"Skipping invalid term_data structure: {term_data}")
+            return
+
+        term, content, collection_path = term_data
+        if not Indexer.validate_index_term(term, content):
+            return
 
         # Use the provided Firestore client or initialize a new one
         if db is None:
@@ -182,16 +927,102 @@ class Indexer:
         index_collection.document(term).set({'content': content})
         print(f"Added {term} to Firestore")
 
-    def push_index_to_firestore(self, json_file_path: str = None):
+    @staticmethod
+    def compact_postings(content):
+        """Strip postings down to [id, weight] pairs.
+
+        The document attributes are already stored once per document in the
+        content collection, so normalized term documents only reference them.
+        """
+        return [[posting['id'], posting['weight']] for posting in content]
+
+    @staticmethod
+    def page_data(page, normalized=False):
+        return {'postings': Indexer.compact_postings(page)} if normalized else {'content': page}
+
+    @staticmethod
+    def term_pages(term, content, page_size: int = POSTINGS_PAGE_SIZE, normalized: bool = False,
+                   collection: str = INDEX_COLLECTION):
+        """Split a term's postings into weight-ordered Firestore documents.
+
+        The head document content_index/{term} keeps the highest-weighted page
+        under 'content', so readers of the single-document layout still get the
+        best postings, plus the page count and the maximum weight of every
+        page. The remaining pages go to content_index/{term}/pages/{n}. With
+        normalized set, pages hold [id, weight] pairs under 'postings' instead
+        of full postings under 'content'. collection places the term documents
+        in a versioned collection instead of the live one.
+
+        Returns:
+            list: (collection_path, doc_id, data) write operations.
+        """
+        ordered = sorted(content, key=lambda posting: posting['weight'], reverse=True)
+        pages = [ordered[i:i + page_size] for i in range(0, len(ordered), page_size)]
+        head = {
+            **Indexer.page_data(pages[0], normalized),
+            'doc_freq': len(ordered),
+            'page_count': len(pages),
+            'page_max_weights': [page[0]['weight'] for page in pages],
+        }
+        operations = [(collection, term, head)]
+        for number, page in enumerate(pages[1:], start=1):
+            operations.append((f"{collection}/{term}/pages", str(number), Indexer.page_data(page, normalized)))
+        return operations
+
+    @staticmethod
+    def page_postings(data):
+        """Read the postings of a head or page document in either layout."""
+        if 'postings' in data:
+            return [{'id': doc_id, 'weight': weight} for doc_id, weight in data['postings']]
+        return list(data.get('content', []))
+
+    @staticmethod
+    def read_term_postings(db, term: str, max_postings: int = None, min_weight: float = None,
+                           collection: str = INDEX_COLLECTION):
+        """Read a term's postings page by page in descending weight order.
+
+        Reading stops once max_postings postings are collected or the next
+        page's maximum weight is below min_weight, since later pages can then
+        no longer change a top-k result. Postings of the normalized layout
+        come back as {'id', 'weight'} and are joined with the content
+        collection by the caller. Pass the collection of a published version,
+        see version_collection, to read it instead of the live index.
+        """
+        head = db.collection(collection).document(term).get()
+        if not head.exists:
+            return []
+        data = head.to_dict()
+        postings = Indexer.page_postings(data)
+        page_max_weights = data.get('page_max_weights', [])
+
+        for number in range(1, data.get('page_count', 1)):
+            if max_postings is not None and len(postings) >= max_postings:
+                break
+            if min_weight is not None and page_max_weights[number] < min_weight:
+                break
+            page = db.collection(f"{collection}/{term}/pages").document(str(number)).get()
+            if page.exists:
+                postings.extend(Indexer.page_postings(page.to_dict()))
+
+        return postings[:max_postings] if max_postings is not None else postings
+
+    def push_index_to_firestore(self, json_file_path: str = None, uploader: FirestoreUploader = None,
+                                page_size: int = POSTINGS_PAGE_SIZE, normalized: bool = False):
         """Push the content index to Firestore, skipping existing terms.
 
         Args:
-            json_file_path (str, optional): Path to a JSON file containing the content index.
+            json_file_path (str, optional): Path to a JSON or binary file containing the content index.
+            uploader (FirestoreUploader, optional): Batched writer to use. Defaults
+                to one over this Indexer's Firestore client.
+            page_size (int): Postings per Firestore document, see term_pages.
+            normalized (bool): Write [id, weight] postings without document attributes.
+
+        Returns:
+            UploadStats: Counts and throughput of the upload.
         """
-        # Load content index from JSON file if provided
+        # Load content index from file if provided
         if json_file_path:
-            with open(json_file_path, 'r') as f:
-                content_index = json.load(f)
+            content_index = Indexer.load_index(json_file_path)
         else:
             content_index = self.content_index
 
@@ -199,25 +1030,244 @@ class Indexer:
         existing_terms = set()
         if self.db is None:
             self.initialize_firestore()
-        index_collection = self.db.collection('content_index')
+        index_collection = self.db.collection(INDEX_COLLECTION)
         for doc in index_collection.stream():
             existing_terms.add(doc.id)
 
         # Filter new terms to upload
-        new_terms = [
-            (term, content, 'content_index') for term, content in content_index.items()
-            if term.strip() and term not in existing_terms
-        ]
+        operations = (
+            operation
+            for term, content in content_index.items()
+            if term.strip() and term not in existing_terms and Indexer.validate_index_term(term, content)
+            for operation in Indexer.term_pages(term, content, page_size, normalized)
+        )
 
-        # Use parallel processing to upload terms
-        with Pool(cpu_count()) as pool:
-            pool.map(Indexer.upload_index_term, new_terms)
+        # Batched writes over the shared client
+        if uploader is None:
+            uploader = FirestoreUploader(self.db)
+        return uploader.write(operations, INDEX_COLLECTION)
 
     @staticmethod
-    def upload_content_item(content_data, db=None):
-        """Upload a single content item to Firestore with validation."""
-        content_id, content, collection_name = content_data
+    def term_content_hash(content):
+        """Hash a term's postings so unchanged terms can be skipped on sync."""
+        encoded = json.dumps(content, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()[:32]
+
+    def sync_index_to_firestore(self, json_file_path: str = None,
+                                manifest_path: str = 'backend/nlp_pipeline/data/content_index_manifest.json',
+                                uploader: FirestoreUploader = None, page_size: int = POSTINGS_PAGE_SIZE,
+                                normalized: bool = False):
+        """Upload only the terms whose postings changed since the last sync.
+
+        A local manifest maps every pushed term to the hash of its postings and
+        its page count. Terms with a new or different hash are written, pages
+        and terms that no longer exist are deleted, and Firestore is never
+        scanned, so the cost of a sync is proportional to the change rather
+        than to the index size.
+
+        Args:
+            json_file_path (str, optional): Path to a JSON or binary file containing the content index.
+            manifest_path (str): Where the term hashes of the last sync are kept.
+            uploader (FirestoreUploader, optional): Batched writer to use.
+            page_size (int): Postings per Firestore document, see term_pages.
+            normalized (bool): Write [id, weight] postings without document attributes.
+
+        Returns:
+            dict: The 'uploaded' and 'deleted' UploadStats and the 'unchanged' term count.
+        """
+        content_index = Indexer.load_index(json_file_path) if json_file_path else self.content_index
+
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        # Entries are [hash, page_count]; older manifests stored the hash alone
+        manifest = {
+            term: entry if isinstance(entry, list) else [entry, 1]
+            for term, entry in manifest.items()
+        }
+
+        # Hash what is stored, so switching layouts rewrites every term
+        hashes = {
+            term: Indexer.term_content_hash(Indexer.compact_postings(content) if normalized else content)
+            for term, content in content_index.items()
+            if term.strip() and Indexer.validate_index_term(term, content)
+        }
+        changed_terms = [term for term, term_hash in hashes.items() if manifest.get(term, [None])[0] != term_hash]
+        removed_terms = [term for term in manifest if term not in hashes]
+
+        writes = []
+        page_counts = {}
+        deletes = []
+        for term in changed_terms:
+            operations = Indexer.term_pages(term, content_index[term], page_size, normalized)
+            writes.extend(operations)
+            page_counts[term] = len(operations)
+            old_page_count = manifest.get(term, [None, 0])[1]
+            deletes.extend(
+                (f"{INDEX_COLLECTION}/{term}/pages", str(number), None)
+                for number in range(len(operations), old_page_count)
+            )
+        for term in removed_terms:
+            deletes.append((INDEX_COLLECTION, term, None))
+            deletes.extend(
+                (f"{INDEX_COLLECTION}/{term}/pages", str(number), None)
+                for number in range(1, manifest[term][1])
+            )
+
+        if uploader is None:
+            if self.db is None:
+                self.initialize_firestore()
+            uploader = FirestoreUploader(self.db)
+        uploaded = uploader.write(writes, INDEX_COLLECTION)
+        deleted = uploader.write(deletes, INDEX_COLLECTION)
+
+        # Only record what actually reached Firestore so failures are retried next time
+        failed_terms = {failed_id.split('/')[1] for failed_id in uploaded.failed_ids + deleted.failed_ids}
+        for term in changed_terms:
+            if term not in failed_terms:
+                manifest[term] = [hashes[term], page_counts[term]]
+            else:
+                # Keep the largest page count so stale pages are still deleted later
+                manifest[term] = [None, max(manifest.get(term, [None, 0])[1], page_counts[term])]
+        for term in removed_terms:
+            if term not in failed_terms:
+                del manifest[term]
+
+        temp_path = manifest_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, manifest_path)
+
+        print(f"Synced content index: {len(changed_terms)} changed, {len(removed_terms)} removed, "
+              f"{len(hashes) - len(changed_terms)} unchanged")
+        return {'uploaded': uploaded, 'deleted': deleted, 'unchanged': len(hashes) - len(changed_terms)}
 
+    @staticmethod
+    def version_collection(version: str):
+        """Collection holding the term documents of a published index version."""
+        return f"{INDEX_VERSIONS_COLLECTION}/{version}/terms"
+
+    @staticmethod
+    def index_version(content_index, page_size: int = POSTINGS_PAGE_SIZE, normalized: bool = False):
+        """Derive a version key from the index content and its Firestore layout.
+
+        Identical builds get the same version, so republishing them is a no-op
+        and anything cached under a version never goes stale.
+        """
+        digest = hashlib.sha256(f"{page_size}:{normalized}".encode('utf-8'))
+        for term in sorted(content_index):
+            digest.update(term.encode('utf-8'))
+            digest.update(Indexer.term_content_hash(content_index[term]).encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def current_index_version(db):
+        """Return the pointer document of the live index version, or None."""
+        pointer = db.collection(INDEX_POINTER_COLLECTION).document(INDEX_POINTER_DOCUMENT).get()
+        return pointer.to_dict() if pointer.exists else None
+
+    def publish_index_version(self, json_file_path: str = None, uploader: FirestoreUploader = None,
+                              page_size: int = POSTINGS_PAGE_SIZE, normalized: bool = False):
+        """Upload the index into a new versioned collection and switch clients to it.
+
+        The terms are written to content_index_versions/{version}/terms while
+        clients keep reading the previous version. Only when every write has
+        succeeded is the pointer document index_meta/content_index replaced,
+        a single-document write Firestore applies atomically, so readers never
+        see a mix of two builds. Superseded versions stay readable until
+        collect_index_versions removes them.
+
+        Args:
+            json_file_path (str, optional): Path to a JSON or binary file containing the content index.
+            uploader (FirestoreUploader, optional): Batched writer to use.
+            page_size (int): Postings per Firestore document, see term_pages.
+            normalized (bool): Write [id, weight] postings without document attributes.
+
+        Returns:
+            dict: The published 'version', its 'uploaded' UploadStats (None when
+                the version was already live) and whether it was 'switched' to.
+        """
+        content_index = Indexer.load_index(json_file_path) if json_file_path else self.content_index
+        if uploader is None:
+            if self.db is None:
+                self.initialize_firestore()
+            uploader = FirestoreUploader(self.db)
+        db = uploader.db
+
+        version = Indexer.index_version(content_index, page_size, normalized)
+        current = Indexer.current_index_version(db) or {}
+        if current.get('version') == version:
+            print(f"Index version {version} is already live")
+            return {'version': version, 'uploaded': None, 'switched': False}
+
+        collection = Indexer.version_collection(version)
+        terms = [
+            term for term, content in content_index.items()
+            if term.strip() and Indexer.validate_index_term(term, content)
+        ]
+        operations = (
+            operation
+            for term in terms
+            for operation in Indexer.term_pages(term, content_index[term], page_size, normalized, collection)
+        )
+        uploaded = uploader.write(operations, collection)
+        if uploaded.failed:
+            print(f"Index version {version} not published: {uploaded.failed} writes failed")
+            return {'version': version, 'uploaded': uploaded, 'switched': False}
+
+        # Superseded versions, newest first, for garbage collection
+        previous = [current['version']] + current.get('previous', []) if current.get('version') else []
+        db.collection(INDEX_POINTER_COLLECTION).document(INDEX_POINTER_DOCUMENT).set({
+            'version': version,
+            'collection': collection,
+            'term_count': len(terms),
+            'page_size': page_size,
+            'normalized': normalized,
+            'published_at': time.time(),
+            'previous': [old for old in previous if old != version],
+        })
+        print(f"Published index version {version} with {len(terms)} terms")
+        return {'version': version, 'uploaded': uploaded, 'switched': True}
+
+    def collect_index_versions(self, keep_versions: int = 1, uploader: FirestoreUploader = None):
+        """Delete superseded index versions beyond the newest keep_versions.
+
+        Keeping at least one previous version lets clients that read the
+        pointer just before a switch finish their reads.
+
+        Returns:
+            list: The versions that were removed.
+        """
+        if uploader is None:
+            if self.db is None:
+                self.initialize_firestore()
+            uploader = FirestoreUploader(self.db)
+        db = uploader.db
+        current = Indexer.current_index_version(db)
+        if not current:
+            return []
+
+        removed = []
+        for version in current.get('previous', [])[keep_versions:]:
+            collection = Indexer.version_collection(version)
+            deletes = []
+            for head in db.collection(collection).stream():
+                page_count = head.to_dict().get('page_count', 1)
+                deletes.extend((f"{collection}/{head.id}/pages", str(number), None) for number in range(1, page_count))
+                deletes.append((collection, head.id, None))
+            if not uploader.write(deletes, collection).failed:
+                removed.append(version)
+
+        if removed:
+            pointer = db.collection(INDEX_POINTER_COLLECTION).document(INDEX_POINTER_DOCUMENT)
+            pointer.update({'previous': [version for version in current['previous'] if version not in removed]})
+            print(f"Removed index versions {removed}")
+        return removed
+
+    @staticmethod
+    def validate_content_item(content_id, content):
+        """Check that a content item has an id and every required field."""
         # Validation: Check for missing id or any field being None/null/empty
         required_fields = ['id', 'text', 'emoji_presence', 'humor_type', 'humor_type_score']
         missing_or_invalid = [
@@ -226,6 +1276,14 @@ class Indexer:
         ]
         if not content_id or missing_or_invalid:
             print(f"Skipping content with invalid data: id={content_id}, missing/invalid fields={missing_or_invalid}")
+            return False
+        return True
+
+    @staticmethod
+    def upload_content_item(content_data, db=None):
+        """Upload a single content item to Firestore with validation."""
+        content_id, content, collection_name = content_data
+        if not Indexer.validate_content_item(content_id, content):
             return
 
         # Use the provided Firestore client or initialize a new one
@@ -239,36 +1297,29 @@ class Indexer:
         collection.document(content_id).set(content)
         print(f"Added content with ID ${content_id} to Firestore")
         
-    def push_content_to_firestore(self, csv_file_path: str, collection_name: str = 'content'):
+    def push_content_to_firestore(self, csv_file_path: str, collection_name: str = 'content', uploader: FirestoreUploader = None):
         """Push the actual content from a CSV file to Firestore.
 
         Args:
             csv_file_path (str): Path to the CSV file containing content.
             collection_name (str): The Firestore collection name to store the content.
+            uploader (FirestoreUploader, optional): Batched writer to use. Defaults
+                to one over this Indexer's Firestore client.
+
+        Returns:
+            UploadStats: Counts and throughput of the upload.
         """
         # Initialize Firestore if not already initialized
         if self.db is None:
             self.initialize_firestore()
-        content_collection = self.db.collection(collection_name)
-
-        # Read content from the CSV file
-        content_list = []
-        with open(csv_file_path, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                content_list.append({
-                    'id': row['id'],
-                    'text': row['text'],
-                    'emoji_presence': row['emoji_presence'].lower() == 'true',
-                    'humor_type': row['humor_type'],
-                    'humor_type_score': float(row['humor_type_score'])
-                })
 
-        # Prepare data for parallel processing
-        content_data_list = [
-            (content['id'], content, collection_name) for content in content_list if content.get('id')
-        ]
+        # Stream content from the CSV file, skipping invalid rows
+        content_data = (
+            (content['id'], content) for content in read_records(csv_file_path)
+            if Indexer.validate_content_item(content['id'], content)
+        )
 
-        # Use parallel processing to upload content
-        with Pool(cpu_count()) as pool:
-            pool.map(Indexer.upload_content_item, content_data_list)
\ No newline at end of file
+        # Batched writes over the shared client
+        if uploader is None:
+            uploader = FirestoreUploader(self.db)
+        return uploader.upload(collection_name, content_data)
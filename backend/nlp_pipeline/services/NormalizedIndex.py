@@ -0,0 +1,122 @@
+import json
+from collections.abc import Mapping
+from backend.nlp_pipeline.services.BinaryIndex import doc_sort_key
+
+# Per-document attributes every content_index posting used to repeat
+DOCUMENT_FIELDS = ('id', 'humor_type', 'emoji_presence', 'humor_type_score')
+NORMALIZED_FORMAT = 'normalized-v1'
+
+
+def is_normalized_index(data):
+    """Return True if a decoded JSON index uses the normalized layout.
+
+    A plain content_index maps terms to lists, so a string under 'format'
+    cannot be confused with a term.
+    """
+    return isinstance(data, dict) and data.get('format') == NORMALIZED_FORMAT
+
+
+class NormalizedIndex(Mapping):
+    """A content index whose postings hold only (doc ordinal, weight).
+
+    Document attributes live once in a document table indexed by ordinal
+    instead of being copied into every posting of every term of the document.
+    The class is a read-only mapping with the content_index interface: looking
+    up a term joins its postings with the document table on demand, so code
+    written against {term: [posting, ...]} keeps working while only the terms
+    that are actually read are expanded.
+
+    Indexes built with from_content_index also store the static prior of every
+    document and keep each term's postings in descending weight x prior
+    order, the order QueryEngine.search_by_impact reads them in.
+    """
+
+    def __init__(self, documents, terms, priors=None):
+        """
+        Args:
+            documents (list): [id, humor_type, emoji_presence, humor_type_score]
+                rows, one per document ordinal.
+            terms (dict): term -> [[ordinal, weight], ...].
+            priors (list, optional): The static prior of every document
+                ordinal. When given, postings are in impact order.
+        """
+        self.documents = documents
+        self.terms = terms
+        self.priors = priors
+
+    @classmethod
+    def from_content_index(cls, content_index, doc_priors=None):
+        """Split a {term: [posting, ...]} index into postings and a document table.
+
+        Args:
+            content_index (dict): The index produced by Indexer.build_index.
+            doc_priors (dict, optional): doc_id -> static prior. Documents
+                without one get 1.0.
+        """
+        rows = {}
+        for content in content_index.values():
+            for posting in content:
+                rows.setdefault(str(posting['id']), [posting[field] for field in DOCUMENT_FIELDS])
+        doc_ids = sorted(rows, key=doc_sort_key)
+        ordinals = {doc_id: ordinal for ordinal, doc_id in enumerate(doc_ids)}
+        priors = [float((doc_priors or {}).get(doc_id, 1.0)) for doc_id in doc_ids]
+        terms = {
+            # Ties keep ordinal order, as QueryEngine's own impact ordering does
+            term: sorted(
+                ([ordinals[str(posting['id'])], posting['weight']] for posting in content),
+                key=lambda posting: (-(posting[1] * priors[posting[0]]), posting[0]),
+            )
+            for term, content in content_index.items()
+        }
+        return cls([rows[doc_id] for doc_id in doc_ids], terms, priors)
+
+    @classmethod
+    def from_dict(cls, data):
+        if not is_normalized_index(data):
+            raise ValueError(f"Not a {NORMALIZED_FORMAT} index")
+        return cls(data['documents'], data['terms'], data.get('priors'))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        return {
+            'format': NORMALIZED_FORMAT,
+            'fields': list(DOCUMENT_FIELDS),
+            'documents': self.documents,
+            'priors': self.priors,
+            'terms': self.terms,
+        }
+
+    def write(self, output_path):
+        """Write the index as compact JSON and return output_path."""
+        with open(output_path, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        return output_path
+
+    def document(self, ordinal):
+        """Return the attributes of a document as a posting-shaped dict."""
+        return dict(zip(DOCUMENT_FIELDS, self.documents[ordinal]))
+
+    def postings(self, term):
+        """Return the raw (ordinal, weight) postings of term without joining."""
+        return [tuple(posting) for posting in self.terms.get(term, [])]
+
+    def __getitem__(self, term):
+        content = []
+        for ordinal, weight in self.terms[term]:
+            posting = self.document(ordinal)
+            posting['weight'] = weight
+            content.append(posting)
+        return content
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        return term in self.terms
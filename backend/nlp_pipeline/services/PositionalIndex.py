@@ -0,0 +1,128 @@
+from collections import defaultdict
+from backend.nlp_pipeline.services.BinaryIndex import decode_varints, encode_varint
+
+
+def encode_positions(positions):
+    """Delta- and varint-encode an ascending list of token offsets."""
+    out = bytearray()
+    encode_varint(len(positions), out)
+    previous = 0
+    for position in positions:
+        encode_varint(position - previous, out)
+        previous = position
+    return bytes(out)
+
+
+def decode_positions(data):
+    """Decode the token offsets written by encode_positions."""
+    (count,), pos = decode_varints(data, 1)
+    gaps, _ = decode_varints(data, count, pos)
+    positions = []
+    position = 0
+    for gap in gaps:
+        position += gap
+        positions.append(position)
+    return positions
+
+
+def positions_by_term(terms):
+    """Map each term of a processed document to its ascending token offsets."""
+    positions = defaultdict(list)
+    for offset, term in enumerate(terms):
+        positions[term].append(offset)
+    return {term: encode_positions(offsets) for term, offsets in positions.items()}
+
+
+def intersect_positions(left, right, distance):
+    """Return the offsets in right that sit exactly distance after one in left.
+
+    Both lists are ascending, so this is a single linear merge.
+    """
+    matches = []
+    i = 0
+    for position in right:
+        target = position - distance
+        while i < len(left) and left[i] < target:
+            i += 1
+        if i < len(left) and left[i] == target:
+            matches.append(position)
+    return matches
+
+
+def within_window(position_lists, window):
+    """Check whether one offset of every list fits in a span of window tokens.
+
+    The lists are merged in offset order while a sliding window tracks the
+    latest offset of every term; the smallest span covering all terms is
+    compared against window.
+    """
+    merged = sorted((position, index) for index, positions in enumerate(position_lists) for position in positions)
+    latest = {}
+    for position, index in merged:
+        latest[index] = position
+        if len(latest) == len(position_lists) and position - min(latest.values()) < window:
+            return True
+    return False
+
+
+class PositionalIndex:
+    """Compressed token offsets per term and document for phrase queries.
+
+    Offsets count positions in the processed term sequence produced by
+    Indexer.process_record, so stop words removed by preprocessing do not
+    break a phrase ("pie in the face" matches the terms "pie face").
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> doc_id -> encoded offsets
+
+    def add_document(self, doc_id, terms):
+        for term, encoded in positions_by_term(terms).items():
+            self.postings[term][doc_id] = encoded
+
+    def add_encoded(self, term, doc_id, encoded):
+        self.postings[term][doc_id] = encoded
+
+    def remove_document(self, doc_id, terms):
+        for term in set(terms):
+            term_postings = self.postings.get(term)
+            if term_postings is not None:
+                term_postings.pop(doc_id, None)
+                if not term_postings:
+                    del self.postings[term]
+
+    def positions(self, term, doc_id):
+        encoded = self.postings.get(term, {}).get(doc_id)
+        return decode_positions(encoded) if encoded is not None else []
+
+    def _candidates(self, terms):
+        """Documents containing every term, checked from the rarest term up."""
+        if not terms or any(term not in self.postings for term in terms):
+            return []
+        rarest = min(set(terms), key=lambda term: len(self.postings[term]))
+        return [
+            doc_id for doc_id in self.postings[rarest]
+            if all(doc_id in self.postings[term] for term in terms)
+        ]
+
+    def phrase_query(self, terms):
+        """Return the ids of documents containing terms as consecutive tokens."""
+        matches = []
+        for doc_id in self._candidates(terms):
+            # Offsets where the phrase could start, narrowed one term at a time
+            starts = self.positions(terms[0], doc_id)
+            for distance, term in enumerate(terms[1:], start=1):
+                starts = [p - distance for p in intersect_positions(starts, self.positions(term, doc_id), distance)]
+                if not starts:
+                    break
+            if starts:
+                matches.append(doc_id)
+        return matches
+
+    def proximity_query(self, terms, window):
+        """Return the ids of documents with all terms inside a span of window tokens."""
+        unique_terms = list(dict.fromkeys(terms))
+        return [
+            doc_id for doc_id in self._candidates(unique_terms)
+            if within_window([self.positions(term, doc_id) for term in unique_terms], window)
+        ]
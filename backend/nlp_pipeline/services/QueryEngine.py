@@ -0,0 +1,663 @@
+import heapq
+import json
+from bisect import bisect_left
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+from backend.nlp_pipeline.services.BinaryIndex import BinaryIndexReader, doc_sort_key, is_binary_index
+from backend.nlp_pipeline.services.NormalizedIndex import NormalizedIndex, is_normalized_index
+from backend.nlp_pipeline.services.ScoringModels import CorpusStatistics, TfIdfModel, get_scoring_model, score_candidates
+
+TermPostings = namedtuple('TermPostings', ['ordinals', 'tfs', 'weights', 'max_weight'])
+# Terms each cache of an engine keeps decoded
+CACHE_SIZE = 1024
+
+
+class SegmentImpacts:
+    """A binary index's ImpactSegment as (ordinal, weight x prior) pairs.
+
+    Entries are weighted as they are read, so only the prefix a search reads
+    is decoded.
+    """
+
+    def __init__(self, segment, priors):
+        self.segment = segment
+        self.priors = priors
+
+    def __len__(self):
+        return len(self.segment)
+
+    def __getitem__(self, position):
+        ordinal, weight = self.segment[position]
+        return ordinal, weight * float(self.priors[ordinal])
+
+
+class PostingCursor:
+    """Iterates over one query term's postings in document-ordinal order."""
+
+    def __init__(self, ordinals, weights, query_weight, max_weight):
+        self.ordinals = ordinals
+        self.weights = weights
+        self.query_weight = query_weight
+        self.upper_bound = query_weight * max_weight
+        self.position = 0
+
+    @property
+    def doc(self):
+        return self.ordinals[self.position] if self.position < len(self.ordinals) else None
+
+    def score(self):
+        return self.query_weight * self.weights[self.position]
+
+    def next(self):
+        self.position += 1
+
+    def advance_to(self, ordinal):
+        """Skip forward to the first posting with a document ordinal >= ordinal."""
+        self.position = bisect_left(self.ordinals, ordinal, self.position)
+
+
+def gallop_to(ordinals, target, start=0):
+    """Return the first position at or after start whose ordinal is >= target.
+
+    The search probes start + 1, 3, 7, ... until it overshoots and then binary
+    searches the last gap, so skipping d postings costs O(log d) comparisons
+    instead of d.
+    """
+    if start >= len(ordinals) or ordinals[start] >= target:
+        return start
+    step = 1
+    low = start
+    high = start + step
+    while high < len(ordinals) and ordinals[high] < target:
+        low = high
+        step *= 2
+        high = start + step
+    return bisect_left(ordinals, target, low + 1, min(high, len(ordinals)))
+
+
+def union_postings(posting_lists):
+    """Merge ascending ordinal lists into one without duplicates."""
+    result = []
+    for ordinal in heapq.merge(*posting_lists):
+        if not result or result[-1] != ordinal:
+            result.append(ordinal)
+    return result
+
+
+class ListLookup:
+    """Finds single postings in decoded TermPostings.
+
+    Probes usually come in ascending ordinal order, so each one gallops
+    forward from the last position, like BinaryIndex.PostingLookup decodes
+    each block at most once.
+    """
+
+    def __init__(self, postings):
+        self.postings = postings
+        self.position = 0
+
+    def find(self, ordinal):
+        """Return the (term_freq, weight) of the document with this ordinal, or None."""
+        ordinals = self.postings.ordinals
+        if self.position and ordinals[self.position - 1] >= ordinal:
+            self.position = 0
+        self.position = gallop_to(ordinals, ordinal, self.position)
+        if self.position < len(ordinals) and ordinals[self.position] == ordinal:
+            return self.postings.tfs[self.position], self.postings.weights[self.position]
+        return None
+
+
+class QueryEngine:
+    """Scores content against preprocessed queries over the Indexer output.
+
+    The engine reads an in-memory content_index ({term: [posting, ...]}), a
+    NormalizedIndex or a BinaryIndexReader, including a SharedIndex. Only a plain content_index is decoded up front;
+    the other layouts decode a term when it is looked up and keep the most
+    recently used ones in LRU caches of cache_size terms, so a long-running
+    server worker holds only the terms it is searching, not a private copy
+    of every term it was ever asked for.
+    Postings are kept as parallel, ordinal-sorted lists
+    of documents, term frequencies and weights. The stored TF-IDF weights are
+    scored with WAND: documents whose score upper bound cannot reach the
+    current top-k are skipped without being scored. Other scoring models run
+    as a vectorized pass over the candidate postings.
+
+    Searches can be restricted to humor types. A binary index then decodes
+    only the matching partitions of each term, so a filtered search does work
+    in proportion to the postings of the requested types.
+
+    With document priors, search_by_impact ranks by weight x prior over
+    impact-ordered postings and stops once no unread posting can change the
+    top-k, so frequent terms cost about the same however long their lists are.
+    """
+
+    def __init__(self, index, term_freq=None, doc_stats=None, doc_priors=None, cache_size: int = CACHE_SIZE):
+        """
+        Args:
+            index: A content_index dict, a NormalizedIndex or a BinaryIndexReader
+                such as a SharedIndex.
+            term_freq (dict, optional): term -> doc_id -> tf for a dict index,
+                needed by models such as BM25.
+            doc_stats (dict, optional): doc_id -> {'length', 'norm'} for a dict
+                index. Norms are computed from the weights when it is missing.
+            doc_priors (dict, optional): doc_id -> static prior used by
+                search_by_impact, in place of the priors a binary or normalized
+                index stores. Documents without one get the neutral 1.0.
+            cache_size (int): Terms kept decoded by each cache.
+        """
+        self.reader = index if isinstance(index, BinaryIndexReader) else None
+        self.normalized = index if isinstance(index, NormalizedIndex) else None
+        # Postings of a content_index, decoded up front; other layouts decode
+        # them on demand through the caches
+        self._postings = {} if self.reader is None and self.normalized is None else None
+        self._init_caches(cache_size)
+        self._statistics = None
+        self.doc_priors = doc_priors
+        self._priors = None
+        self.last_postings_scored = 0
+
+        if self.normalized is not None:
+            # The document table is already in ordinal order, and postings are
+            # read per term in term_postings
+            documents = [index.document(ordinal) for ordinal in range(len(index.documents))]
+            self.doc_ids = [str(document['id']) for document in documents]
+            self.doc_humor_types = [str(document['humor_type']) for document in documents]
+            self.has_term_freqs = False
+            if doc_stats:
+                self._statistics = CorpusStatistics(
+                    [doc_stats[doc_id]['length'] for doc_id in self.doc_ids],
+                    [doc_stats[doc_id]['norm'] for doc_id in self.doc_ids],
+                )
+        elif self.reader is None:
+            doc_ids = sorted({str(posting['id']) for content in index.values() for posting in content}, key=doc_sort_key)
+            doc_ordinals = {doc_id: ordinal for ordinal, doc_id in enumerate(doc_ids)}
+            self.doc_ids = doc_ids
+            self.doc_ordinals = doc_ordinals
+            self.doc_humor_types = [None] * len(doc_ids)
+            self.has_term_freqs = term_freq is not None
+            doc_lengths = [0] * len(doc_ids)
+            squared_norms = [0.0] * len(doc_ids)
+            for term, content in index.items():
+                term_freqs = term_freq.get(term, {}) if term_freq else {}
+                postings = sorted(
+                    (doc_ordinals[str(posting['id'])], term_freqs.get(posting['id'], 0), posting['weight'])
+                    for posting in content
+                )
+                for posting in content:
+                    self.doc_humor_types[doc_ordinals[str(posting['id'])]] = str(posting['humor_type'])
+                for ordinal, tf, weight in postings:
+                    doc_lengths[ordinal] += tf
+                    squared_norms[ordinal] += weight * weight
+                self._postings[term] = self._to_term_postings(*zip(*postings)) if postings else None
+
+            if doc_stats:
+                doc_lengths = [doc_stats[doc_id]['length'] for doc_id in doc_ids]
+                doc_norms = [doc_stats[doc_id]['norm'] for doc_id in doc_ids]
+            else:
+                doc_norms = [norm ** 0.5 for norm in squared_norms]
+            self._statistics = CorpusStatistics(doc_lengths, doc_norms)
+        else:
+            self.has_term_freqs = self.reader.has_term_freqs
+
+    @classmethod
+    def from_file(cls, index_file_path: str):
+        """Create an engine over a JSON, normalized JSON or binary content index file."""
+        if is_binary_index(index_file_path):
+            return cls(BinaryIndexReader(index_file_path))
+        with open(index_file_path, 'r') as f:
+            data = json.load(f)
+        return cls(NormalizedIndex.from_dict(data) if is_normalized_index(data) else data)
+
+    def _init_caches(self, cache_size):
+        self._decoded_postings = lru_cache(maxsize=cache_size)(self._decode_postings)
+        self._filtered_postings = lru_cache(maxsize=cache_size)(self._decode_postings_of_types)
+        self._impact_postings = lru_cache(maxsize=cache_size)(self._decode_impact_postings)
+
+    @staticmethod
+    def _to_term_postings(ordinals, tfs, weights):
+        return TermPostings(list(ordinals), list(tfs), list(weights), max(weights, default=0.0))
+
+    def term_postings(self, term, humor_types=None):
+        """Return the TermPostings of term, decoding it once, or None.
+
+        Args:
+            term (str): The term to read.
+            humor_types (iterable, optional): Keep only postings of these humor types.
+        """
+        if humor_types is not None:
+            return self._filtered_postings(term, frozenset(str(humor_type) for humor_type in humor_types))
+        if self._postings is not None:
+            return self._postings.get(term)
+        return self._decoded_postings(term)
+
+    def _decode_postings(self, term):
+        if self.normalized is not None:
+            postings = sorted(self.normalized.postings(term))
+            ordinals = [ordinal for ordinal, _ in postings]
+            tfs, weights = [0] * len(postings), [weight for _, weight in postings]
+        else:
+            ordinals, tfs, weights = self.reader.term_postings(term)
+        return self._to_term_postings(ordinals, tfs, weights) if len(ordinals) else None
+
+    def _decode_postings_of_types(self, term, humor_types):
+        if self.reader is not None:
+            ordinals, tfs, weights = self.reader.term_postings(term, humor_types)
+        else:
+            # Postings of an in-memory index are filtered by the document table
+            postings = self.term_postings(term)
+            entries = [
+                entry for entry in zip(postings.ordinals, postings.tfs, postings.weights)
+                if self.doc_humor_types[entry[0]] in humor_types
+            ] if postings else []
+            ordinals, tfs, weights = zip(*entries) if entries else ([], [], [])
+        return self._to_term_postings(ordinals, tfs, weights) if len(ordinals) else None
+
+    def posting_lookup(self, term):
+        """Return a lookup whose find(ordinal) gives term's (tf, weight) in one document, or None.
+
+        Binary index terms are probed through their skip tables, so checking
+        a few documents never decodes the whole list.
+        """
+        if self.reader is not None:
+            return self.reader.posting_lookup(term)
+        postings = self.term_postings(term)
+        return ListLookup(postings) if postings else None
+
+    def doc_freq(self, term):
+        """Number of documents containing term, whatever humor types a search keeps."""
+        if self.reader is not None:
+            return self.reader.doc_freq(term)
+        postings = self.term_postings(term)
+        return len(postings.ordinals) if postings else 0
+
+    def stored_priors(self):
+        """Return the priors stored in a binary or normalized index, or None.
+
+        Priors passed to the engine take their place, and so does the impact
+        order stored with them.
+        """
+        if self.doc_priors is not None:
+            return None
+        if self.reader is not None:
+            return self.reader.doc_priors()
+        if self.normalized is not None:
+            return self.normalized.priors
+        return None
+
+    def priors(self):
+        """Return the static prior of every document as an ordinal-indexed array."""
+        if self._priors is None:
+            stored_priors = self.stored_priors()
+            if stored_priors is not None:
+                self._priors = np.array(stored_priors, dtype=np.float64)
+            else:
+                if self.reader is not None:
+                    doc_ids = [self.reader.document(ordinal)['id'] for ordinal in range(self.reader.doc_count)]
+                else:
+                    doc_ids = self.doc_ids
+                doc_priors = self.doc_priors or {}
+                self._priors = np.array([doc_priors.get(doc_id, 1.0) for doc_id in doc_ids], dtype=np.float64)
+        return self._priors
+
+    def impact_postings(self, term):
+        """Return the postings of term as (ordinal, impact) pairs by descending impact, or None.
+
+        Binary and normalized indexes store every term in impact order, so
+        only in-memory indexes and engines given their own priors sort. A
+        binary index's pairs are decoded as they are read, see SegmentImpacts.
+        """
+        return self._impact_postings(term)
+
+    def _decode_impact_postings(self, term):
+        priors = self.priors()
+        if self.reader is not None and self.doc_priors is None:
+            segment = self.reader.impact_segment(term)
+            return SegmentImpacts(segment, priors) if segment else None
+        if self.normalized is not None and self.normalized.priors is not None and self.doc_priors is None:
+            stored = self.normalized.postings(term)
+            return [(ordinal, weight * float(priors[ordinal])) for ordinal, weight in stored] if stored else None
+        postings = self.term_postings(term)
+        if postings is None:
+            return None
+        ordinals = np.asarray(postings.ordinals, dtype=np.int64)
+        impacts = np.asarray(postings.weights, dtype=np.float64) * priors[ordinals]
+        order = np.argsort(-impacts, kind='stable')
+        return list(zip(ordinals[order].tolist(), impacts[order].tolist()))
+
+    def statistics(self):
+        """Return the per-document statistics stored at index time.
+
+        A normalized index stores none, so its norms are computed from the raw
+        weights of every term on the first search that needs them.
+        """
+        if self._statistics is None:
+            if self.normalized is not None:
+                squared_norms = [0.0] * len(self.doc_ids)
+                for term in self.normalized:
+                    for ordinal, weight in self.normalized.postings(term):
+                        squared_norms[ordinal] += weight * weight
+                self._statistics = CorpusStatistics([0] * len(self.doc_ids), [norm ** 0.5 for norm in squared_norms])
+            else:
+                self._statistics = CorpusStatistics(*self.reader.doc_stats())
+        return self._statistics
+
+    def content_id(self, ordinal):
+        if self.reader is not None:
+            return self.reader.document(ordinal)['id']
+        return self.doc_ids[ordinal]
+
+    def search(self, term_weights: dict, k: int = 10, model=None, humor_types=None, **model_params):
+        """Return the top-k content for a query.
+
+        Args:
+            term_weights (dict): Query term -> weight, as produced by
+                DataPreprocessor.preprocess()["term_weights"].
+            k (int): Number of results to return.
+            model (str or ScoringModel, optional): 'tfidf' (default), 'bm25'
+                or 'cosine'. Model parameters such as k1 and b are passed as
+                keyword arguments.
+            humor_types (str or iterable, optional): Only return content of
+                these humor types.
+
+        Returns:
+            list: (content_id, score) tuples ordered by descending score.
+        """
+        if k <= 0 or not isinstance(term_weights, dict):
+            return []
+        if isinstance(humor_types, str):
+            humor_types = [humor_types]
+
+        scoring_model = get_scoring_model(model or TfIdfModel.name, **model_params)
+        if not isinstance(scoring_model, TfIdfModel):
+            return self._search_vectorized(term_weights, k, scoring_model, humor_types)
+
+        cursors = []
+        for term, query_weight in term_weights.items():
+            postings = self.term_postings(term, humor_types)
+            if postings and query_weight > 0:
+                cursors.append(PostingCursor(postings.ordinals, postings.weights, query_weight, postings.max_weight))
+
+        top_k = []  # Min-heap of (score, -ordinal)
+        while cursors:
+            threshold = top_k[0][0] if len(top_k) == k else float('-inf')
+            cursors.sort(key=lambda cursor: cursor.doc)
+
+            # The pivot is the first document whose cumulative upper bound can
+            # still beat the current k-th score
+            upper_bound = 0.0
+            pivot = None
+            for i, cursor in enumerate(cursors):
+                upper_bound += cursor.upper_bound
+                if upper_bound > threshold:
+                    pivot = i
+                    break
+            if pivot is None:
+                break
+
+            pivot_doc = cursors[pivot].doc
+            if cursors[0].doc == pivot_doc:
+                # Every cursor up to the pivot is on the pivot document: score it
+                score = 0.0
+                for cursor in cursors:
+                    if cursor.doc != pivot_doc:
+                        break
+                    score += cursor.score()
+                    cursor.next()
+                if len(top_k) < k:
+                    heapq.heappush(top_k, (score, -pivot_doc))
+                elif score > threshold:
+                    heapq.heapreplace(top_k, (score, -pivot_doc))
+            else:
+                # Documents before the pivot cannot make the top-k
+                for cursor in cursors[:pivot]:
+                    cursor.advance_to(pivot_doc)
+
+            cursors = [cursor for cursor in cursors if cursor.doc is not None]
+
+        results = sorted(top_k, key=lambda entry: (-entry[0], -entry[1]))
+        return [(self.content_id(-negative_ordinal), round(float(score), 4)) for score, negative_ordinal in results]
+
+    def search_by_impact(self, term_weights: dict, k: int = 10):
+        """Return the top-k content by query weight x TF-IDF weight x static prior.
+
+        Postings of all query terms are consumed in one global descending
+        impact order. A document is scored exactly the first time it is seen,
+        by looking up its weights in the other terms with posting_lookup,
+        which decodes a single block of a binary index. The search stops as soon as
+        the k-th best score reaches the sum of the next impacts of every term,
+        since no unseen document can beat it, so only a prefix of each term's
+        impact order is read. The number of postings read is kept in
+        last_postings_scored.
+
+        Returns:
+            list: (content_id, score) tuples ordered by descending score.
+        """
+        self.last_postings_scored = 0
+        if k <= 0 or not isinstance(term_weights, dict):
+            return []
+
+        cursors = []
+        for term, query_weight in term_weights.items():
+            postings = self.impact_postings(term)
+            if postings and query_weight > 0:
+                cursors.append((query_weight, postings, self.posting_lookup(term)))
+        positions = [0] * len(cursors)
+        bounds = [query_weight * postings[0][1] for query_weight, postings, _ in cursors]
+        frontier = [(-bound, i) for i, bound in enumerate(bounds)]
+        heapq.heapify(frontier)
+
+        priors = self.priors()
+        scored = set()
+        top_k = []  # Min-heap of (score, -ordinal)
+        while frontier:
+            _, i = heapq.heappop(frontier)
+            query_weight, postings, _ = cursors[i]
+            ordinal, impact = postings[positions[i]]
+            positions[i] += 1
+            self.last_postings_scored += 1
+            if positions[i] < len(postings):
+                bounds[i] = query_weight * postings[positions[i]][1]
+                heapq.heappush(frontier, (-bounds[i], i))
+            else:
+                bounds[i] = 0.0
+
+            if ordinal not in scored:
+                scored.add(ordinal)
+                score = query_weight * impact
+                for j, (term_weight, _, lookup) in enumerate(cursors):
+                    found = lookup.find(ordinal) if j != i else None
+                    if found:
+                        score += term_weight * found[1] * priors[ordinal]
+                if len(top_k) < k:
+                    heapq.heappush(top_k, (score, -ordinal))
+                elif (score, -ordinal) > top_k[0]:
+                    heapq.heapreplace(top_k, (score, -ordinal))
+
+            if len(top_k) == k and top_k[0][0] >= sum(bounds):
+                break
+
+        results = sorted(top_k, key=lambda entry: (-entry[0], -entry[1]))
+        return [(self.content_id(-negative_ordinal), round(float(score), 4)) for score, negative_ordinal in results]
+
+    def boolean_search(self, must=(), should=(), must_not=(), k: int = 10, term_weights: dict = None):
+        """Return the top-k content matching a Boolean query.
+
+        A document matches when it contains every must term (AND), at least
+        one should term if any are given (OR) and no must_not term (NOT), the
+        same mustContain/canContain semantics ScrapQuery uses for scraping.
+        Only the rarest must term is read in full. Every other term is probed
+        for its candidates with posting_lookup, galloping over decoded lists
+        or over the skip tables of a binary index, so a rare term combined
+        with common ones costs about the rare list's length. Matches are
+        ranked by the TF-IDF weights of the must and should terms they contain.
+
+        Args:
+            must, should, must_not (iterable): Index terms of each clause.
+            k (int): Number of results to return.
+            term_weights (dict, optional): Query weight per term, 1.0 by default.
+
+        Returns:
+            list: (content_id, score) tuples ordered by descending score.
+        """
+        must, should, must_not = list(must), list(should), list(must_not)
+        if k <= 0 or not (must or should):
+            return []
+        term_weights = term_weights or {}
+
+        def ordinals(term):
+            postings = self.term_postings(term)
+            return postings.ordinals if postings else []
+
+        lookups = {term: self.posting_lookup(term) for term in dict.fromkeys(must + should + must_not)}
+
+        if must:
+            must = sorted(dict.fromkeys(must), key=self.doc_freq)
+            candidates = ordinals(must[0])
+            for term in must[1:]:
+                term_lookup = lookups[term]
+                candidates = [ordinal for ordinal in candidates if term_lookup and term_lookup.find(ordinal)]
+            if should:
+                should_lookups = [lookups[term] for term in should if lookups[term]]
+                candidates = [
+                    ordinal for ordinal in candidates
+                    if any(term_lookup.find(ordinal) for term_lookup in should_lookups)
+                ]
+        else:
+            candidates = union_postings([ordinals(term) for term in should])
+        for term in must_not:
+            term_lookup = lookups[term]
+            if term_lookup:
+                candidates = [ordinal for ordinal in candidates if not term_lookup.find(ordinal)]
+
+        scores = [0.0] * len(candidates)
+        for term in dict.fromkeys(must + should):
+            term_lookup = lookups[term]
+            if not term_lookup:
+                continue
+            query_weight = term_weights.get(term, 1.0)
+            for i, ordinal in enumerate(candidates):
+                found = term_lookup.find(ordinal)
+                if found:
+                    scores[i] += query_weight * found[1]
+
+        top_k = heapq.nsmallest(k, zip(scores, candidates), key=lambda entry: (-entry[0], entry[1]))
+        return [(self.content_id(ordinal), round(float(score), 4)) for score, ordinal in top_k]
+
+    def search_by_type_counts(self, term_weights: dict, type_counts: dict, model=None, **model_params):
+        """Return the top content of each humor type for a type-proportional feed.
+
+        Args:
+            term_weights (dict): Query term -> weight.
+            type_counts (dict): humor_type -> number of results wanted.
+
+        Returns:
+            dict: humor_type -> (content_id, score) tuples, best first.
+        """
+        return {
+            humor_type: self.search(term_weights, count, model=model, humor_types=[humor_type], **model_params)
+            for humor_type, count in type_counts.items()
+            if count > 0
+        }
+
+    def _search_vectorized(self, term_weights, k, scoring_model, humor_types=None):
+        """Score every candidate posting of the query with scoring_model."""
+        if scoring_model.needs_term_freqs and not self.has_term_freqs:
+            raise ValueError(f"The '{scoring_model.name}' model needs term frequencies, which this index does not store")
+
+        term_postings = {}
+        doc_freqs = {}
+        for term, query_weight in term_weights.items():
+            postings = self.term_postings(term, humor_types)
+            if postings and query_weight > 0:
+                term_postings[term] = (
+                    np.asarray(postings.ordinals, dtype=np.int64),
+                    np.asarray(postings.tfs, dtype=np.float64),
+                    np.asarray(postings.weights, dtype=np.float64),
+                )
+                # A humor type filter narrows the candidates, not the IDF
+                doc_freqs[term] = self.doc_freq(term)
+
+        results = score_candidates(scoring_model, term_postings, term_weights, self.statistics(), k, doc_freqs)
+        return [(self.content_id(ordinal), round(score, 4)) for ordinal, score in results]
+
+
+class OverlayQueryEngine(QueryEngine):
+    """A QueryEngine over a base engine and the updates made since it was built.
+
+    Indexer.add_documents and delete_documents change the live statistics,
+    but content_index is only rematerialized by Indexer.compact(). Instead of
+    rebuilding every term, this engine keeps the base engine's postings and
+    merges in, per term and on first lookup, the postings of the documents
+    added since, less those of deleted or replaced base documents. Added
+    documents get ordinals after the base ones, so a merged list stays in
+    ordinal order by appending. Weights are tf x the live IDF, as
+    Indexer.get_postings computes them.
+
+    The engine reads the Indexer's live dicts, so it is only valid until the
+    next update; Indexer.query_engine() creates a new one after each.
+    """
+
+    def __init__(self, base, added_ids, added_postings, deleted_ids, idf, documents, doc_stats, doc_priors=None,
+                 cache_size: int = CACHE_SIZE):
+        """
+        Args:
+            base (QueryEngine): Engine over the in-memory index as of the last
+                compaction, with term frequencies.
+            added_ids (list): Ids of the documents added since, in order.
+            added_postings (dict): term -> doc_id -> tf of those documents.
+            deleted_ids (set): Ids of base documents deleted or replaced since.
+            idf (callable): term -> IDF under the live corpus statistics.
+            documents (dict): doc_id -> record, for the added documents' humor types.
+            doc_stats (dict): doc_id -> {'length', 'norm'} of the added documents.
+            doc_priors (dict, optional): doc_id -> static prior, as for QueryEngine.
+            cache_size (int): Merged terms kept by each cache.
+        """
+        self.reader = None
+        self.normalized = None
+        self.base = base
+        self._postings = None
+        self._init_caches(cache_size)
+        self._statistics = None
+        self.doc_priors = doc_priors
+        self._priors = None
+        self.last_postings_scored = 0
+
+        self.doc_ids = base.doc_ids + list(added_ids)
+        self.doc_humor_types = base.doc_humor_types + [str(documents[doc_id]['humor_type']) for doc_id in added_ids]
+        self.has_term_freqs = base.has_term_freqs
+        self._added_ordinals = {doc_id: len(base.doc_ids) + i for i, doc_id in enumerate(added_ids)}
+        self._added_postings = added_postings
+        self._deleted = {base.doc_ordinals[doc_id] for doc_id in deleted_ids if doc_id in base.doc_ordinals}
+        self._idf = idf
+        self._doc_stats = doc_stats
+
+    def _decode_postings(self, term):
+        idf = self._idf(term)
+        base_postings = self.base.term_postings(term)
+        entries = [
+            (ordinal, tf, round(tf * idf, 4))
+            for ordinal, tf in zip(base_postings.ordinals, base_postings.tfs)
+            if ordinal not in self._deleted
+        ] if base_postings else []
+        entries.extend(sorted(
+            (self._added_ordinals[doc_id], tf, round(tf * idf, 4))
+            for doc_id, tf in self._added_postings.get(term, {}).items()
+        ))
+        return self._to_term_postings(*zip(*entries)) if entries else None
+
+    def statistics(self):
+        """Return the base statistics followed by those of the added documents.
+
+        Base documents keep the norms of the last compaction until the next
+        one, while the IDF drifts with the updates.
+        """
+        if self._statistics is None:
+            base_statistics = self.base.statistics()
+            added_stats = [self._doc_stats[doc_id] for doc_id in self._added_ordinals]
+            self._statistics = CorpusStatistics(
+                np.concatenate([base_statistics.doc_lengths, [stats['length'] for stats in added_stats]]),
+                np.concatenate([base_statistics.doc_norms, [stats['norm'] for stats in added_stats]]),
+                deleted=self._deleted,
+            )
+        return self._statistics
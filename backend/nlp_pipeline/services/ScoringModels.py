@@ -0,0 +1,133 @@
+import math
+import numpy as np
+
+
+class CorpusStatistics:
+    """Per-document statistics stored at index time, indexed by doc ordinal."""
+
+    def __init__(self, doc_lengths, doc_norms, deleted=()):
+        """
+        Args:
+            doc_lengths, doc_norms (list): Statistics of every document ordinal.
+            deleted (iterable, optional): Ordinals of documents removed since
+                the index was built. They keep their slots but are left out of
+                the document count and the average length.
+        """
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float64)
+        self.doc_norms = np.asarray(doc_norms, dtype=np.float64)
+        live = np.ones(len(self.doc_lengths), dtype=bool)
+        live[list(deleted)] = False
+        self.doc_count = int(live.sum())
+        self.avg_doc_length = float(self.doc_lengths[live].mean()) if self.doc_count else 0.0
+
+
+class ScoringModel:
+    """Scores the postings of one query term.
+
+    Subclasses return the contribution of a term to each candidate document as
+    a numpy array, so a query is scored in one vectorized pass per term.
+    """
+
+    name = None
+    needs_term_freqs = False
+
+    def score_term(self, ordinals, tfs, weights, doc_freq, query_weight, stats):
+        raise NotImplementedError
+
+    def finalize(self, scores, term_weights):
+        """Apply any query-level normalization to the accumulated scores."""
+        return scores
+
+
+class TfIdfModel(ScoringModel):
+    """The raw tf * idf weights computed by Indexer."""
+
+    name = 'tfidf'
+
+    def score_term(self, ordinals, tfs, weights, doc_freq, query_weight, stats):
+        return query_weight * weights
+
+
+class BM25Model(ScoringModel):
+    """Okapi BM25 with document-length normalization."""
+
+    name = 'bm25'
+    needs_term_freqs = True
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score_term(self, ordinals, tfs, weights, doc_freq, query_weight, stats):
+        idf = math.log(1 + (stats.doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+        avg_doc_length = stats.avg_doc_length or 1.0
+        length_norm = 1 - self.b + self.b * stats.doc_lengths[ordinals] / avg_doc_length
+        return query_weight * idf * tfs * (self.k1 + 1) / (tfs + self.k1 * length_norm)
+
+
+class CosineModel(ScoringModel):
+    """Cosine similarity between the query and the documents' tf-idf vectors."""
+
+    name = 'cosine'
+
+    def score_term(self, ordinals, tfs, weights, doc_freq, query_weight, stats):
+        norms = stats.doc_norms[ordinals]
+        return np.divide(query_weight * weights, norms, out=np.zeros_like(weights), where=norms > 0)
+
+    def finalize(self, scores, term_weights):
+        query_norm = math.sqrt(sum(weight * weight for weight in term_weights.values()))
+        return scores / query_norm if query_norm else scores
+
+
+SCORING_MODELS = {
+    TfIdfModel.name: TfIdfModel,
+    BM25Model.name: BM25Model,
+    CosineModel.name: CosineModel,
+}
+
+
+def get_scoring_model(model, **params):
+    """Return a ScoringModel instance from a model or its name."""
+    if isinstance(model, ScoringModel):
+        return model
+    if model not in SCORING_MODELS:
+        raise ValueError(f"Unknown scoring model '{model}'. Choose from {sorted(SCORING_MODELS)}")
+    return SCORING_MODELS[model](**params)
+
+
+def score_candidates(model, term_postings, term_weights, stats, k, doc_freqs=None):
+    """Score all candidate postings of a query and return the top-k.
+
+    Args:
+        model (ScoringModel): The scoring model to apply.
+        term_postings (dict): term -> (ordinals, tfs, weights) numpy arrays.
+        term_weights (dict): Query term -> weight.
+        stats (CorpusStatistics): Per-document statistics.
+        k (int): Number of results to return.
+        doc_freqs (dict, optional): term -> document frequency in the whole
+            corpus. Defaults to the number of postings given, which is only
+            right when term_postings are not filtered.
+
+    Returns:
+        list: (doc_ordinal, score) tuples ordered by descending score.
+    """
+    all_ordinals = []
+    all_scores = []
+    for term, (ordinals, tfs, weights) in term_postings.items():
+        all_ordinals.append(ordinals)
+        doc_freq = doc_freqs[term] if doc_freqs is not None else len(ordinals)
+        all_scores.append(model.score_term(ordinals, tfs, weights, doc_freq, term_weights[term], stats))
+    if not all_ordinals or k <= 0:
+        return []
+
+    candidates, inverse = np.unique(np.concatenate(all_ordinals), return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate(all_scores), minlength=len(candidates))
+    scores = model.finalize(scores, term_weights)
+
+    if k < len(candidates):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(candidates))
+    # Order by descending score, breaking ties by ascending ordinal
+    top = top[np.lexsort((candidates[top], -scores[top]))]
+    return [(int(candidates[i]), float(scores[i])) for i in top]
@@ -0,0 +1,132 @@
+import heapq
+import json
+import math
+import os
+import zlib
+from collections import defaultdict
+from multiprocessing import Pool, cpu_count
+from backend.nlp_pipeline.services.BinaryIndex import BinaryIndexReader, doc_sort_key
+from backend.nlp_pipeline.services.QueryEngine import QueryEngine
+
+# Layout of a shard directory written by Indexer.build_shards
+SHARD_FILE = 'shard_{:03d}.bin'
+GLOBAL_STATS_FILE = 'global_stats.json'
+
+
+def shard_for(doc_id, shard_count):
+    """Assign a document to a shard by a hash of its id that is stable across runs."""
+    return zlib.crc32(str(doc_id).encode('utf-8')) % shard_count
+
+
+class IndexShard:
+    """One document partition of the index, searched with global statistics.
+
+    The shard's binary index stores weights computed from its local IDF, which
+    drifts from the corpus IDF when terms are unevenly spread over shards, so
+    the shard scores its raw term frequencies against the query weights
+    already multiplied by the global IDF. By impact, each score is also
+    multiplied by the document's static prior stored in the shard.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.engine = QueryEngine(BinaryIndexReader(path))
+
+    def search(self, term_idf_weights, k, by_impact=False):
+        """Return the shard's top-k as (content_id, score) pairs.
+
+        Args:
+            term_idf_weights (dict): term -> query weight x global IDF.
+            k (int): Number of results to return.
+            by_impact (bool): Weigh each document by its static prior.
+        """
+        scores = defaultdict(float)
+        for term, weight in term_idf_weights.items():
+            postings = self.engine.term_postings(term)
+            if postings is None:
+                continue
+            for ordinal, tf in zip(postings.ordinals, postings.tfs):
+                scores[ordinal] += weight * tf
+        if by_impact:
+            priors = self.engine.priors()
+            scores = {ordinal: score * float(priors[ordinal]) for ordinal, score in scores.items()}
+        top_k = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.engine.content_id(ordinal), score) for ordinal, score in top_k]
+
+
+# Shards opened by the current worker process, kept open across queries
+_worker_shards = {}
+
+def search_shard(task):
+    """Worker task: search one shard, opening and caching it on first use."""
+    path, term_idf_weights, k, by_impact = task
+    if path not in _worker_shards:
+        _worker_shards[path] = IndexShard(path)
+    return _worker_shards[path].search(term_idf_weights, k, by_impact)
+
+
+class ShardCoordinator:
+    """Scatter-gather search over the shards written by Indexer.build_shards.
+
+    The coordinator holds only the global document count and document
+    frequencies. Each query is turned into IDF-scaled term weights once, sent
+    to every shard in a process pool, and the per-shard top-k lists are merged
+    into the global top-k. Shards are memory-mapped files, so the same layout
+    can later be served by shard processes on other machines.
+    """
+
+    def __init__(self, shard_dir: str = 'backend/nlp_pipeline/data/shards', processes: int = None):
+        with open(os.path.join(shard_dir, GLOBAL_STATS_FILE), 'r') as f:
+            stats = json.load(f)
+        self.doc_count = stats['doc_count']
+        self.doc_freqs = stats['doc_freqs']
+        self.shard_paths = [os.path.join(shard_dir, SHARD_FILE.format(number)) for number in range(stats['shard_count'])]
+        self.pool = Pool(processes or min(len(self.shard_paths), cpu_count()))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def idf(self, term: str):
+        doc_freq = self.doc_freqs.get(term, 0)
+        return math.log(self.doc_count / float(doc_freq)) if doc_freq else 0.0
+
+    def search(self, term_weights: dict, k: int = 10, by_impact: bool = False):
+        """Return the global top-k content for a query.
+
+        Args:
+            term_weights (dict): Query term -> weight.
+            k (int): Number of results to return.
+            by_impact (bool): Rank by TF-IDF x static prior, as
+                QueryEngine.search_by_impact does over a single index.
+
+        Returns:
+            list: (content_id, score) tuples ordered by descending score.
+        """
+        if k <= 0 or not isinstance(term_weights, dict):
+            return []
+        term_idf_weights = {
+            term: query_weight * self.idf(term)
+            for term, query_weight in term_weights.items()
+            if query_weight > 0 and self.idf(term) > 0
+        }
+        if not term_idf_weights:
+            return []
+
+        shard_results = self.pool.map(search_shard, [(path, term_idf_weights, k, by_impact) for path in self.shard_paths])
+        merged = heapq.nsmallest(
+            k,
+            (result for results in shard_results for result in results),
+            key=lambda result: (-result[1], doc_sort_key(result[0])),
+        )
+        return [(content_id, round(score, 4)) for content_id, score in merged]
+
+    def search_by_impact(self, term_weights: dict, k: int = 10):
+        """Return the global top-k content by query weight x TF-IDF x static prior."""
+        return self.search(term_weights, k, by_impact=True)
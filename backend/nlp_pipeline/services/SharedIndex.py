@@ -0,0 +1,90 @@
+import os
+from multiprocessing import shared_memory
+from backend.nlp_pipeline.services.BinaryIndex import BinaryIndexReader, BinaryIndexWriter
+
+# Where POSIX systems expose shared memory blocks as files
+SHARED_MEMORY_DIR = '/dev/shm'
+
+
+class SharedIndex(BinaryIndexReader):
+    """A binary index that every server worker reads from one shared copy.
+
+    The index is kept in the BinaryIndexWriter layout, either in a
+    multiprocessing.shared_memory block or in an index file whose pages are
+    shared through the OS cache, and is read with the BinaryIndexReader
+    methods. Workers only decode the postings of the terms they search; this
+    class only manages the lifetime of the shared buffer.
+    """
+
+    def __init__(self, path=None, buffer=None, shm=None, owner=False):
+        """
+        Args:
+            path (str): An index file to map, as for BinaryIndexReader.
+            buffer (optional): The memory holding the index when it is not a file.
+            shm (SharedMemory, optional): The block buffer belongs to.
+            owner (bool): Whether closing the index unlinks the block.
+        """
+        super().__init__(path, buffer=buffer)
+        self._shm = shm
+        self._owner = owner
+        self._name = shm.name if shm is not None else None
+
+    @classmethod
+    def publish(cls, content_index, term_freq=None, doc_stats=None, name=None, doc_priors=None):
+        """Copy the index into a new shared memory block owned by this process.
+
+        The owner should close() the index when serving stops, which also
+        unlinks the block.
+        """
+        data = BinaryIndexWriter.to_bytes(content_index, term_freq, doc_stats, doc_priors)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+        shm.buf[:len(data)] = data
+        return cls(buffer=shm.buf, shm=shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Attach read-only to a block published by another process.
+
+        Where the block is visible under SHARED_MEMORY_DIR it is mapped like
+        an index file, so this process never registers it with a resource
+        tracker that would unlink it on exit. Elsewhere attaching needs
+        SharedMemory's track flag, added in Python 3.13.
+        """
+        path = os.path.join(SHARED_MEMORY_DIR, name.lstrip('/'))
+        if os.path.exists(path):
+            index = cls(path)
+        else:
+            try:
+                shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                raise RuntimeError(
+                    f"Cannot attach to shared index {name} without unlinking it on exit; "
+                    "share an index file with open() instead") from None
+            index = cls(buffer=shm.buf, shm=shm)
+        index._name = name
+        return index
+
+    @staticmethod
+    def write(content_index, output_path, term_freq=None, doc_stats=None, doc_priors=None):
+        """Write the index as a binary index file that workers map with open()."""
+        return BinaryIndexWriter.write(content_index, output_path, term_freq=term_freq, doc_stats=doc_stats,
+                                       doc_priors=doc_priors)
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map an index file; its pages are shared through the OS cache."""
+        return cls(path)
+
+    @property
+    def name(self):
+        return self._name
+
+    def close(self):
+        """Release the buffer, unlinking a published block."""
+        if self._shm is None:
+            return super().close()
+        self._buffer = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
@@ -23,10 +23,19 @@ from ..services.Indexer import Indexer
 # output_path = classifier.run()
 # print(f"Classified humor saved to: {output_path}")
 
+# * Index Pruning
+# from ..services.IndexPruner import IndexPruner
+# pruner = IndexPruner(Indexer.load_index("backend/nlp_pipeline/data/content_index.json"))
+# IndexPruner.print_report(pruner.report([{}, {'term_fraction': 0.25, 'keep_top': 50}], pruner.sample_queries()))
+# pruner.write("backend/nlp_pipeline/data/content_index_pruned.json", term_fraction=0.25, keep_top=50)
+
 if __name__ == '__main__':
     # * Indexing
     indexer = Indexer()
     # indexer.push_content_to_firestore("backend/nlp_pipeline/data/classified_jokes.csv")
     # indexer.build_index("backend/nlp_pipeline/data/classified_jokes.csv")
+    # indexer.write_synonym_table()
     indexer.push_index_to_firestore("backend/nlp_pipeline/data/content_index.json")
+    # indexer.publish_index_version("backend/nlp_pipeline/data/content_index.json")
+    # indexer.collect_index_versions(keep_versions=1)
     
\ No newline at end of file
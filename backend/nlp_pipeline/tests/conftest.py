@@ -0,0 +1,174 @@
+import copy
+import random
+import threading
+from collections import defaultdict
+import pytest
+from ...shared_utils.services import SpellingCorrector as spelling_corrector_module
+from ..services.Indexer import init_worker
+
+
+# A small index with documents of several humor types, shared by the index
+# layout tests
+CONTENT_INDEX = {
+    "bear": [
+        {"id": "2", "humor_type": "2", "emoji_presence": True, "humor_type_score": 0.8, "weight": 2.1972},
+        {"id": "10", "humor_type": "3", "emoji_presence": False, "humor_type_score": 0.4, "weight": 0.4055},
+    ],
+    "scarecrow": [
+        {"id": "1", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.9, "weight": 1.0986},
+    ],
+    "outstand": [
+        {"id": "1", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.9, "weight": 0.4055},
+        {"id": "3", "humor_type": "1", "emoji_presence": False, "humor_type_score": 0.85, "weight": 0.4055},
+    ],
+}
+
+
+def random_content_index(doc_count=300, vocabulary_size=40, seed=7, humor_type_count=1, terms_per_doc=None,
+                         weight=lambda rng: rng.uniform(0.01, 5.0)):
+    """A reproducible synthetic index; documents get 1 to 8 terms unless terms_per_doc is given."""
+    rng = random.Random(seed)
+    content_index = defaultdict(list)
+    for doc in range(doc_count):
+        for term in rng.sample(range(vocabulary_size), terms_per_doc or rng.randint(1, 8)):
+            content_index[f"term{term}"].append({
+                "id": str(doc),
+                "humor_type": str(doc % humor_type_count + 1),
+                "emoji_presence": False,
+                "humor_type_score": 0.5,
+                "weight": round(weight(rng), 4),
+            })
+    return dict(content_index)
+
+
+class InMemorySnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+class InMemoryDocument:
+    def __init__(self, db, path, doc_id):
+        self._db = db
+        self._path = path
+        self.id = doc_id
+
+    def set(self, data):
+        self._db._write(self._path, self.id, data)
+
+    def update(self, data):
+        current = self._db._read(self._path, self.id) or {}
+        current.update(data)
+        self._db._write(self._path, self.id, current)
+
+    def delete(self):
+        self._db._write(self._path, self.id, None)
+
+    def get(self):
+        return InMemorySnapshot(self.id, self._db._read(self._path, self.id))
+
+
+class InMemoryCollection:
+    def __init__(self, db, path):
+        self._db = db
+        self._path = path
+
+    def document(self, doc_id):
+        return InMemoryDocument(self._db, self._path, doc_id)
+
+    def stream(self):
+        with self._db._lock:
+            documents = list(self._db.collections.get(self._path, {}).items())
+            self._db.reads += len(documents)
+        for doc_id, data in documents:
+            yield InMemorySnapshot(doc_id, copy.deepcopy(data))
+
+
+class InMemoryBatch:
+    def __init__(self, db):
+        self._db = db
+        self._operations = []
+
+    def set(self, document, data):
+        self._operations.append((document, copy.deepcopy(data)))
+
+    def delete(self, document):
+        self._operations.append((document, None))
+
+    def commit(self):
+        with self._db._lock:
+            if self._db.fail_commits > 0:
+                self._db.fail_commits -= 1
+                raise RuntimeError("Simulated Firestore commit failure")
+            if len(self._operations) > 500:
+                raise ValueError("A batch can contain at most 500 operations")
+            self._db.commits += 1
+        for document, data in self._operations:
+            document._db._write(document._path, document.id, data)
+
+
+class InMemoryFirestore:
+    """A thread-safe stand-in for the Firestore client used by the uploaders."""
+
+    def __init__(self):
+        self.collections = {}
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+        self.fail_commits = 0
+        self._lock = threading.Lock()
+
+    def collection(self, path):
+        return InMemoryCollection(self, path)
+
+    def batch(self):
+        return InMemoryBatch(self)
+
+    def _read(self, path, doc_id):
+        with self._lock:
+            self.reads += 1
+            return copy.deepcopy(self.collections.get(path, {}).get(doc_id))
+
+    def _write(self, path, doc_id, data):
+        with self._lock:
+            self.writes += 1
+            documents = self.collections.setdefault(path, {})
+            if data is None:
+                documents.pop(doc_id, None)
+            else:
+                documents[doc_id] = copy.deepcopy(data)
+
+
+@pytest.fixture
+def firestore_db():
+    """An empty in-memory Firestore."""
+    return InMemoryFirestore()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def spelling_table_path(tmp_path_factory):
+    """Build the delete table of the full dictionary outside the repo tree.
+
+    Preprocessors created without a table path, including those of forked
+    pool workers, read SpellingCorrector.DELETES_TABLE_PATH when they load.
+    """
+    path = str(tmp_path_factory.mktemp("spelling") / "spelling_deletes.bin")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(spelling_corrector_module, "DELETES_TABLE_PATH", path)
+        yield path
+
+
+@pytest.fixture(scope="session", autouse=True)
+def worker_preprocessor(tmp_path_factory, spelling_table_path):
+    """Keep the token cache of the test process out of the repo tree."""
+    init_worker(str(tmp_path_factory.mktemp("token_cache") / "token_cache.sqlite"))
+
+
+@pytest.fixture
+def token_cache_path(tmp_path):
+    """A token cache for the workers of an index build."""
+    return str(tmp_path / "token_cache.sqlite")
@@ -0,0 +1,95 @@
+import pytest
+import json
+from ..services.BinaryIndex import BinaryIndexReader, BinaryIndexWriter, decode_varints, encode_varint, is_binary_index
+from ..services.Indexer import Indexer
+from .conftest import CONTENT_INDEX
+
+@pytest.fixture
+def binary_index_path(tmp_path):
+    return BinaryIndexWriter.write(CONTENT_INDEX, tmp_path / "content_index.bin")
+
+def assert_same_content(actual, expected):
+    assert [posting["id"] for posting in actual] == [posting["id"] for posting in expected]
+    for actual_posting, expected_posting in zip(actual, expected):
+        assert actual_posting["humor_type"] == expected_posting["humor_type"]
+        assert actual_posting["emoji_presence"] == expected_posting["emoji_presence"]
+        assert actual_posting["humor_type_score"] == expected_posting["humor_type_score"]
+        assert actual_posting["weight"] == pytest.approx(expected_posting["weight"], abs=1e-4)
+
+@pytest.mark.parametrize("values", [[0], [1, 127, 128, 300, 16384, 2 ** 40]])
+def test_varint_round_trip(values):
+    """Varints decode back to the encoded values."""
+    out = bytearray()
+    for value in values:
+        encode_varint(value, out)
+
+    assert decode_varints(out, len(values)) == (values, len(out))
+
+def test_header_statistics(binary_index_path):
+    """The header records the corpus statistics."""
+    with BinaryIndexReader(binary_index_path) as reader:
+        assert reader.doc_count == 4
+        assert reader.term_count == 3
+        assert reader.total_postings == 5
+        assert reader.max_weight == pytest.approx(2.1972)
+        assert list(reader.terms()) == ["bear", "outstand", "scarecrow"]
+
+def test_term_lookup(binary_index_path):
+    """Only the requested term is looked up and decoded."""
+    with BinaryIndexReader(binary_index_path) as reader:
+        assert "bear" in reader
+        assert "comedian" not in reader
+        assert reader.doc_freq("outstand") == 2
+        assert reader.postings("comedian") == []
+        assert_same_content(reader.content("bear"), CONTENT_INDEX["bear"])
+
+def test_postings_are_partitioned_by_humor_type(binary_index_path):
+    """A term's postings can be read one humor type at a time."""
+    with BinaryIndexReader(binary_index_path) as reader:
+        assert reader.partition_counts("bear") == {"2": 1, "3": 1}
+        assert reader.partition_counts("comedian") == {}
+        assert reader.term_postings("outstand", humor_types=["1"])[0] == [2]
+        assert reader.term_postings("outstand", humor_types=["2", "1"])[0] == [0, 2]
+        assert reader.term_postings("scarecrow", humor_types=["3"]) == ([], [], [])
+
+def test_round_trip(binary_index_path):
+    """Decoding the whole file gives back the content index."""
+    with BinaryIndexReader(binary_index_path) as reader:
+        content_index = reader.to_content_index()
+
+    assert content_index.keys() == CONTENT_INDEX.keys()
+    for term, content in CONTENT_INDEX.items():
+        assert_same_content(content_index[term], content)
+
+def test_binary_index_is_smaller_than_json(tmp_path, binary_index_path):
+    """The binary file is smaller than the indented JSON it replaces."""
+    json_path = tmp_path / "content_index.json"
+    json_path.write_text(json.dumps(CONTENT_INDEX, indent=4))
+
+    assert binary_index_path.stat().st_size < json_path.stat().st_size
+
+def test_reader_rejects_json(tmp_path):
+    """A JSON index is not mistaken for a binary one."""
+    json_path = tmp_path / "content_index.json"
+    json_path.write_text(json.dumps(CONTENT_INDEX))
+
+    assert not is_binary_index(json_path)
+    with pytest.raises(ValueError):
+        BinaryIndexReader(json_path)
+
+@pytest.mark.parametrize("file_name", ["content_index.json", "content_index.bin"])
+def test_indexer_load_index(tmp_path, file_name):
+    """Indexer.load_index reads both the JSON and the binary format."""
+    indexer = Indexer()
+    indexer.content_index.update(CONTENT_INDEX)
+    index_path = tmp_path / file_name
+    if file_name.endswith(".bin"):
+        indexer.write_binary_index(index_path)
+    else:
+        index_path.write_text(json.dumps(CONTENT_INDEX))
+
+    content_index = Indexer.load_index(index_path)
+
+    assert content_index.keys() == CONTENT_INDEX.keys()
+    for term, content in CONTENT_INDEX.items():
+        assert_same_content(content_index[term], content)
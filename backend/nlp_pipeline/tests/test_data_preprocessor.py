@@ -11,12 +11,12 @@ def data_preprocessor():
     [
         (
             "Why did the Scarecrow become a Comedian? He's outstanding!",
-            ["Why", "did", "the", "Scarecrow", "become", "a", "Comedian?", "He's", "outstanding!"]
+            ["why", "did", "the", "scarecrow", "become", "a", "comedian", "he's", "outstanding"]
         )
     ]
 )
 def test_tokenize(data_preprocessor, input_text, expected_output):
-    """Test the tokenize method."""
+    """Test the tokenize method, which runs the scanner."""
     assert data_preprocessor.tokenize(input_text) == expected_output
 
 @pytest.mark.parametrize(
@@ -86,3 +86,45 @@ def test_correct_spelling(data_preprocessor, input_tokens, expected_output):
 def test_stem_tokens(data_preprocessor, input_tokens, expected_output):
     """Test the stem_tokens method."""
     assert data_preprocessor.stem_tokens(input_tokens) == expected_output
+
+def test_pipeline_resources_are_reused(data_preprocessor):
+    """The spell checker and stemmer are loaded once per preprocessor."""
+    data_preprocessor.correct_spelling(["comedian"])
+    data_preprocessor.stem_tokens(["comedian"])
+    spell_checker = data_preprocessor.spell_checker
+    stemmer = data_preprocessor.stemmer
+
+    data_preprocessor.correct_spelling(["outstandng"])
+    data_preprocessor.stem_tokens(["outstanding"])
+
+    assert spell_checker is not None and data_preprocessor.spell_checker is spell_checker
+    assert stemmer is not None and data_preprocessor.stemmer is stemmer
+
+BATCH = [
+    "Why did the Scarecrow become a Comedian? He's outstanding!",
+    "The scarecrow was outstandng in his field, a real comedian.",
+    "!!! ???",
+    "",
+]
+
+def test_preprocess_many_matches_preprocess(data_preprocessor):
+    """Batch results equal preprocessing each text on its own."""
+    assert data_preprocessor.preprocess_many(BATCH) == [data_preprocessor.preprocess(text) for text in BATCH]
+
+def test_stem_many_stems_each_distinct_token_once(monkeypatch):
+    """Repeated words across the batch are stemmed only once."""
+    data_preprocessor = DataPreprocessor()
+    stemmer = data_preprocessor.get_stemmer()
+    stemmed = []
+    stem = stemmer.stem
+    monkeypatch.setattr(stemmer, "stem", lambda token: stemmed.append(token) or stem(token))
+
+    results = data_preprocessor.stem_many(BATCH)
+
+    assert [result["stemmed_tokens"] for result in results] == [
+        ["scarecrow", "become", "comedian", "outstand"],
+        ["scarecrow", "outstand", "field", "real", "comedian"],
+        [],
+        [],
+    ]
+    assert sorted(stemmed) == sorted(set(stemmed))
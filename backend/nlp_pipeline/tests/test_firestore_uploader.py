@@ -0,0 +1,256 @@
+from ..services.FirestoreUploader import FirestoreUploader
+from ..services.Indexer import Indexer
+
+def test_upload_groups_writes_into_batches(firestore_db):
+    """Documents are committed in batches of at most batch_size writes."""
+    uploader = FirestoreUploader(firestore_db, batch_size=100, max_workers=4)
+
+    stats = uploader.upload("content", ((str(i), {"id": str(i)}) for i in range(1050)))
+
+    assert stats.written == 1050
+    assert stats.batches == 11
+    assert stats.failed == 0
+    assert firestore_db.commits == 11
+    assert len(firestore_db.collections["content"]) == 1050
+    assert firestore_db.collections["content"]["42"] == {"id": "42"}
+    assert stats.docs_per_second > 0
+
+def test_batch_size_is_capped_at_firestore_limit(firestore_db):
+    """A batch never exceeds the 500 writes Firestore accepts."""
+    stats = FirestoreUploader(firestore_db, batch_size=5000).upload("content", ((str(i), {}) for i in range(1200)))
+
+    assert stats.batches == 3
+
+def test_batches_respect_byte_limit(firestore_db):
+    """Large documents start a new batch before the request size limit."""
+    uploader = FirestoreUploader(firestore_db, max_batch_bytes=1000)
+
+    stats = uploader.upload("content_index", ((str(i), {"content": "x" * 400}) for i in range(6)))
+
+    assert stats.batches == 3
+
+def test_failed_commits_are_retried(firestore_db):
+    """Transient commit failures are retried with backoff."""
+    firestore_db.fail_commits = 2
+    uploader = FirestoreUploader(firestore_db, max_workers=1, backoff_seconds=0)
+
+    stats = uploader.upload("content", [("1", {"id": "1"}), ("2", {"id": "2"})])
+
+    assert stats.written == 2
+    assert stats.retries == 2
+    assert firestore_db.collections["content"].keys() == {"1", "2"}
+
+def test_failures_after_retries_are_reported(firestore_db):
+    """A batch that keeps failing is counted as failed instead of raising."""
+    firestore_db.fail_commits = 10
+    uploader = FirestoreUploader(firestore_db, max_workers=1, max_retries=2, backoff_seconds=0)
+
+    stats = uploader.upload("content", [("1", {"id": "1"})])
+
+    assert stats.written == 0
+    assert stats.failed == 1
+
+def test_delete(firestore_db):
+    """Documents can be deleted in batches."""
+    uploader = FirestoreUploader(firestore_db)
+    uploader.upload("content", [("1", {}), ("2", {}), ("3", {})])
+
+    stats = uploader.delete("content", ["1", "3"])
+
+    assert stats.written == 2
+    assert firestore_db.collections["content"].keys() == {"2"}
+
+def test_push_index_to_firestore(firestore_db):
+    """Indexer pushes valid, new terms through the batched uploader."""
+    posting = {"id": "1", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.9, "weight": 1.0986}
+    firestore_db.collection("content_index").document("bear").set({"content": ["existing"]})
+    indexer = Indexer()
+    indexer.db = firestore_db
+    indexer.content_index.update({
+        "scarecrow": [posting],
+        "bear": [posting],
+        "broken": [{"id": "1"}],
+    })
+
+    stats = indexer.push_index_to_firestore()
+
+    assert stats.written == 1
+    assert firestore_db.collections["content_index"]["scarecrow"]["content"] == [posting]
+    assert firestore_db.collections["content_index"]["bear"] == {"content": ["existing"]}
+
+def test_push_content_to_firestore(firestore_db, tmp_path):
+    """Indexer streams valid CSV rows into the content collection."""
+    input_csv_path = tmp_path / "test_humor.csv"
+    input_csv_path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score\n"
+        "1,Why did the scarecrow become a comedian?,false,2,0.9\n"
+        "2,,false,2,0.8\n"
+        "3,What do you call a bear with no teeth?,true,1,0.5\n"
+    )
+    indexer = Indexer()
+    indexer.db = firestore_db
+
+    stats = indexer.push_content_to_firestore(input_csv_path, "humor_content")
+
+    assert stats.written == 2
+    assert firestore_db.collections["humor_content"]["3"] == {
+        "id": "3",
+        "text": "What do you call a bear with no teeth?",
+        "emoji_presence": True,
+        "humor_type": "1",
+        "humor_type_score": 0.5,
+    }
+
+def sync_indexer(firestore_db, content_index):
+    indexer = Indexer()
+    indexer.db = firestore_db
+    indexer.content_index.update(content_index)
+    return indexer
+
+def test_sync_uploads_only_changed_terms(firestore_db, tmp_path):
+    """Repeated syncs write and delete only the terms that changed."""
+    manifest_path = str(tmp_path / "manifest.json")
+    posting = {"id": "1", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.9, "weight": 1.0986}
+    content_index = {"scarecrow": [posting], "bear": [posting], "teeth": [posting]}
+    uploader = FirestoreUploader(firestore_db, backoff_seconds=0)
+
+    first = sync_indexer(firestore_db, content_index).sync_index_to_firestore(manifest_path=manifest_path, uploader=uploader)
+    assert first["uploaded"].written == 3
+
+    firestore_db.reads = firestore_db.writes = 0
+    second = sync_indexer(firestore_db, content_index).sync_index_to_firestore(manifest_path=manifest_path, uploader=uploader)
+    assert second["uploaded"].written == 0
+    assert second["unchanged"] == 3
+    assert firestore_db.reads == 0 and firestore_db.writes == 0
+
+    changed_index = {
+        "scarecrow": [posting],
+        "bear": [{**posting, "weight": 2.1972}],
+        "gummy": [posting],
+    }
+    third = sync_indexer(firestore_db, changed_index).sync_index_to_firestore(manifest_path=manifest_path, uploader=uploader)
+    assert third["uploaded"].written == 2
+    assert third["deleted"].written == 1
+    assert firestore_db.collections["content_index"].keys() == {"scarecrow", "bear", "gummy"}
+    assert firestore_db.collections["content_index"]["bear"]["content"] == [{**posting, "weight": 2.1972}]
+
+def test_sync_retries_failed_terms(firestore_db, tmp_path):
+    """Terms that failed to upload are not recorded and are retried on the next sync."""
+    manifest_path = str(tmp_path / "manifest.json")
+    posting = {"id": "1", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.9, "weight": 1.0986}
+    uploader = FirestoreUploader(firestore_db, max_retries=0, backoff_seconds=0)
+    indexer = sync_indexer(firestore_db, {"scarecrow": [posting]})
+
+    firestore_db.fail_commits = 1
+    assert indexer.sync_index_to_firestore(manifest_path=manifest_path, uploader=uploader)["uploaded"].failed == 1
+
+    assert indexer.sync_index_to_firestore(manifest_path=manifest_path, uploader=uploader)["uploaded"].written == 1
+
+def weighted_postings(count):
+    return [
+        {"id": str(i), "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.5, "weight": round(i * 0.01, 4)}
+        for i in range(1, count + 1)
+    ]
+
+def test_term_pages():
+    """Postings are split into weight-ordered pages behind a small head document."""
+    operations = Indexer.term_pages("bear", weighted_postings(7), page_size=3)
+
+    assert [(path, doc_id) for path, doc_id, _ in operations] == [
+        ("content_index", "bear"),
+        ("content_index/bear/pages", "1"),
+        ("content_index/bear/pages", "2"),
+    ]
+    head = operations[0][2]
+    assert head["page_count"] == 3
+    assert head["doc_freq"] == 7
+    assert head["page_max_weights"] == [0.07, 0.04, 0.01]
+    assert [posting["id"] for posting in head["content"]] == ["7", "6", "5"]
+
+def test_read_term_postings_stops_early(firestore_db):
+    """Readers only fetch the pages that can still change the top-k."""
+    indexer = Indexer()
+    indexer.db = firestore_db
+    indexer.content_index["bear"] = weighted_postings(10)
+    indexer.push_index_to_firestore(uploader=FirestoreUploader(firestore_db), page_size=3)
+
+    firestore_db.reads = 0
+    top = Indexer.read_term_postings(firestore_db, "bear", max_postings=4)
+    assert [posting["id"] for posting in top] == ["10", "9", "8", "7"]
+    assert firestore_db.reads == 2
+
+    above = Indexer.read_term_postings(firestore_db, "bear", min_weight=0.05)
+    assert [posting["id"] for posting in above] == ["10", "9", "8", "7", "6", "5"]
+
+    assert len(Indexer.read_term_postings(firestore_db, "bear")) == 10
+    assert Indexer.read_term_postings(firestore_db, "comedian") == []
+
+def test_sync_removes_stale_pages(firestore_db, tmp_path):
+    """Pages a shrinking or removed term no longer needs are deleted."""
+    manifest_path = str(tmp_path / "manifest.json")
+    uploader = FirestoreUploader(firestore_db)
+
+    sync_indexer(firestore_db, {"bear": weighted_postings(7), "teeth": weighted_postings(4)}).sync_index_to_firestore(
+        manifest_path=manifest_path, uploader=uploader, page_size=3)
+    assert firestore_db.collections["content_index/bear/pages"].keys() == {"1", "2"}
+    assert firestore_db.collections["content_index/teeth/pages"].keys() == {"1"}
+
+    sync_indexer(firestore_db, {"bear": weighted_postings(4)}).sync_index_to_firestore(
+        manifest_path=manifest_path, uploader=uploader, page_size=3)
+    assert firestore_db.collections["content_index/bear/pages"].keys() == {"1"}
+    assert firestore_db.collections["content_index/teeth/pages"] == {}
+    assert firestore_db.collections["content_index"].keys() == {"bear"}
+
+def test_publish_index_version_switches_pointer(firestore_db):
+    """A build is written to its own collection and the pointer is switched once it is complete."""
+    uploader = FirestoreUploader(firestore_db)
+    first = sync_indexer(firestore_db, {"bear": weighted_postings(4)}).publish_index_version(uploader=uploader, page_size=3)
+    second = sync_indexer(firestore_db, {"bear": weighted_postings(5)}).publish_index_version(uploader=uploader, page_size=3)
+
+    assert first["switched"] and second["switched"]
+    pointer = Indexer.current_index_version(firestore_db)
+    assert pointer["version"] == second["version"]
+    assert pointer["previous"] == [first["version"]]
+    assert "content_index" not in firestore_db.collections
+
+    old = Indexer.read_term_postings(firestore_db, "bear", collection=Indexer.version_collection(first["version"]))
+    new = Indexer.read_term_postings(firestore_db, "bear", collection=pointer["collection"])
+    assert len(old) == 4 and len(new) == 5
+
+def test_publish_same_build_is_a_no_op(firestore_db):
+    """The version key is derived from the content, so an unchanged build is not re-uploaded."""
+    uploader = FirestoreUploader(firestore_db)
+    indexer = sync_indexer(firestore_db, {"bear": weighted_postings(4)})
+    version = indexer.publish_index_version(uploader=uploader)["version"]
+
+    firestore_db.writes = 0
+    result = indexer.publish_index_version(uploader=uploader)
+    assert result == {"version": version, "uploaded": None, "switched": False}
+    assert firestore_db.writes == 0
+
+def test_failed_publish_keeps_current_version(firestore_db):
+    """Clients stay on the previous version when the new build is only partly uploaded."""
+    uploader = FirestoreUploader(firestore_db, max_retries=0, backoff_seconds=0)
+    live = sync_indexer(firestore_db, {"bear": weighted_postings(4)}).publish_index_version(uploader=uploader)
+
+    firestore_db.fail_commits = 1
+    result = sync_indexer(firestore_db, {"bear": weighted_postings(5)}).publish_index_version(uploader=uploader)
+
+    assert not result["switched"]
+    assert Indexer.current_index_version(firestore_db)["version"] == live["version"]
+
+def test_collect_index_versions(firestore_db):
+    """Superseded versions beyond keep_versions are deleted with their pages."""
+    uploader = FirestoreUploader(firestore_db)
+    versions = [
+        sync_indexer(firestore_db, {"bear": weighted_postings(count)}).publish_index_version(uploader=uploader, page_size=3)["version"]
+        for count in (4, 5, 6)
+    ]
+    indexer = sync_indexer(firestore_db, {})
+
+    assert indexer.collect_index_versions(keep_versions=1, uploader=uploader) == [versions[0]]
+    oldest = Indexer.version_collection(versions[0])
+    assert firestore_db.collections[oldest] == {}
+    assert firestore_db.collections[f"{oldest}/bear/pages"] == {}
+    assert Indexer.current_index_version(firestore_db)["previous"] == [versions[1]]
+    assert len(Indexer.read_term_postings(firestore_db, "bear", collection=Indexer.version_collection(versions[1]))) == 5
@@ -0,0 +1,60 @@
+import pytest
+import json
+from ..services.IndexPruner import IndexPruner
+from .conftest import random_content_index
+
+CONTENT_INDEX = {
+    "bear": [
+        {"id": "1", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.8, "weight": 0.2},
+        {"id": "2", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.8, "weight": 2.0},
+        {"id": "3", "humor_type": "3", "emoji_presence": False, "humor_type_score": 0.4, "weight": 0.9},
+        {"id": "4", "humor_type": "3", "emoji_presence": False, "humor_type_score": 0.4, "weight": 0.1},
+    ],
+    "scarecrow": [
+        {"id": "1", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.8, "weight": 0.3},
+    ],
+}
+
+def ids(content_index):
+    return {term: [posting["id"] for posting in content] for term, content in content_index.items()}
+
+@pytest.mark.parametrize(
+    "level, expected",
+    [
+        ({}, {"bear": ["1", "2", "3", "4"], "scarecrow": ["1"]}),
+        ({"min_impact": 0.5}, {"bear": ["2", "3"]}),
+        ({"min_impact": 0.5, "keep_top": 1}, {"bear": ["2", "3"], "scarecrow": ["1"]}),
+        ({"term_fraction": 0.5}, {"bear": ["2"], "scarecrow": ["1"]}),
+        ({"min_impact": 5.0, "keep_top": 2}, {"bear": ["2", "3"], "scarecrow": ["1"]}),
+    ],
+)
+def test_prune(level, expected):
+    """Postings below the global or per-term threshold go unless among the top keep_top."""
+    assert ids(IndexPruner(CONTENT_INDEX).prune(**level)) == expected
+
+def test_priors_change_impact():
+    """With priors a low-weight posting of a popular document can survive."""
+    pruner = IndexPruner(CONTENT_INDEX, doc_priors={"4": 10.0})
+
+    assert ids(pruner.prune(min_impact=0.9)) == {"bear": ["2", "3", "4"]}
+
+def test_report_trades_size_for_overlap():
+    """Harder pruning shrinks the index and lowers the top-k overlap."""
+    pruner = IndexPruner(random_content_index(doc_count=400, vocabulary_size=30, seed=5, terms_per_doc=5,
+                                              weight=lambda rng: rng.expovariate(1.0)))
+    levels = [{}, {"term_fraction": 0.1, "keep_top": 10}, {"term_fraction": 0.5, "keep_top": 5}]
+
+    rows = pruner.report(levels, pruner.sample_queries(count=30), k=10)
+
+    assert [row["level"] for row in rows] == ["unpruned", "term_fraction=0.1, keep_top=10", "term_fraction=0.5, keep_top=5"]
+    assert rows[0]["size_ratio"] == 1.0 and rows[0]["top10_overlap"] == 1.0
+    assert rows[0]["bytes"] > rows[1]["bytes"] > rows[2]["bytes"]
+    assert rows[0]["top10_overlap"] >= rows[1]["top10_overlap"] >= rows[2]["top10_overlap"]
+    assert rows[1]["top10_overlap"] > 0.9
+
+def test_write(tmp_path):
+    """A chosen pruning level can be written out as a regular content index."""
+    output_path = IndexPruner(CONTENT_INDEX).write(str(tmp_path / "content_index_pruned.json"), min_impact=0.5)
+
+    with open(output_path) as f:
+        assert ids(json.load(f)) == {"bear": ["2", "3"]}
@@ -1,12 +1,16 @@
 import pytest
 import json
+import math
 from unittest.mock import MagicMock
-from ..services.Indexer import Indexer
+from ..models.ScrapQuery import ScrapQuery
+from ..services import Indexer as indexer_module
+from ..services.Indexer import Indexer, build_partial_index, chunk_records, merge_partial_indexes, read_records, static_prior
+from ..services.QueryEngine import QueryEngine
 
 @pytest.fixture(scope="module")
-def indexer():
+def indexer(tmp_path_factory):
     """Fixture to initialize the Indexer once for all tests."""
-    return Indexer()
+    return Indexer(token_cache_path=str(tmp_path_factory.mktemp("token_cache") / "token_cache.sqlite"))
 
 @pytest.mark.parametrize(
     "input_record, expected_terms",
@@ -36,6 +40,84 @@ def test_process_record(indexer, input_record, expected_terms):
     
     assert term_data == expected_terms
 
+def test_process_batch(indexer):
+    """A batch gives every record the terms process_record gives it alone."""
+    records = [
+        {"id": "1", "text": "Why did the scarecrow become a comedian? He's outstanding!"},
+        {"id": "2", "text": "The meeting is at 2 PM."},
+        {"id": "3", "text": "The scarecrow was outstandng in his field!"},
+        {"id": "4", "text": "?!"},
+    ]
+
+    assert indexer.process_batch(records) == [indexer.process_record(record)[0] for record in records]
+
+def test_query_terms(indexer, capsys):
+    """Query text gets the terms a document with that text is indexed under, quietly."""
+    text = "Why did the scarecrow become a comedian? He's outstanding!"
+    expected = [term for term, _ in indexer.process_record({"id": "1", "text": text})[0]]
+    capsys.readouterr()
+
+    assert indexer.query_terms(text) == expected
+    assert capsys.readouterr().out == ""
+
+def test_build_partial_index(indexer):
+    """A worker shard is turned into term-sorted postings with tf and df."""
+    records = [
+        {"id": "1", "text": "What do you call a bear with no teeth? A gummy bear!"},
+        {"id": "2", "text": "The bear meeting is at 2 PM."},
+    ]
+
+    assert build_partial_index(records) == [
+        ("2", 1, [("2", 1)]),
+        ("bear", 2, [("1", 2), ("2", 1)]),
+        ("call", 1, [("1", 1)]),
+        ("gummy", 1, [("1", 1)]),
+        ("meet", 1, [("2", 1)]),
+        ("pm", 1, [("2", 1)]),
+        ("teeth", 1, [("1", 1)]),
+    ]
+
+def test_merge_partial_indexes():
+    """Shard postings are merged per term in shard order with summed df."""
+    shard_a = [("bear", 1, [("1", 2)]), ("call", 1, [("1", 1)])]
+    shard_b = [("bear", 2, [("2", 1), ("3", 1)]), ("pm", 1, [("2", 1)])]
+    shard_c = [("call", 1, [("4", 3)])]
+
+    assert list(merge_partial_indexes([shard_a, shard_b, shard_c])) == [
+        ("bear", 3, [("1", 2), ("2", 1), ("3", 1)]),
+        ("call", 2, [("1", 1), ("4", 3)]),
+        ("pm", 1, [("2", 1)]),
+    ]
+
+def test_merge_rejects_duplicate_ids():
+    """A document in two shards would be counted twice in the document frequency."""
+    shard_a = [("bear", 1, [("1", 2)])]
+    shard_b = [("bear", 2, [("1", 1), ("2", 1)])]
+
+    with pytest.raises(ValueError):
+        list(merge_partial_indexes([shard_a, shard_b]))
+
+def test_build_index_keeps_first_of_duplicate_ids(indexer, tmp_path):
+    """A repeated id is indexed once, from its first record, whichever shard it falls in."""
+    input_csv_path = tmp_path / "test_humor.csv"
+    input_csv_path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score\n"
+        "1,What do you call a bear with no teeth? A gummy bear!,false,2,0.8\n"
+        "2,The bear meeting is at 2 PM.,false,2,0.4\n"
+        "1,A bear walked into a bar,false,2,0.8\n"
+    )
+    duplicated = Indexer(token_cache_path=indexer.token_cache_path)
+    duplicated.build_index(input_csv_path, chunk_size=1, output_path=tmp_path / "content_index.json")
+
+    assert duplicated.doc_count == 2
+    assert duplicated.term_doc_count["bear"] == 2
+    assert duplicated.term_freq["bear"] == {"1": 2, "2": 1}
+    assert "walk" not in duplicated.term_freq
+
+def test_chunk_records():
+    """Records are split into consecutive chunks."""
+    assert chunk_records([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4], [5]]
+
 def test_build_index(indexer, tmp_path):
     """Test the build_index method."""
     input_csv_path = tmp_path / "test_humor.csv"
@@ -160,9 +242,188 @@ def test_build_index(indexer, tmp_path):
             },
         ],
     }
-    content_index = indexer.build_index(input_csv_path)
+    output_path = tmp_path / "content_index.json"
+    content_index = indexer.build_index(input_csv_path, output_path=output_path)
     assert content_index == expected_index
+    with open(output_path) as f:
+        assert json.load(f) == expected_index
+    assert indexer.doc_stats["2"] == {"length": 5, "norm": round(math.sqrt(2.1972 ** 2 + 3 * 1.0986 ** 2), 4)}
+
 
+def test_build_index_external_matches_build_index(tmp_path, token_cache_path, capsys):
+    """The bounded-memory build spills runs to disk and produces the same index."""
+    input_csv_path = tmp_path / "test_humor.csv"
+    input_csv_path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score\n"
+        "1,Why did the scarecrow become a comedian? He's outstanding!,false,2,0.9\n"
+        "2,What do you call a bear with no teeth? A gummy bear!,true,1,0.8\n"
+        "3,Why did the fake spaghetti become outstanding? An impasta!,false,2,0.85\n"
+        "4,The bear meeting is at 2 PM.,false,3,0.4\n"
+    )
+    expected_index = Indexer(token_cache_path=token_cache_path).build_index(
+        input_csv_path, output_path=tmp_path / "expected_index.json")
+    capsys.readouterr()
+
+    output_path = tmp_path / "content_index.json"
+    Indexer(token_cache_path=token_cache_path).build_index_external(input_csv_path, output_path, memory_budget_mb=0.001, chunk_size=1)
+
+    assert capsys.readouterr().out.count("Wrote posting run") > 1
+    with open(output_path) as f:
+        assert json.load(f) == expected_index
+
+def test_build_index_external_bounds_open_runs(tmp_path, token_cache_path, capsys, monkeypatch):
+    """Many runs are merged in passes that never read more than merge_fan_in runs at once."""
+    input_csv_path = tmp_path / "test_humor.csv"
+    input_csv_path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score\n"
+        "1,Why did the scarecrow become a comedian? He's outstanding!,false,2,0.9\n"
+        "2,What do you call a bear with no teeth? A gummy bear!,true,1,0.8\n"
+        "3,Why did the fake spaghetti become outstanding? An impasta!,false,2,0.85\n"
+        "4,The bear meeting is at 2 PM.,false,3,0.4\n"
+        "5,A gummy bear walked into a bar,false,1,0.6\n"
+    )
+    expected_index = Indexer(token_cache_path=token_cache_path).build_index(
+        input_csv_path, output_path=tmp_path / "expected_index.json")
+
+    open_runs = set()
+    most_open = []
+    read_posting_run = indexer_module.read_posting_run
+    def tracked_run(run_path):
+        open_runs.add(run_path)
+        most_open.append(len(open_runs))
+        yield from read_posting_run(run_path)
+        open_runs.discard(run_path)
+    monkeypatch.setattr(indexer_module, "read_posting_run", tracked_run)
+    capsys.readouterr()
+
+    output_path = tmp_path / "content_index.json"
+    Indexer(token_cache_path=token_cache_path).build_index_external(
+        input_csv_path, output_path, memory_budget_mb=0.0001, chunk_size=1, merge_fan_in=2)
+
+    out = capsys.readouterr().out
+    assert out.count("Wrote posting run") == 5
+    assert "Merged 5 posting runs into 3" in out and "Merged 3 posting runs into 2" in out
+    assert max(most_open) == 2
+    with open(output_path) as f:
+        assert json.load(f) == expected_index
+
+def test_build_index_external_rejects_duplicate_ids(tmp_path, token_cache_path):
+    """A repeated id is rejected even when its records fall in separate chunks of one batch and one run."""
+    input_csv_path = tmp_path / "test_humor.csv"
+    input_csv_path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score\n"
+        "1,What do you call a bear with no teeth? A gummy bear!,false,2,0.8\n"
+        "2,The bear meeting is at 2 PM.,false,2,0.4\n"
+        "1,A bear walked into a bar,false,2,0.8\n"
+    )
+
+    with pytest.raises(ValueError, match="Document id 1"):
+        Indexer(token_cache_path=token_cache_path).build_index_external(
+            input_csv_path, tmp_path / "content_index.json", chunk_size=1)
+
+INCREMENTAL_RECORDS = [
+    {'id': '1', 'text': "Why did the scarecrow become a comedian? He's outstanding!",
+     'emoji_presence': False, 'humor_type': '2', 'humor_type_score': 0.9},
+    {'id': '2', 'text': "What do you call a bear with no teeth? A gummy bear!",
+     'emoji_presence': False, 'humor_type': '2', 'humor_type_score': 0.8},
+    {'id': '3', 'text': "Why did the fake spaghetti become outstanding? An impasta!",
+     'emoji_presence': False, 'humor_type': '2', 'humor_type_score': 0.85},
+]
+
+def test_add_documents_matches_full_build(tmp_path, token_cache_path):
+    """Adding documents one by one gives the same index as a batch build."""
+    input_csv_path = tmp_path / "test_humor.csv"
+    input_csv_path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score\n"
+        "1,Why did the scarecrow become a comedian? He's outstanding!,false,2,0.9\n"
+        "2,What do you call a bear with no teeth? A gummy bear!,false,2,0.8\n"
+        "3,Why did the fake spaghetti become outstanding? An impasta!,false,2,0.85\n"
+    )
+    expected_index = Indexer(token_cache_path=token_cache_path).build_index(
+        input_csv_path, output_path=tmp_path / "content_index.json")
+
+    incremental = Indexer()
+    incremental.compaction_threshold = float('inf')
+    for record in INCREMENTAL_RECORDS:
+        incremental.add_documents([record])
+
+    assert {term: incremental.get_postings(term) for term in expected_index} == expected_index
+    assert incremental.compact() == expected_index
+
+def test_delete_and_update_documents():
+    """Deleting and updating documents keeps the live statistics exact."""
+    indexer = Indexer()
+    indexer.compaction_threshold = float('inf')
+    indexer.add_documents(INCREMENTAL_RECORDS)
+
+    assert indexer.delete_documents(['3', 'missing']) == 1
+    assert indexer.doc_count == 2
+    assert 'spaghetti' not in indexer.term_freq
+    assert indexer.term_doc_count['outstand'] == 1
+    assert indexer.get_postings('become')[0]['weight'] == round(math.log(2), 4)
+
+    indexer.update_document({**INCREMENTAL_RECORDS[1], 'text': "The bear meeting is at 2 PM."})
+    assert indexer.doc_count == 2
+    assert 'gummy' not in indexer.term_freq
+    assert [posting['id'] for posting in indexer.get_postings('meet')] == ['2']
+    assert indexer.pending_updates == 5
+
+def test_added_documents_are_searchable_before_compaction():
+    """Documents added since the last compaction are found and scored with live norms."""
+    indexer = Indexer()
+    indexer.compaction_threshold = float('inf')
+    indexer.add_documents(INCREMENTAL_RECORDS[:2])
+    indexer.add_documents(INCREMENTAL_RECORDS[2:])
+
+    engine = indexer.query_engine()
+    assert engine.search({'spaghetti': 1.0}) == [('3', 1.0986)]
+    assert indexer.boolean_search("spaghetti") == [('3', 1.0986)]
+    assert engine.search({'spaghetti': 1.0}, model='cosine')[0][1] > 0
+    weights = [posting['weight'] for term in indexer.doc_terms['3'] for posting in indexer.get_postings(term)
+               if posting['id'] == '3']
+    assert indexer.doc_stats['3']['norm'] == round(math.sqrt(sum(weight ** 2 for weight in weights)), 4)
+
+    indexer.delete_documents(['3'])
+    assert indexer.query_engine().search({'spaghetti': 1.0}) == []
+    assert indexer.query_engine().search({'become': 1.0}) == [('1', round(math.log(2), 4))]
+
+def test_query_engine_merges_updates_over_the_compacted_index():
+    """Pending updates are merged over an engine built once per compaction, with live weights."""
+    indexer = Indexer()
+    indexer.add_documents(INCREMENTAL_RECORDS)
+    indexer.compact()
+    indexer.compaction_threshold = float('inf')
+    base_engine = indexer.query_engine()
+
+    indexer.delete_documents(['3'])
+    indexer.update_document({**INCREMENTAL_RECORDS[1], 'text': "The bear meeting is at 2 PM."})
+    indexer.add_documents([{'id': '4', 'text': "A gummy bear walked into a bar",
+                            'emoji_presence': False, 'humor_type': '1', 'humor_type_score': 0.6}])
+    engine = indexer.query_engine()
+    assert engine.base is base_engine
+    assert indexer.query_engine() is engine
+
+    rebuilt = QueryEngine({term: indexer.get_postings(term) for term in indexer.term_freq},
+                          term_freq=indexer.term_freq, doc_stats=indexer.doc_stats)
+    for term_weights in [{'bear': 1.0}, {'outstand': 1.0, 'gummy': 0.5}, {'spaghetti': 1.0}, {'meet': 1.0, 'bear': 1.0}]:
+        for model in ['tfidf', 'bm25']:
+            assert dict(engine.search(term_weights, 10, model=model)) == dict(rebuilt.search(term_weights, 10, model=model))
+    assert engine.doc_freq('bear') == 2
+    assert engine.search({'bear': 1.0}, humor_types=['1']) == rebuilt.search({'bear': 1.0}, humor_types=['1'])
+    assert engine.boolean_search(must=['bear'], must_not=['meet']) == [('4', indexer.get_postings('bear')[1]['weight'])]
+    assert engine.statistics().doc_count == 3
+
+    indexer.compact()
+    assert indexer.query_engine() is not base_engine
+
+def test_updates_trigger_compaction():
+    """content_index is rematerialized once enough updates accumulate."""
+    indexer = Indexer()
+    indexer.compaction_threshold = 0.5
+    indexer.add_documents(INCREMENTAL_RECORDS[:2])
+
+    assert indexer.pending_updates == 0
+    assert indexer.content_index['bear'] == indexer.get_postings('bear')
 
 def test_upload_index_term(monkeypatch):
     """Test the upload_index_term method without contacting Firestore."""
@@ -239,3 +500,88 @@ def test_upload_content_item(monkeypatch):
         "humor_type": "2",
         "humor_type_score": 0.9
     })
+
+def _synthetic_corpus(doc_count, terms_per_doc=10, vocabulary_size=500):
+    """Build an Indexer with term statistics for a synthetic corpus."""
+    indexer = Indexer()
+    records = []
+    for i in range(doc_count):
+        doc_id = str(i)
+        records.append({
+            'id': doc_id,
+            'text': '',
+            'emoji_presence': False,
+            'humor_type': str(i % 4 + 1),
+            'humor_type_score': 0.5
+        })
+        for j in range(terms_per_doc):
+            term = f"term{(i * 7 + j * 13) % vocabulary_size}"
+            indexer.term_freq[term][doc_id] += 1
+            if indexer.term_freq[term][doc_id] == 1:
+                indexer.term_doc_count[term] += 1
+    indexer.doc_count = doc_count
+    return indexer, records
+
+class CountingRecord(dict):
+    """A record that counts how often its fields are read."""
+
+    reads = 0
+
+    def __getitem__(self, key):
+        CountingRecord.reads += 1
+        return super().__getitem__(key)
+
+def test_compute_content_index_scales_linearly():
+    """Every posting reads its record's fields a fixed number of times, whatever the corpus size."""
+    def reads_per_posting(doc_count):
+        indexer, records = _synthetic_corpus(doc_count)
+        records = [CountingRecord(record) for record in records]
+        CountingRecord.reads = 0
+        indexer.compute_content_index(records)
+        postings = sum(len(content) for content in indexer.content_index.values())
+        return CountingRecord.reads / postings
+
+    small = reads_per_posting(500)
+    large = reads_per_posting(2000)
+
+    assert large <= small < 5
+
+@pytest.mark.parametrize(
+    "record, expected_prior",
+    [
+        ({'id': '1'}, 1.0),
+        ({'id': '2', 'humor_score': 0.8}, 1.08),
+        ({'id': '3', 'likes': 10, 'retweets': 5, 'comments': ['ha', 'lol']}, round(1 + 0.1 * math.log1p(22), 4)),
+    ],
+)
+def test_static_prior(record, expected_prior):
+    """Engagement and humor score raise the prior; no signals keep it neutral."""
+    assert static_prior(record) == expected_prior
+
+def test_read_records_picks_up_prior_signals(tmp_path):
+    """Optional signal columns feed the document priors of the query engine."""
+    input_csv_path = tmp_path / "test_posts.csv"
+    input_csv_path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score,likes,retweets,comments,humor_score\n"
+        "1,Why did the scarecrow become a comedian?,false,2,0.9,120,30,4,0.9\n"
+        "2,What do you call a bear with no teeth?,false,2,0.8,,,,\n"
+    )
+
+    records = list(read_records(input_csv_path))
+    indexer = Indexer()
+    indexer.compute_content_index(records)
+
+    assert records[0]['likes'] == 120.0
+    assert 'likes' not in records[1]
+    assert indexer.doc_priors['1'] > indexer.doc_priors['2'] == 1.0
+
+def test_boolean_search_with_scrap_query():
+    """ScrapQuery keyword clauses are preprocessed and run as AND/OR over the index."""
+    indexer = Indexer()
+    indexer.add_documents(INCREMENTAL_RECORDS)
+    indexer.compact()
+
+    assert [content_id for content_id, _ in indexer.boolean_search("outstanding")] == ["1", "3"]
+    assert indexer.boolean_search(["outstanding"], must_not_contain=["comedians"]) == [("3", 0.4055)]
+    query = ScrapQuery(mustContain=["outstanding"], canContain=["scarecrow", "bears"])
+    assert [content_id for content_id, _ in indexer.search_scrap_query(query)] == ["1"]
@@ -0,0 +1,110 @@
+import pytest
+import json
+from ..services.FirestoreUploader import FirestoreUploader
+from ..services.Indexer import Indexer
+from ..services.NormalizedIndex import NormalizedIndex, is_normalized_index
+from ..services.QueryEngine import QueryEngine
+from .conftest import CONTENT_INDEX
+
+def test_document_table_is_shared():
+    """Postings hold (ordinal, weight) and each document is stored once."""
+    index = NormalizedIndex.from_content_index(CONTENT_INDEX)
+
+    assert index.documents == [
+        ["1", "2", False, 0.9],
+        ["2", "2", True, 0.8],
+        ["3", "1", False, 0.85],
+        ["10", "3", False, 0.4],
+    ]
+    assert index.postings("bear") == [(1, 2.1972), (3, 0.4055)]
+    assert index.postings("comedian") == []
+
+def test_lookups_join_lazily():
+    """Reading a term returns the same postings as the plain index."""
+    index = NormalizedIndex.from_content_index(CONTENT_INDEX)
+
+    assert dict(index) == CONTENT_INDEX
+    assert "scarecrow" in index and "comedian" not in index
+    assert len(index) == 3
+
+def test_write_and_load(tmp_path):
+    """Indexer writes the normalized layout and load_index recognizes it."""
+    indexer = Indexer()
+    indexer.content_index.update(CONTENT_INDEX)
+
+    path = indexer.write_normalized_index(str(tmp_path / "content_index_normalized.json"))
+    with open(path) as f:
+        assert is_normalized_index(json.load(f))
+
+    loaded = Indexer.load_index(path)
+    assert isinstance(loaded, NormalizedIndex)
+    assert loaded["outstand"] == CONTENT_INDEX["outstand"]
+
+def test_normalized_index_is_smaller(tmp_path):
+    """Storing metadata once shrinks an index of multi-term documents several times."""
+    content_index = {
+        f"term{t}": [
+            {"id": str(d), "humor_type": str(d % 4 + 1), "emoji_presence": d % 2 == 0, "humor_type_score": 0.75, "weight": 1.2345}
+            for d in range(t % 7, 300, 7)
+        ]
+        for t in range(100)
+    }
+    plain_path = tmp_path / "content_index.json"
+    plain_path.write_text(json.dumps(content_index, indent=4))
+    normalized_path = NormalizedIndex.from_content_index(content_index).write(tmp_path / "content_index_normalized.json")
+
+    assert plain_path.stat().st_size > 4 * normalized_path.stat().st_size
+
+def test_query_engine_over_normalized_index():
+    """The query engine reads a normalized index like a plain one."""
+    term_weights = {"bear": 0.6, "outstand": 0.4}
+
+    expected = QueryEngine(CONTENT_INDEX).search(term_weights, 3)
+
+    assert QueryEngine(NormalizedIndex.from_content_index(CONTENT_INDEX)).search(term_weights, 3) == expected
+
+def test_query_engine_expands_terms_lazily(monkeypatch):
+    """The engine reads a term's postings on its first lookup and never joins documents."""
+    index = NormalizedIndex.from_content_index(CONTENT_INDEX)
+    read_terms = []
+    postings = index.postings
+    monkeypatch.setattr(index, "postings", lambda term: read_terms.append(term) or postings(term))
+    monkeypatch.setattr(NormalizedIndex, "__getitem__", lambda self, term: pytest.fail("postings were joined"))
+
+    engine = QueryEngine(index)
+    assert read_terms == []
+
+    engine.search({"bear": 1.0}, 3)
+    engine.search({"bear": 0.5}, 3)
+    assert read_terms == ["bear"]
+    assert engine.search({"bear": 1.0}, 3, model="cosine") == QueryEngine(CONTENT_INDEX).search({"bear": 1.0}, 3, model="cosine")
+
+def test_push_normalized_layout(firestore_db):
+    """Normalized term documents reference content ids instead of copying attributes."""
+    indexer = Indexer()
+    indexer.db = firestore_db
+    indexer.content_index.update(CONTENT_INDEX)
+
+    indexer.push_index_to_firestore(uploader=FirestoreUploader(firestore_db), normalized=True)
+
+    head = firestore_db.collections["content_index"]["bear"]
+    assert head["postings"] == [["2", 2.1972], ["10", 0.4055]]
+    assert "content" not in head
+    assert Indexer.read_term_postings(firestore_db, "bear") == [
+        {"id": "2", "weight": 2.1972},
+        {"id": "10", "weight": 0.4055},
+    ]
+
+def test_sync_rewrites_terms_when_switching_layout(firestore_db, tmp_path):
+    """A layout change alters the stored hashes, so every term is rewritten."""
+    manifest_path = str(tmp_path / "manifest.json")
+    uploader = FirestoreUploader(firestore_db)
+    indexer = Indexer()
+    indexer.db = firestore_db
+    indexer.content_index.update(CONTENT_INDEX)
+
+    indexer.sync_index_to_firestore(manifest_path=manifest_path, uploader=uploader)
+    result = indexer.sync_index_to_firestore(manifest_path=manifest_path, uploader=uploader, normalized=True)
+
+    assert result["uploaded"].written == 3
+    assert firestore_db.collections["content_index"]["scarecrow"]["postings"] == [["1", 1.0986]]
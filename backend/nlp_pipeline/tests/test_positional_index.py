@@ -0,0 +1,85 @@
+import pytest
+from ..services.Indexer import Indexer
+from ..services.PositionalIndex import (
+    PositionalIndex, decode_positions, encode_positions, intersect_positions, within_window,
+)
+
+@pytest.mark.parametrize("positions", [[], [0], [0, 1, 2], [3, 130, 20000]])
+def test_positions_round_trip(positions):
+    """Offsets survive delta and varint encoding."""
+    assert decode_positions(encode_positions(positions)) == positions
+
+def test_intersect_positions():
+    """Offsets are matched at an exact distance in one linear pass."""
+    assert intersect_positions([1, 4, 9], [2, 6, 10], 1) == [2, 10]
+    assert intersect_positions([1, 4, 9], [2, 6, 10], 2) == [6]
+
+def test_within_window():
+    """All lists must have an offset inside the same span."""
+    assert within_window([[0, 20], [23]], 4)
+    assert not within_window([[0, 20], [25]], 4)
+
+@pytest.fixture
+def positional_index():
+    index = PositionalIndex()
+    index.add_document("1", ["banana", "peel", "slip"])
+    index.add_document("2", ["peel", "banana", "split"])
+    index.add_document("3", ["pie", "face", "banana", "x", "x", "peel"])
+    return index
+
+@pytest.mark.parametrize("terms, expected", [
+    (["banana", "peel"], ["1"]),
+    (["peel", "banana"], ["2"]),
+    (["banana", "peel", "slip"], ["1"]),
+    (["pie", "face"], ["3"]),
+    (["banana", "pie"], []),
+    (["gummy"], []),
+])
+def test_phrase_query(positional_index, terms, expected):
+    """Phrases match consecutive terms in order."""
+    assert positional_index.phrase_query(terms) == expected
+
+def test_proximity_query(positional_index):
+    """Proximity matches ignore order but bound the span."""
+    assert sorted(positional_index.proximity_query(["banana", "peel"], 2)) == ["1", "2"]
+    assert sorted(positional_index.proximity_query(["banana", "peel"], 4)) == ["1", "2", "3"]
+
+def test_remove_document(positional_index):
+    """Removed documents no longer match and empty terms are dropped."""
+    positional_index.remove_document("3", ["pie", "face", "banana", "peel"])
+
+    assert positional_index.phrase_query(["pie", "face"]) == []
+    assert "pie" not in positional_index.postings
+
+def test_indexer_phrase_search(tmp_path, token_cache_path):
+    """A positional build answers phrase queries through the indexing pipeline."""
+    input_csv_path = tmp_path / "test_humor.csv"
+    input_csv_path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score\n"
+        "1,He slipped on a banana peel and got a pie in the face,false,2,0.9\n"
+        "2,Peel the banana before you throw the pie,false,2,0.8\n"
+    )
+    indexer = Indexer(positional=True, token_cache_path=token_cache_path)
+    indexer.build_index(input_csv_path, output_path=tmp_path / "content_index.json")
+
+    assert indexer.phrase_search("banana peel") == ["1"]
+    assert indexer.phrase_search("pie in the face") == ["1"]
+    assert sorted(indexer.proximity_search("banana peel", 2)) == ["1", "2"]
+    assert indexer.term_freq["banana"] == {"1": 1, "2": 1}
+
+    indexer.delete_documents(["1"])
+    assert indexer.phrase_search("banana peel") == []
+
+def test_phrase_search_needs_positions():
+    """A plain index refuses phrase queries instead of guessing."""
+    with pytest.raises(ValueError):
+        Indexer().phrase_search("banana peel")
+
+def test_other_builds_refuse_positions(tmp_path):
+    """Builds that cannot keep positions fail instead of dropping them silently."""
+    indexer = Indexer(positional=True)
+
+    with pytest.raises(ValueError):
+        indexer.build_index_external(tmp_path / "test_humor.csv", tmp_path / "content_index.json")
+    with pytest.raises(ValueError):
+        indexer.build_shards(tmp_path / "test_humor.csv", 2, output_dir=str(tmp_path / "shards"))
@@ -0,0 +1,285 @@
+import pytest
+import random
+from collections import defaultdict
+from ..services.BinaryIndex import POSTING_BLOCK_SIZE, BinaryIndexReader, BinaryIndexWriter
+from ..services.Indexer import Indexer
+from ..services.QueryEngine import ListLookup, QueryEngine, TermPostings, gallop_to, union_postings
+from .conftest import random_content_index
+
+CONTENT_INDEX = {
+    "bear": [
+        {"id": "2", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.8, "weight": 2.1972},
+        {"id": "4", "humor_type": "3", "emoji_presence": False, "humor_type_score": 0.4, "weight": 0.6931},
+    ],
+    "outstand": [
+        {"id": "1", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.9, "weight": 0.4055},
+        {"id": "3", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.85, "weight": 0.4055},
+    ],
+    "scarecrow": [
+        {"id": "1", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.9, "weight": 1.0986},
+    ],
+}
+
+def exhaustive_scores(content_index, term_weights):
+    scores = defaultdict(float)
+    for term, query_weight in term_weights.items():
+        for posting in content_index.get(term, []):
+            scores[posting["id"]] += query_weight * posting["weight"]
+    return scores
+
+@pytest.mark.parametrize(
+    "term_weights, k, expected",
+    [
+        ({"bear": 0.5, "scarecrow": 0.5}, 2, [("2", 1.0986), ("1", 0.5493)]),
+        ({"outstand": 1.0, "scarecrow": 1.0}, 1, [("1", 1.5041)]),
+        ({"comedian": 1.0}, 3, []),
+        ({}, 3, []),
+    ],
+)
+def test_search(term_weights, k, expected):
+    """Search returns the highest scoring content ids."""
+    assert QueryEngine(CONTENT_INDEX).search(term_weights, k) == expected
+
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_search_matches_exhaustive_scoring(k):
+    """WAND skipping returns the same top-k scores as scoring every document."""
+    content_index = random_content_index()
+    engine = QueryEngine(content_index)
+    rng = random.Random(k)
+
+    for _ in range(20):
+        term_weights = {f"term{term}": round(rng.uniform(0.1, 1.0), 3) for term in rng.sample(range(45), 4)}
+        expected = sorted(exhaustive_scores(content_index, term_weights).values(), reverse=True)[:k]
+
+        results = engine.search(term_weights, k)
+
+        assert [score for _, score in results] == pytest.approx(expected, abs=1e-4)
+
+def test_search_over_binary_index(tmp_path):
+    """The engine reads postings lazily from a memory-mapped binary index."""
+    index_path = BinaryIndexWriter.write(CONTENT_INDEX, tmp_path / "content_index.bin")
+
+    with BinaryIndexReader(index_path) as reader:
+        results = QueryEngine(reader).search({"bear": 0.5, "scarecrow": 0.5}, 2)
+
+    assert [content_id for content_id, _ in results] == ["2", "1"]
+    assert [score for _, score in results] == pytest.approx([1.0986, 0.5493], abs=1e-3)
+
+@pytest.mark.parametrize("humor_types", [["2"], ["1", "3"], []])
+def test_search_by_humor_type(tmp_path, humor_types):
+    """Filtered searches over dict and binary indexes only return the requested types."""
+    content_index = random_content_index(humor_type_count=5)
+    term_weights = {"term1": 0.7, "term2": 0.4, "term3": 0.2}
+    filtered_index = {
+        term: [posting for posting in content if posting["humor_type"] in humor_types]
+        for term, content in content_index.items()
+    }
+    expected = sorted(exhaustive_scores(filtered_index, term_weights).values(), reverse=True)[:10]
+    index_path = BinaryIndexWriter.write(content_index, tmp_path / "content_index.bin")
+
+    with BinaryIndexReader(index_path) as reader:
+        for engine in [QueryEngine(content_index), QueryEngine(reader)]:
+            for model in ["tfidf", "cosine"]:
+                results = engine.search(term_weights, 10, model=model, humor_types=humor_types)
+                assert all(int(content_id) % 5 + 1 in map(int, humor_types) for content_id, _ in results)
+            results = engine.search(term_weights, 10, humor_types=humor_types)
+            assert [score for _, score in results] == pytest.approx(expected, abs=1e-3)
+
+def test_filtered_search_keeps_unfiltered_scores(tmp_path):
+    """A humor type filter drops documents but changes no score, so the IDF stays the corpus IDF."""
+    content_index = random_content_index(humor_type_count=5)
+    term_freq = {
+        term: {posting["id"]: 1 + int(posting["weight"]) for posting in content}
+        for term, content in content_index.items()
+    }
+    term_weights = {"term1": 0.7, "term2": 0.4, "term3": 0.2}
+    index_path = BinaryIndexWriter.write(content_index, tmp_path / "content_index.bin", term_freq=term_freq)
+
+    with BinaryIndexReader(index_path) as reader:
+        for engine in [QueryEngine(content_index, term_freq=term_freq), QueryEngine(reader)]:
+            for model in ["tfidf", "bm25", "cosine"]:
+                unfiltered = dict(engine.search(term_weights, 300, model=model))
+                filtered = engine.search(term_weights, 300, model=model, humor_types=["1"])
+                assert filtered
+                assert all(score == unfiltered[content_id] for content_id, score in filtered)
+
+def test_search_by_type_counts():
+    """A type-proportional feed returns the requested number of results per type."""
+    engine = QueryEngine(CONTENT_INDEX)
+
+    feed = engine.search_by_type_counts({"bear": 1.0, "outstand": 1.0}, {"2": 2, "3": 1, "1": 0})
+
+    assert feed == {"2": [("2", 2.1972), ("1", 0.4055)], "3": [("4", 0.6931)]}
+
+def random_priors(doc_count=300, seed=11):
+    rng = random.Random(seed)
+    return {str(doc): round(1 + 0.1 * rng.expovariate(0.3), 4) for doc in range(doc_count)}
+
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_search_by_impact_matches_exhaustive_scoring(k):
+    """Impact-ordered early termination returns the exact top-k with priors."""
+    content_index = random_content_index()
+    priors = random_priors()
+    engine = QueryEngine(content_index, doc_priors=priors)
+    rng = random.Random(k)
+
+    for _ in range(20):
+        term_weights = {f"term{term}": round(rng.uniform(0.1, 1.0), 3) for term in rng.sample(range(45), 3)}
+        scores = defaultdict(float)
+        for term, query_weight in term_weights.items():
+            for posting in content_index.get(term, []):
+                scores[posting["id"]] += query_weight * posting["weight"] * priors[posting["id"]]
+        expected = sorted(scores.values(), reverse=True)[:k]
+
+        results = engine.search_by_impact(term_weights, k)
+
+        assert [score for _, score in results] == pytest.approx(expected, abs=1e-4)
+
+def test_search_by_impact_decodes_a_prefix(tmp_path):
+    """Frequent-term queries over a binary index decode a small, slowly growing share of their postings."""
+    term_weights = {"term1": 0.6, "term2": 0.4}
+    postings_decoded = []
+    for doc_count in [8000, 50000]:
+        content_index = random_content_index(doc_count=doc_count, vocabulary_size=10)
+        priors = random_priors(doc_count)
+        index_path = BinaryIndexWriter.write(content_index, str(tmp_path / f"{doc_count}.bin"), doc_priors=priors)
+        with BinaryIndexReader(index_path) as reader:
+            engine = QueryEngine(reader)
+            results = engine.search_by_impact(term_weights, 10)
+            postings_decoded.append(reader.postings_decoded)
+            assert results == QueryEngine(reader.to_content_index(), doc_priors=priors).search_by_impact(term_weights, 10)
+            del engine
+        total = len(content_index["term1"]) + len(content_index["term2"])
+        assert postings_decoded[-1] < total / 4
+
+    assert postings_decoded[1] < 2.5 * postings_decoded[0]
+
+def test_stored_priors_rank_every_load_path(tmp_path, token_cache_path):
+    """Binary, normalized and shared indexes rank by impact with the priors they were built with."""
+    content_index = random_content_index()
+    priors = random_priors()
+    indexer = Indexer(token_cache_path=token_cache_path)
+    indexer.content_index.update(content_index)
+    indexer.doc_priors.update(priors)
+    binary_path = indexer.write_binary_index(str(tmp_path / "content_index.bin"))
+    normalized_path = indexer.write_normalized_index(str(tmp_path / "content_index_normalized.json"))
+    # The binary layouts quantize weights, so they are checked against their decoded content
+    with BinaryIndexReader(binary_path) as reader:
+        decoded = reader.to_content_index()
+    rng = random.Random(3)
+
+    with indexer.publish_shared_index() as shared:
+        engines = [
+            (QueryEngine.from_file(binary_path), QueryEngine(decoded, doc_priors=priors)),
+            (QueryEngine(shared), QueryEngine(decoded, doc_priors=priors)),
+            (QueryEngine.from_file(normalized_path), QueryEngine(content_index, doc_priors=priors)),
+        ]
+        for engine, reference in engines:
+            assert engine.priors().tolist() == [priors[str(doc)] for doc in range(300)]
+            for _ in range(10):
+                term_weights = {f"term{term}": round(rng.uniform(0.1, 1.0), 3) for term in rng.sample(range(45), 3)}
+                assert engine.search_by_impact(term_weights, 5) == reference.search_by_impact(term_weights, 5)
+        del engines
+
+def test_without_priors_impact_is_the_weight():
+    """Documents without a prior rank by their TF-IDF weight alone."""
+    engine = QueryEngine(CONTENT_INDEX)
+
+    assert engine.search_by_impact({"bear": 0.5, "scarecrow": 0.5}, 2) == engine.search({"bear": 0.5, "scarecrow": 0.5}, 2)
+
+@pytest.mark.parametrize(
+    "ordinals, target, start, expected",
+    [
+        ([1, 3, 5, 7, 9, 11], 7, 0, 3),
+        ([1, 3, 5, 7, 9, 11], 8, 2, 4),
+        ([1, 3, 5, 7, 9, 11], 0, 0, 0),
+        ([1, 3, 5, 7, 9, 11], 12, 1, 6),
+        ([1, 3, 5, 7, 9, 11], 3, 4, 4),
+    ],
+)
+def test_gallop_to(ordinals, target, start, expected):
+    """Galloping finds the first ordinal at or after the target from start."""
+    assert gallop_to(ordinals, target, start) == expected
+
+def term_postings(ordinals):
+    return TermPostings(ordinals, [1] * len(ordinals), [1.0] * len(ordinals), 1.0)
+
+def test_set_operations():
+    """Union and lookups match their set counterparts, in any probe order."""
+    rng = random.Random(3)
+    lists = [sorted(rng.sample(range(1000), size)) for size in [5, 300, 600]]
+    lookup = ListLookup(term_postings(lists[2]))
+
+    assert union_postings(lists) == sorted(set().union(*lists))
+    assert [ordinal for ordinal in lists[1] if lookup.find(ordinal)] == sorted(set(lists[1]) & set(lists[2]))
+    assert [ordinal for ordinal in reversed(lists[1]) if lookup.find(ordinal)] == sorted(set(lists[1]) & set(lists[2]), reverse=True)
+
+class CountingList(list):
+    """A posting list that counts how many of its entries are read."""
+
+    def __init__(self, values):
+        super().__init__(values)
+        self.reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
+def test_intersection_cost_follows_the_rare_list():
+    """A rare term intersected with common terms costs about the rare list, not the common ones."""
+    rare = list(range(0, 4_000_000, 200_000))
+
+    def entries_read(common_size):
+        # Both common lists span the rare list's range at a density of common_size
+        step = 4_000_000 // common_size
+        common = [CountingList(range(0, 4_000_000, step)), CountingList(range(0, 4_000_000, step // 2))]
+        lookups = [ListLookup(term_postings(ordinals)) for ordinals in common]
+        assert [ordinal for ordinal in rare if all(lookup.find(ordinal) for lookup in lookups)] == rare
+        return sum(ordinals.reads for ordinals in common), sum(len(ordinals) for ordinals in common)
+
+    (small, _), (large, common_length) = entries_read(10_000), entries_read(1_000_000)
+    # Galloping reads O(log gap) entries per rare posting, so 100x longer
+    # common lists only add a few probes each
+    assert large < 2 * small
+    assert large < common_length / 1000
+
+@pytest.mark.parametrize(
+    "must, should, must_not, expected",
+    [
+        (["bear"], [], [], [("2", 2.1972), ("4", 0.6931)]),
+        (["outstand", "scarecrow"], [], [], [("1", 1.5041)]),
+        ([], ["bear", "scarecrow"], [], [("2", 2.1972), ("1", 1.0986), ("4", 0.6931)]),
+        ([], ["bear", "outstand"], ["scarecrow"], [("2", 2.1972), ("4", 0.6931), ("3", 0.4055)]),
+        (["outstand"], ["scarecrow", "bear"], [], [("1", 1.5041)]),
+        (["bear", "comedian"], [], [], []),
+        ([], [], ["bear"], []),
+    ],
+)
+def test_boolean_search(must, should, must_not, expected):
+    """AND, OR and NOT clauses filter the matches before they are ranked."""
+    assert QueryEngine(CONTENT_INDEX).boolean_search(must, should, must_not) == expected
+
+def test_boolean_search_over_binary_index_decodes_blocks_of_the_candidates(tmp_path):
+    """A rare term ANDed with a common one decodes a block of the common list per candidate, not the list."""
+    rng = random.Random(5)
+    content_index = defaultdict(list)
+    for doc in range(50_000):
+        posting = {"id": str(doc), "humor_type": str(doc % 2 + 1), "emoji_presence": False,
+                   "humor_type_score": 0.5, "weight": round(rng.uniform(0.01, 5.0), 4)}
+        content_index["common"].append(posting)
+        if doc % 5000 == 0 or doc % 4999 == 1:
+            content_index["rare"].append({**posting, "weight": 1.0})
+        if doc % 3 == 0:
+            content_index["third"].append(posting)
+    index_path = BinaryIndexWriter.write(content_index, str(tmp_path / "content_index.bin"))
+    with BinaryIndexReader(index_path) as reader:
+        decoded = reader.to_content_index()
+        for must, must_not in [(["rare", "common"], []), (["common", "rare"], ["third"])]:
+            engine = QueryEngine(reader)
+            reader.postings_decoded = 0
+            assert engine.boolean_search(must, must_not=must_not, k=50) == \
+                QueryEngine(decoded).boolean_search(must, must_not=must_not, k=50)
+            # At most one block per candidate and term
+            assert reader.postings_decoded <= len(content_index["rare"]) * POSTING_BLOCK_SIZE * len(must + must_not)
+            assert reader.postings_decoded < len(content_index["common"]) / 5
+        del engine
@@ -0,0 +1,97 @@
+import pytest
+import math
+import numpy as np
+from ..services.BinaryIndex import BinaryIndexReader, BinaryIndexWriter
+from ..services.QueryEngine import QueryEngine
+from ..services.ScoringModels import BM25Model, CorpusStatistics, TfIdfModel, get_scoring_model, score_candidates
+
+# Document "1" is short, document "2" is long and repeats "bear" twice
+TERM_FREQ = {
+    "bear": {"1": 1, "2": 2},
+    "gummy": {"2": 1},
+    "teeth": {"2": 1},
+    "call": {"2": 1},
+    "honey": {"2": 1, "3": 1},
+    "scarecrow": {"3": 1},
+}
+DOC_COUNT = 3
+
+def build_content_index():
+    content_index = {}
+    for term, postings in TERM_FREQ.items():
+        idf = math.log(DOC_COUNT / len(postings))
+        content_index[term] = [
+            {"id": doc_id, "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.5, "weight": round(tf * idf, 4)}
+            for doc_id, tf in postings.items()
+        ]
+    return content_index
+
+@pytest.fixture
+def engine():
+    return QueryEngine(build_content_index(), term_freq=TERM_FREQ)
+
+def test_bm25_score_term():
+    """BM25 follows the Okapi formula with length normalization."""
+    stats = CorpusStatistics(doc_lengths=[1, 6, 2], doc_norms=[1.0, 1.0, 1.0])
+    model = BM25Model(k1=1.2, b=0.75)
+
+    scores = model.score_term(np.array([0, 1]), np.array([1.0, 2.0]), np.array([0.4, 0.8]), 2, 1.0, stats)
+
+    idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+    expected = [
+        idf * 1 * 2.2 / (1 + 1.2 * (0.25 + 0.75 * 1 / 3)),
+        idf * 2 * 2.2 / (2 + 1.2 * (0.25 + 0.75 * 6 / 3)),
+    ]
+    assert scores == pytest.approx(expected)
+
+def test_tfidf_model_matches_wand(engine):
+    """The vectorized TF-IDF pass ranks like the WAND search."""
+    term_weights = {"bear": 0.5, "honey": 0.3, "scarecrow": 0.2}
+    term_postings = {}
+    for term in term_weights:
+        postings = engine.term_postings(term)
+        term_postings[term] = (np.array(postings.ordinals), np.array(postings.tfs, dtype=float), np.array(postings.weights))
+
+    vectorized = score_candidates(TfIdfModel(), term_postings, term_weights, engine.statistics(), 3)
+
+    assert [(engine.content_id(ordinal), round(score, 4)) for ordinal, score in vectorized] == engine.search(term_weights, 3)
+
+def test_length_normalization_favours_short_documents(engine):
+    """Raw TF-IDF prefers the long post; BM25 and cosine prefer the short one."""
+    assert engine.search({"bear": 1.0}, 1)[0][0] == "2"
+    assert engine.search({"bear": 1.0}, 1, model="bm25", b=1.0)[0][0] == "1"
+    assert engine.search({"bear": 1.0}, 1, model="cosine")[0][0] == "1"
+
+def test_cosine_scores_are_bounded(engine):
+    """Cosine similarity never exceeds one."""
+    results = engine.search({"bear": 0.5, "honey": 0.5}, 3, model="cosine")
+
+    assert all(0 < score <= 1 for _, score in results)
+
+def test_switch_models_over_binary_index(tmp_path, engine):
+    """Document statistics stored in the binary index allow any model at query time."""
+    content_index = build_content_index()
+    doc_stats = {"1": {"length": 1, "norm": 0.4055}, "2": {"length": 6, "norm": 3.0}, "3": {"length": 2, "norm": 1.2}}
+    index_path = BinaryIndexWriter.write(content_index, tmp_path / "content_index.bin", term_freq=TERM_FREQ, doc_stats=doc_stats)
+
+    with BinaryIndexReader(index_path) as reader:
+        assert reader.has_term_freqs
+        assert reader.avg_doc_length == pytest.approx(3.0)
+        binary_engine = QueryEngine(reader)
+        for model in ["tfidf", "bm25", "cosine"]:
+            results = binary_engine.search({"bear": 0.6, "honey": 0.4}, 3, model=model)
+            assert len(results) == 3
+
+        bm25 = binary_engine.search({"bear": 0.6, "honey": 0.4}, 3, model="bm25")
+        expected = QueryEngine(content_index, term_freq=TERM_FREQ, doc_stats=doc_stats).search({"bear": 0.6, "honey": 0.4}, 3, model="bm25")
+        assert [content_id for content_id, _ in bm25] == [content_id for content_id, _ in expected]
+
+def test_bm25_requires_term_frequencies():
+    """An index without term frequencies cannot be scored with BM25."""
+    with pytest.raises(ValueError):
+        QueryEngine(build_content_index()).search({"bear": 1.0}, 1, model="bm25")
+
+def test_unknown_model():
+    """Asking for an unknown model fails with the available choices."""
+    with pytest.raises(ValueError, match="bm25"):
+        get_scoring_model("pagerank")
@@ -0,0 +1,88 @@
+import pytest
+from ..services.Indexer import Indexer
+from ..services.ShardedIndex import ShardCoordinator, shard_for
+
+JOKES = [
+    "Why did the scarecrow become a comedian? He's outstanding!",
+    "What do you call a bear with no teeth? A gummy bear!",
+    "Why did the fake spaghetti become outstanding? An impasta!",
+    "The bear sat on the scarecrow and the comedian laughed",
+    "A comedian told a joke about spaghetti to a bear",
+    "I told my friend a joke about teeth but it was too cheesy",
+    "The scarecrow won an award for being outstanding in his field",
+    "A gummy bear walked into a bar",
+]
+
+@pytest.fixture(scope="module")
+def input_csv_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("sharded") / "test_humor.csv"
+    path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score\n"
+        + "".join(f"{i},{text},false,{i % 3 + 1},0.5\n" for i, text in enumerate(JOKES, start=1))
+    )
+    return path
+
+def test_shard_for_is_stable():
+    """A document always lands on the same shard."""
+    assert [shard_for(str(i), 4) for i in range(8)] == [shard_for(str(i), 4) for i in range(8)]
+    assert {shard_for(str(i), 4) for i in range(100)} == {0, 1, 2, 3}
+
+@pytest.mark.parametrize(
+    "term_weights",
+    [
+        {"bear": 1.0},
+        {"scarecrow": 0.5, "comedian": 0.5},
+        {"outstand": 0.4, "spaghetti": 0.3, "teeth": 0.3},
+        {"missing": 1.0},
+    ],
+)
+def test_scatter_gather_matches_single_index(input_csv_path, tmp_path, token_cache_path, term_weights):
+    """Sharded search with global IDF ranks like the unsharded index."""
+    single = Indexer(token_cache_path=token_cache_path)
+    single.build_index(input_csv_path, output_path=tmp_path / "content_index.json")
+    expected = single.query_engine().search(term_weights, 5)
+
+    shard_paths = Indexer(token_cache_path=token_cache_path).build_shards(input_csv_path, 3, output_dir=str(tmp_path / "shards"))
+    with ShardCoordinator(str(tmp_path / "shards"), processes=2) as coordinator:
+        results = coordinator.search(term_weights, 5)
+
+    assert len(shard_paths) == 3
+    assert coordinator.doc_count == len(JOKES)
+    assert [content_id for content_id, _ in results] == [content_id for content_id, _ in expected]
+    assert [score for _, score in results] == pytest.approx([score for _, score in expected], abs=1e-3)
+
+def test_duplicate_ids_count_once_in_global_statistics(tmp_path, token_cache_path):
+    """A repeated id adds neither a document nor document frequency to the global statistics."""
+    input_csv_path = tmp_path / "test_humor.csv"
+    input_csv_path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score\n"
+        + "".join(f"{i},{text},false,1,0.5\n" for i, text in enumerate(JOKES[:4], start=1))
+        + f"2,{JOKES[4]},false,1,0.5\n"
+    )
+    Indexer(token_cache_path=token_cache_path).build_shards(input_csv_path, 2, output_dir=str(tmp_path / "shards"))
+
+    with ShardCoordinator(str(tmp_path / "shards"), processes=1) as coordinator:
+        assert coordinator.doc_count == 4
+        assert coordinator.doc_freqs["bear"] == 2
+        assert coordinator.doc_freqs["spaghetti"] == 1
+        assert [content_id for content_id, _ in coordinator.search({"bear": 1.0})] == ["2", "4"]
+
+def test_sharded_search_by_impact_uses_stored_priors(tmp_path, token_cache_path):
+    """Shards store the static priors, so sharded impact search ranks like the single index."""
+    input_csv_path = tmp_path / "test_posts.csv"
+    input_csv_path.write_text(
+        "id,text,emoji_presence,humor_type,humor_type_score,likes\n"
+        + "".join(f"{i},{text},false,1,0.5,{i ** 3}\n" for i, text in enumerate(JOKES, start=1))
+    )
+    single = Indexer(token_cache_path=token_cache_path)
+    single.build_index(input_csv_path, output_path=tmp_path / "content_index.json")
+    Indexer(token_cache_path=token_cache_path).build_shards(input_csv_path, 3, output_dir=str(tmp_path / "shards"))
+
+    with ShardCoordinator(str(tmp_path / "shards"), processes=2) as coordinator:
+        for term_weights in [{"bear": 1.0}, {"scarecrow": 0.5, "comedian": 0.5}]:
+            expected = single.query_engine().search_by_impact(term_weights, 5)
+            results = coordinator.search_by_impact(term_weights, 5)
+
+            assert [content_id for content_id, _ in results] == [content_id for content_id, _ in expected]
+            assert [score for _, score in results] == pytest.approx([score for _, score in expected], abs=1e-3)
+            assert results != coordinator.search(term_weights, 5)
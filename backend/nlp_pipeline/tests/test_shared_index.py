@@ -0,0 +1,84 @@
+from multiprocessing import Pool
+from ..services.Indexer import Indexer
+from ..services.QueryEngine import QueryEngine
+from ..services.BinaryIndex import is_binary_index
+from ..services.SharedIndex import SharedIndex
+from .conftest import CONTENT_INDEX
+
+TERM_FREQ = {"bear": {"2": 2, "10": 1}, "scarecrow": {"1": 1}, "outstand": {"1": 1, "3": 1}}
+QUERIES = [{"bear": 0.5, "scarecrow": 0.5}, {"outstand": 1.0}, {"bear": 0.2, "outstand": 0.8}]
+
+def search_in_worker(name):
+    """Attach to the published block by name, as a server worker would."""
+    index = SharedIndex.attach(name)
+    engine = QueryEngine(index)
+    results = [engine.search(query, 3) for query in QUERIES]
+    index.close()
+    return results
+
+def test_round_trip(tmp_path):
+    """The shared index file is a binary index that decodes back to the content index."""
+    path = SharedIndex.write(CONTENT_INDEX, tmp_path / "content_index.shm", term_freq=TERM_FREQ)
+
+    assert is_binary_index(path)
+    with SharedIndex.open(path) as index:
+        assert index.has_term_freqs
+        assert "bear" in index and "comedian" not in index
+        assert index.doc_freq("outstand") == 2
+        assert index.to_content_index() == {term: sorted(content, key=lambda p: int(p["id"])) for term, content in CONTENT_INDEX.items()}
+        ordinals, tfs, _ = index.term_postings("bear", humor_types=["3"])
+        assert ordinals == [3] and tfs == [1]
+
+def test_published_block_searches_like_the_content_index():
+    """The engine reads the block in place with the binary reader."""
+    with SharedIndex.publish(CONTENT_INDEX, term_freq=TERM_FREQ) as index:
+        engine = QueryEngine(index)
+        for query in QUERIES:
+            assert engine.search(query, 3) == QueryEngine(CONTENT_INDEX).search(query, 3)
+            assert engine.search(query, 3, model="bm25") == QueryEngine(CONTENT_INDEX, term_freq=TERM_FREQ).search(query, 3, model="bm25")
+        del engine
+
+def test_shared_index_file_loads_and_pushes(tmp_path):
+    """load_index and the Firestore push read the file written for workers."""
+    indexer = Indexer(token_cache_path=str(tmp_path / "token_cache.sqlite"))
+    indexer.content_index.update(CONTENT_INDEX)
+    indexer.term_freq.update(TERM_FREQ)
+    path = indexer.write_shared_index(tmp_path / "content_index.shm")
+
+    loaded = Indexer.load_index(path)
+
+    assert loaded == {term: sorted(content, key=lambda p: int(p["id"])) for term, content in CONTENT_INDEX.items()}
+    assert QueryEngine.from_file(path).search(QUERIES[0], 3) == QueryEngine(CONTENT_INDEX).search(QUERIES[0], 3)
+
+def test_workers_attach_to_one_published_copy():
+    """Every worker process searches the same shared memory block, which outlives them."""
+    indexer = Indexer()
+    indexer.content_index.update(CONTENT_INDEX)
+    indexer.term_freq.update(TERM_FREQ)
+
+    with indexer.publish_shared_index() as published:
+        with Pool(2) as pool:
+            worker_results = pool.map(search_in_worker, [published.name] * 4)
+        with SharedIndex.attach(published.name) as attached:
+            assert attached.name == published.name
+            assert attached.doc_freq("bear") == 2
+
+    expected = [QueryEngine(CONTENT_INDEX).search(query, 3) for query in QUERIES]
+    assert worker_results == [expected] * 4
+
+def test_workers_keep_a_bounded_number_of_decoded_terms():
+    """An engine over the shared block only keeps its most recently searched terms decoded."""
+    with SharedIndex.publish(CONTENT_INDEX, term_freq=TERM_FREQ) as index:
+        engine = QueryEngine(index, cache_size=2)
+        for term in ["bear", "scarecrow", "outstand"]:
+            engine.search({term: 1.0}, 3, model="bm25")
+            engine.search({term: 1.0}, 3, humor_types=["2"])
+        assert engine._decoded_postings.cache_info().currsize == 2
+        assert engine._filtered_postings.cache_info().currsize == 2
+
+        decoded = index.postings_decoded
+        engine.term_postings("outstand")
+        assert index.postings_decoded == decoded
+        engine.term_postings("bear")
+        assert index.postings_decoded == decoded + 2
+        del engine
@@ -0,0 +1,121 @@
+import threading
+import time
+import pytest
+from ...shared_utils.services import SpellingCorrector as spelling_corrector_module
+from ...shared_utils.services.SpellingCorrector import DeleteTable, SpellingCorrector, deletes, edit_distance, within_one_edit
+
+VOCABULARY = ["scarecrow", "comedian", "outstanding", "impaste", "impasto", "wife", "they'll"]
+
+@pytest.fixture(scope="module")
+def corrector():
+    """A corrector restricted to a small vocabulary, so its table builds instantly."""
+    return SpellingCorrector(vocabulary=VOCABULARY)
+
+@pytest.mark.parametrize(
+    "source, target, expected",
+    [
+        ("comedian", "comedian", 0),
+        ("commedian", "comedian", 1),
+        ("theyll", "they'll", 1),
+        ("wfie", "wife", 1),
+        ("ca", "abc", 2),
+        ("kitten", "sitting", 3),
+    ]
+)
+def test_edit_distance(source, target, expected):
+    """Inserts, deletes, substitutions and swaps each count as one edit."""
+    assert edit_distance(source, target) == expected
+
+def test_bounded_edit_distance_and_one_edit_check():
+    """The fast checks agree with the full distance on every pair of short strings."""
+    strings = ["", "a", "ab", "ba", "abc", "acb", "bca", "abcd", "dcba"]
+    for source in strings:
+        for target in strings:
+            distance = edit_distance(source, target)
+            assert within_one_edit(source, target) == (distance == 1)
+            assert edit_distance(source, target, 1) == min(distance, 2)
+
+def test_deletes():
+    assert deletes("bear", 1) == {"bear", "ear", "bar", "ber", "bea"}
+    assert len(deletes("bear")) == 11
+
+@pytest.mark.parametrize(
+    "token, expected",
+    [
+        ("comedian", "comedian"),
+        ("Comedian?", "comedian"),
+        ("outstandng", "outstanding"),
+        ("theyll", "they'll"),
+        ("wiffe", "wife"),
+        ("scarcrw", "scarecrow"),
+        ("impasta", "impaste"),
+        ("spaghetti", "spaghetti"),
+        ("2", "2"),
+        ("!", "!"),
+    ]
+)
+def test_correction(corrector, token, expected):
+    """The closest, most frequent word wins, ties alphabetically; tokens without one are kept."""
+    assert corrector.correction(token) == expected
+
+def test_known_words_skip_the_table():
+    """Tokens that are already words never load the delete table."""
+    corrector = SpellingCorrector(vocabulary=VOCABULARY)
+
+    assert corrector.correct(["Scarecrow", "wife"]) == ["Scarecrow", "wife"]
+    assert corrector.table is None
+
+def test_corrections_are_cached(corrector):
+    corrector.correction("commedian")
+    hits = corrector.correction.cache_info().hits
+
+    corrector.correction("commedian")
+
+    assert corrector.correction.cache_info().hits == hits + 1
+
+def test_table_is_stored_and_reloaded(tmp_path):
+    """The table is written on first use and mapped, not rebuilt, by later correctors."""
+    table_path = tmp_path / "spelling_deletes.bin"
+    built = SpellingCorrector(vocabulary=VOCABULARY, table_path=str(table_path))
+    assert built.correction("comedan") == "comedian"
+    assert isinstance(built.table, DeleteTable)
+
+    in_memory = SpellingCorrector(vocabulary=VOCABULARY).load_table()
+    loaded = SpellingCorrector(vocabulary=VOCABULARY, table_path=str(table_path))
+    assert loaded.load_table().key == built.table.key
+    assert all(tuple(loaded.table.get(variant)) == tuple(numbers) for variant, numbers in in_memory.items())
+    assert loaded.table.get("zzzz") is None
+
+    other = SpellingCorrector(vocabulary=["bear"], table_path=str(table_path))
+    assert other.correction("beer") == "bear"
+    assert other.table.key != built.table.key
+
+def test_concurrent_loads_build_the_table_once(tmp_path, monkeypatch):
+    """Correctors starting together wait for the first build instead of repeating it."""
+    table_path = str(tmp_path / "spelling_deletes.bin")
+    writes = []
+    write_delete_table = spelling_corrector_module.write_delete_table
+
+    def slow_write(*args):
+        # Give the other correctors time to find the table missing
+        writes.append(args)
+        time.sleep(0.1)
+        return write_delete_table(*args)
+
+    monkeypatch.setattr(spelling_corrector_module, "write_delete_table", slow_write)
+    correctors = [SpellingCorrector(vocabulary=VOCABULARY, table_path=table_path) for _ in range(4)]
+
+    threads = [threading.Thread(target=corrector.load_table) for corrector in correctors]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(writes) == 1
+    assert all(isinstance(corrector.table, DeleteTable) for corrector in correctors)
+    assert all(corrector.correction("comedan") == "comedian" for corrector in correctors)
+
+def test_default_table_path_is_read_when_the_corrector_is_created(spelling_table_path):
+    """The conftest fixture moves the full dictionary's table out of the repo tree."""
+    assert SpellingCorrector().table_path == spelling_table_path
+    assert SpellingCorrector(vocabulary=VOCABULARY).table_path is None
@@ -0,0 +1,88 @@
+import pytest
+import json
+from ..services.Indexer import Indexer
+from ...shared_utils.services.DataPreprocessor import DataPreprocessor
+from ...shared_utils.services.SynonymTable import SynonymTable, build_synonym_table, terms_version, wordnet_synonyms
+
+POSTING = {"id": "1", "humor_type": "2", "emoji_presence": False, "humor_type_score": 0.9, "weight": 1.0986}
+
+LEMMAS = {
+    "comedian": {"comic": 1.0, "comedians": 1.0, "clown": 0.5, "funnyman": 0.5, "buffoon": 0.3333},
+    "bear": {"endure": 0.5, "stand": 0.3333},
+    "clown": {"buffoon": 1.0, "comedian": 0.5},
+}
+
+def synonyms_of(term):
+    return LEMMAS.get(term, {})
+
+def test_build_keeps_index_terms_only():
+    """Synonyms are mapped to index terms, deduplicated and bounded per term."""
+    terms = ["comedian", "comic", "clown", "buffoon", "bear"]
+    to_terms = lambda words: [word.rstrip("s") for word in words]
+
+    table = build_synonym_table(terms, to_terms, max_expansions=2, synonyms_of=synonyms_of)
+
+    assert table == {
+        "comedian": [["comic", 1.0], ["clown", 0.5]],
+        "clown": [["buffoon", 1.0], ["comedian", 0.5]],
+    }
+
+def test_table_loads_lazily(tmp_path):
+    path = SynonymTable.write({"comedian": [["comic", 1.0]]}, str(tmp_path / "synonym_table.json"))
+    table = SynonymTable(path)
+
+    assert table.table is None
+    assert table.get("comedian") == {"comic": 1.0}
+    assert table.get("bear") == {}
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "content_index.json"
+    path.write_text(json.dumps({"comedian": [POSTING]}))
+
+    with pytest.raises(ValueError):
+        SynonymTable(str(path)).load()
+
+def test_rejects_tables_of_other_indexes(tmp_path):
+    """A table only loads for the index terms it was built for."""
+    path = SynonymTable.write({"comedian": [["comic", 1.0]]}, str(tmp_path / "synonym_table.json"),
+                              index_version=terms_version(["comedian", "comic"]))
+
+    assert SynonymTable(path, terms_version(["comic", "comedian"])).get("comedian") == {"comic": 1.0}
+    with pytest.raises(ValueError, match="index version"):
+        SynonymTable(path, terms_version(["comedian", "comic", "clown"])).load()
+
+def test_query_expansion_uses_index_terms(tmp_path):
+    """Queries expand to weighted synonyms that all exist in the index."""
+    indexer = Indexer()
+    indexer.content_index.update({term: [POSTING] for term in ["comedian", "comic", "clown", "scarecrow"]})
+    path = indexer.write_synonym_table(str(tmp_path / "synonym_table.json"), synonyms_of=synonyms_of,
+                                       data_pp=DataPreprocessor())
+
+    result = indexer.query_preprocessor(path).preprocess("Why did the scarecrow become a comedian?")
+
+    assert result["expanded_tokens"] == ["become", "clown", "comedian", "comic", "scarecrow"]
+    assert result["term_weights"] == {"become": 0.222, "clown": 0.111, "comedian": 0.222, "comic": 0.222, "scarecrow": 0.222}
+
+    indexer.content_index["bear"] = [POSTING]
+    with pytest.raises(ValueError):
+        indexer.query_preprocessor(path).preprocess("comedian")
+
+def test_expansion_without_a_table_path_uses_wordnet():
+    """The default never reads a table file, whether or not one was built."""
+    assert DataPreprocessor().synonym_table is None
+
+def test_weigh_term_with_weights():
+    data_preprocessor = DataPreprocessor()
+
+    assert data_preprocessor.weigh_term(["bear", "bear", "teeth"]) == {"bear": 0.667, "teeth": 0.333}
+    assert data_preprocessor.weigh_term(["bear", "endure"], {"endure": 0.5}) == {"bear": 0.667, "endure": 0.333}
+
+def test_wordnet_synonyms():
+    """Lemmas of a word's more common senses weigh more."""
+    try:
+        synonyms = wordnet_synonyms("comedian")
+    except LookupError:
+        pytest.skip("WordNet data is not installed")
+
+    assert synonyms["comic"] == 1.0
+    assert all("_" not in synonym for synonym in synonyms)
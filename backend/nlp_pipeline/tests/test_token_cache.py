@@ -0,0 +1,57 @@
+from ...shared_utils.services.DataPreprocessor import DataPreprocessor
+from ...shared_utils.services.TokenCache import TokenCache, pipeline_config_hash
+
+TEXTS = [
+    "Why did the Scarecrow become a Comedian? He's outstanding!",
+    "The scarecrow was outstandng in his field.",
+    "!!! ???",
+    "ሰላም፡ዓለም 😂",
+]
+
+def test_entries_persist_across_opens(tmp_path):
+    path = str(tmp_path / "token_cache.sqlite")
+    cache = TokenCache(path, config="v1")
+    cache.put_many({"Bears!": ("bears", "bears", "bears", "bear"), "the": ("the", None, None, None)})
+    cache.close()
+
+    reopened = TokenCache(path, config="v1")
+    assert reopened.get_many(["Bears!", "the", "comedian"]) == {
+        "Bears!": ("bears", "bears", "bears", "bear"),
+        "the": ("the", None, None, None),
+    }
+
+def test_config_change_empties_cache(tmp_path):
+    """Entries filled under another pipeline config are never served."""
+    path = str(tmp_path / "token_cache.sqlite")
+    TokenCache(path, config="v1").put_many({"bear": ("bear", "bear", "bear", "bear")})
+
+    assert len(TokenCache(path, config="v2")) == 0
+
+def test_config_hash_follows_resources(tmp_path):
+    """Editing the stop words or base words changes the config hash."""
+    stopwords = tmp_path / "stopwords_en.txt"
+    base_words = tmp_path / "base_words.txt"
+    stopwords.write_text("the\na\n")
+    base_words.write_text("bear\n")
+    original = pipeline_config_hash(str(stopwords), str(base_words))
+
+    assert pipeline_config_hash(str(stopwords), str(base_words)) == original
+    stopwords.write_text("the\na\nan\n")
+    assert pipeline_config_hash(str(stopwords), str(base_words)) != original
+    assert pipeline_config_hash(str(stopwords), str(base_words), spelling_vocabulary=["bear"]) != pipeline_config_hash(str(stopwords), str(base_words))
+
+def test_cached_preprocessing_skips_the_pipeline(tmp_path, monkeypatch):
+    """A second run over the same tokens reads every stage from the cache."""
+    path = str(tmp_path / "token_cache.sqlite")
+    expected = DataPreprocessor().stem_many(TEXTS)
+    assert DataPreprocessor(token_cache_path=path).stem_many(TEXTS) == expected
+
+    warm = DataPreprocessor(token_cache_path=path)
+    stemmed = []
+    stemmer = warm.get_stemmer()
+    stem = stemmer.stem
+    monkeypatch.setattr(stemmer, "stem", lambda token: stemmed.append(token) or stem(token))
+
+    assert warm.stem_many(TEXTS) == expected
+    assert warm.spell_checker is None
+    assert stemmed == []
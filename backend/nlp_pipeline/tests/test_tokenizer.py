@@ -0,0 +1,53 @@
+import pytest
+from ...shared_utils.services.DataPreprocessor import DataPreprocessor
+from ...shared_utils.services.Tokenizer import benchmark, has_emoji, is_emoji, is_ethiopic, normalize, per_text_pipeline, scan
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            "Why did the Scarecrow become a Comedian? He's outstanding!",
+            ["why", "did", "the", "scarecrow", "become", "a", "comedian", "he's", "outstanding"]
+        ),
+        ("The meeting is at 2.30 PM...it’s late", ["the", "meeting", "is", "at", "2.30", "pm", "it's", "late"]),
+        ("Gummy bear!😂😂 👍🏽", ["gummy", "bear", "😂", "😂", "👍🏽"]),
+        ("👨‍👩‍👧 🇪🇹", ["👨‍👩‍👧", "🇪🇹"]),
+        ("ሰላም፡ዓለም። ፲፪ ቤት", ["ሰላም", "ዓለም", "፲፪", "ቤት"]),
+        ("!!! ???", []),
+    ]
+)
+def test_scan(text, expected):
+    """Words are lowercased without punctuation, emojis and Ge'ez words are tokens of their own."""
+    assert scan(text) == expected
+
+def test_token_kinds():
+    assert is_emoji("👍🏽") and not is_emoji("bear")
+    assert is_ethiopic("ሰላም") and not is_ethiopic("bear")
+    assert has_emoji("Gummy bear!😂") and not has_emoji("Gummy bear!")
+
+def test_normalize():
+    """Punctuation the scanner keeps inside tokens goes in one pass; emptied tokens stay in place."""
+    assert normalize(["he's", "2.30", "bear", "'", "ሰላም", "😂"]) == ["hes", "230", "bear", "", "ሰላም", "😂"]
+    assert normalize([]) == []
+
+def test_punctuation_glued_stop_words_are_removed():
+    """Stop words followed by punctuation were kept by the split-based chain."""
+    preprocessor = DataPreprocessor(spelling_vocabulary=["bear"])
+
+    assert per_text_pipeline(preprocessor, "It's the bear, it's.") == ["bear", "its"]
+    assert preprocessor.stem_many(["It's the bear, it's."])[0]["stemmed_tokens"] == ["bear"]
+
+def test_emojis_and_geez_pass_through_the_pipeline():
+    """Emojis and Ge'ez words become terms unchanged and emojis set emoji_presence."""
+    result = DataPreprocessor().stem_many(["ሰላም፡ዓለም 😂 scarecrows"])[0]
+
+    assert result["stemmed_tokens"] == ["ሰላም", "ዓለም", "😂", "scarecrow"]
+    assert result["emoji_presence"] is True
+
+def test_benchmark_rows():
+    """The old per-text pipeline and stem_many stem the same tokens of plain text."""
+    preprocessor = DataPreprocessor(spelling_vocabulary=["scarecrow", "comedian"])
+    rows = benchmark(["Why did the scarecrow become a comedian"] * 10, preprocessor, repeat=1)
+
+    assert [row["pipeline"] for row in rows] == ["split + re.sub per text", "scan + stem_many"]
+    assert [row["tokens"] for row in rows] == [30, 30]
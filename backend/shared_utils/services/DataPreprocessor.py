@@ -1,8 +1,6 @@
 import logging
-import re
 from collections import Counter
 import traceback
-from spellchecker import SpellChecker
 from nltk.corpus import wordnet
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
@@ -13,6 +11,10 @@ from backend.search_engine.models.UserQuery import UserQuery as UserQuery
 from google.cloud.firestore_v1.base_query import FieldFilter
 from fastapi.middleware.cors import CORSMiddleware
 from .CustomStemmer import CustomPorterStemmer as CustomStemmer
+from .SpellingCorrector import SpellingCorrector
+from .TokenCache import TokenCache, pipeline_config_hash
+from .Tokenizer import is_emoji, is_ethiopic, normalize, scan
+from .SynonymTable import SynonymTable
 from nltk.corpus import words
 
 
@@ -33,33 +35,32 @@ from nltk.corpus import words
 
 # === DataPreprocessor Class 
 class DataPreprocessor:
-    def __init__(self):
+    def __init__(self, spelling_vocabulary=None, token_cache_path=None, synonym_table_path=None, index_version=None):
         # Stop words are loaded once for efficiency
         with open('stopwords_en.txt') as f:
             self.stop_words = set(word.strip().lower() for word in f)
+        # The spell checker and stemmer load large dictionaries, so they are
+        # created on first use and then reused for every call. Corrections can
+        # be restricted to a vocabulary such as the words of the indexed content
+        self.spelling_vocabulary = spelling_vocabulary
+        self.spell_checker = None
+        self.stemmer = None
+        # Batch preprocessing can reuse per-token results stored on disk by earlier runs
+        self.token_cache = None
+        if token_cache_path:
+            self.token_cache = TokenCache(token_cache_path, pipeline_config_hash(spelling_vocabulary=spelling_vocabulary))
+        # Synonyms come from the precomputed table of index terms when a path
+        # is given, see Indexer.query_preprocessor, and from WordNet otherwise.
+        # The table must have been built for the index with index_version
+        self.synonym_table = SynonymTable(synonym_table_path, index_version) if synonym_table_path else None
 
     # This function does the entire preprocessing pipeline
     def preprocess(self, text: str) -> dict:
         try:
             logging.info("Preprocessing started on: " + text)
 
-            tokens = self.tokenize(text)
-            corrected = self.correct_spelling(tokens)
-            filtered = self.remove_stop_words(corrected)
-            normalized = self.normalize(filtered)
-            stemmed = self.stem_tokens(normalized)
-            expanded = self.expand_synonyms(stemmed)
-            weights = self.weigh_term(expanded)
-
-            result = {
-                "tokens": tokens,   
-                "corrected_tokens": corrected,
-                "filtered_tokens": filtered,
-                "normalized_tokens": normalized,
-                "stemmed_tokens": stemmed,
-                "expanded_tokens": expanded,
-                "term_weights": weights,
-            }
+            result = self.preprocess_many([text])[0]
+
             log_output = "Processed Results:\n"
             for key, value in result.items():
                 log_output += f"{key}: {value}\n\n"
@@ -72,6 +73,107 @@ class DataPreprocessor:
             logging.error(f"[DataPreprocessor.{failed_function}] Error: {str(e)}")
             raise e
 
+    # This function runs the same pipeline over a batch of texts
+    def preprocess_many(self, texts) -> list:
+        """
+        Preprocesses a batch of texts and returns one result per text, equal
+        to what preprocess returns for it. Spelling correction, normalization,
+        stemming and synonym expansion run once per distinct token of the
+        batch rather than once per occurrence. Synonyms are weighted by their
+        similarity to the term they expand.
+        """
+        try:
+            logging.info(f"Batch preprocessing started on {len(texts)} texts")
+
+            results = self.stem_many(texts)
+            synonyms = {}
+            for result in results:
+                tokens = [token for token in result["stemmed_tokens"] if isinstance(token, str) and token]
+                weights = {}
+                for token in tokens:
+                    if token not in synonyms:
+                        synonyms[token] = self.synonyms_of(token)
+                    for synonym, weight in synonyms[token].items():
+                        weights[synonym] = max(weight, weights.get(synonym, 0.0))
+                # The terms themselves always count in full
+                weights.update((token, 1.0) for token in tokens)
+                expanded = sorted(weights)
+                result["expanded_tokens"] = expanded
+                result["term_weights"] = self.weigh_term(expanded, weights)
+
+            logging.info(f"Batch preprocessing finished on {len(texts)} texts with {len(synonyms)} distinct terms")
+            return results
+
+        except Exception as e:
+            tb = traceback.extract_tb(e.__traceback__)
+            failed_function = tb[-1].name
+            logging.error(f"[DataPreprocessor.{failed_function}] Error: {str(e)}")
+            raise e
+
+    def stem_many(self, texts) -> list:
+        """
+        Runs tokenization through stemming over a batch of texts. Texts are
+        split by the single-pass scanner, each distinct token goes through the
+        remaining stages once, see token_stages, and the results are mapped
+        back to every text. Emojis found by the scanner set emoji_presence.
+        """
+        token_lists = [scan(text) for text in texts]
+        stages = self.token_stages(list(dict.fromkeys(token for tokens in token_lists for token in tokens)))
+
+        results = []
+        for tokens in token_lists:
+            kept = [stages[token] for token in tokens if stages[token][1] is not None]
+            filtered = [stage[1] for stage in kept]
+            normalized = [stage[2] for stage in kept if stage[2]]
+            stemmed = [stage[3] for stage in kept if stage[2]]
+            if not normalized:
+                # Like normalize, keep the filtered tokens when none survive normalization
+                normalized = filtered
+                stemmed = self.stem_tokens(filtered)
+            results.append({
+                "tokens": tokens,
+                "corrected_tokens": [stages[token][0] for token in tokens],
+                "filtered_tokens": filtered,
+                "normalized_tokens": normalized,
+                "stemmed_tokens": stemmed,
+                "emoji_presence": any(is_emoji(token) for token in tokens),
+            })
+        return results
+
+    def token_stages(self, tokens) -> dict:
+        """
+        Returns {token: (corrected, filtered, normalized, stem)} for distinct
+        scanned tokens. filtered is None for stop words and stem is None when
+        nothing is left after normalization. Emojis and Ge'ez words pass
+        through unchanged, since the English dictionary, stop words and stemmer
+        do not apply to them. Tokens found in the token cache skip the
+        pipeline, and the rest are added to it.
+        """
+        stages = self.token_cache.get_many(tokens) if self.token_cache is not None else {}
+        missing = [token for token in tokens if token not in stages]
+        if not missing:
+            return stages
+
+        computed = {token: (token, token, token, token) for token in missing if is_emoji(token) or is_ethiopic(token)}
+        missing = [token for token in missing if token not in computed]
+        for token, corrected in zip(missing, self.correct_spelling(missing)):
+            filtered = corrected.lower()
+            computed[token] = (corrected, None if filtered in self.stop_words else filtered, None, None)
+        kept = [token for token in missing if computed[token][1] is not None]
+        for token, normalized in zip(kept, normalize([computed[token][1] for token in kept])):
+            computed[token] = computed[token][:2] + (normalized, None)
+
+        unique_normalized = list(dict.fromkeys(computed[token][2] for token in missing if computed[token][2]))
+        stems = dict(zip(unique_normalized, self.stem_tokens(unique_normalized)))
+        for token in missing:
+            corrected, filtered, normalized, _ = computed[token]
+            computed[token] = (corrected, filtered, normalized, stems.get(normalized))
+
+        if self.token_cache is not None:
+            self.token_cache.put_many(computed)
+        stages.update(computed)
+        return stages
+
     # A function that creates a UserQuery object after preprocessing the text
     def process_query(self, original_text: str, translated_text: str, language: str, user_id: str) -> str: 
         """ Preprocesses the original text, creates a UserQuery if not exists, otherwise reuses existing. 
@@ -132,40 +234,41 @@ class DataPreprocessor:
     # --- Individual Processing Functions ---
 
     def tokenize(self, text: str):
-        return text.split()
+        return scan(text)
 
     def normalize(self, tokens):
         """
-        Converts tokens to lowercase, strips whitespace, and removes punctuation.
-        Skips tokens that are None, empty, or not strings.
+        Converts tokens to lowercase and removes punctuation, the way the
+        scanner and token_stages do. Skips tokens that are None, empty, or not
+        strings.
         """
         if not isinstance(tokens, list):
             return tokens
 
-        normalized = []
-        for token in tokens:
-            if isinstance(token, str):
-                # Lowercase, strip spaces, remove non-word characters (punctuation)
-                clean = re.sub(r'[^\w\s]', '', token.lower().strip())
-                if clean:
-                    normalized.append(clean)
+        normalized = [token for token in normalize(scan(' '.join(t for t in tokens if isinstance(t, str)))) if token]
         return normalized if normalized else tokens
 
     def remove_stop_words(self, tokens):
         tokens = [token.lower() if isinstance(token, str) else token for token in tokens]
         return [token for token in tokens if token not in self.stop_words]
 
+    def get_spell_checker(self):
+        if self.spell_checker is None:
+            self.spell_checker = SpellingCorrector(vocabulary=self.spelling_vocabulary)
+        return self.spell_checker
+
+    def get_stemmer(self):
+        if self.stemmer is None:
+            self.stemmer = CustomStemmer()
+        return self.stemmer
+
     def correct_spelling(self, tokens):
-        spell = SpellChecker()
+        spell = self.get_spell_checker()
         if not tokens:
             return tokens  # Return tokens if input is empty or None
 
-        corrected = []
-        for token in tokens:
-            correction = spell.correction(token)
-            corrected.append(correction if correction else token)  # Use original token if no correction is found
-
-        return corrected
+        # Known words return unchanged and the original token is kept when no correction is found
+        return spell.correct(tokens)
     
     def stem_tokens(self, tokens):
         if not tokens:
@@ -173,7 +276,7 @@ class DataPreprocessor:
 
         try:
             valid_tokens = [token for token in tokens if token is not None]
-            stemmer = CustomStemmer()
+            stemmer = self.get_stemmer()
             stemmed = [stemmer.stem(token) for token in valid_tokens]
             return stemmed if stemmed else tokens
 
@@ -189,27 +292,35 @@ class DataPreprocessor:
         expanded = set(tokens)  # Use set to avoid duplicates
 
         for token in tokens:
-            try:
-                synonyms = set()
-                for syn in wordnet.synsets(token):
-                    for lemma in syn.lemmas():
-                        synonym = lemma.name().lower().replace('_', ' ')
-                        synonyms.add(synonym)
-
-                new_synonyms = synonyms - expanded  # Only add new ones
-                expanded.update(new_synonyms)
-
-            except Exception as e:
-                logging.warning(f"Synonym expansion error for token '{token}': {e}")
-                continue
+            expanded.update(self.synonyms_of(token))
 
         return sorted(expanded)
 
-    def weigh_term(self, tokens):
+    def synonyms_of(self, token: str) -> dict:
+        """
+        Returns {synonym: similarity weight} for a stemmed token. With a synonym
+        table this is a lookup of at most a few index terms; without one every
+        WordNet lemma of the token counts in full.
+        """
+        if self.synonym_table is not None:
+            return self.synonym_table.get(token)
+        try:
+            synonyms = {}
+            for syn in wordnet.synsets(token):
+                for lemma in syn.lemmas():
+                    synonyms[lemma.name().lower().replace('_', ' ')] = 1.0
+            return synonyms
+        except Exception as e:
+            logging.warning(f"Synonym expansion error for token '{token}': {e}")
+            return {}
+
+    def weigh_term(self, tokens, weights=None):
         if not tokens:
             return tokens
 
-        counts = Counter(tokens)
+        # Each occurrence counts with its token's weight, 1 unless given
+        weights = weights or {}
+        counts = {token: count * weights.get(token, 1.0) for token, count in Counter(tokens).items()}
         total = sum(counts.values())
 
         result = {token: round(count / total, 3) for token, count in counts.items()}
@@ -0,0 +1,325 @@
+import hashlib
+import mmap
+import os
+import string
+import struct
+import tempfile
+import unicodedata
+import zlib
+from array import array
+from functools import lru_cache
+from spellchecker import SpellChecker
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent builds are only kept apart by write_delete_table's rename
+    fcntl = None
+
+# The delete table of the full English dictionary is built once and mapped by
+# every process that needs corrections
+DELETES_TABLE_PATH = 'backend/nlp_pipeline/data/spelling_deletes.bin'
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+# Delete table file layout (little-endian): the header, an open-addressing
+# hash table of uint32 record offsets (0 marks an empty slot), then the
+# records, each a uint16 variant length, a uint32 word count, the UTF-8
+# variant and the uint32 numbers of the words it leads to
+DELETES_MAGIC = b"HDNSPL01"
+DELETES_HEADER = struct.Struct("<8s32sQ")
+SLOT = struct.Struct("<I")
+RECORD_HEADER = struct.Struct("<HI")
+LOAD_FACTOR = 0.7
+
+
+def deletes(word: str, distance: int = MAX_EDIT_DISTANCE):
+    """All strings obtained by deleting up to distance characters from word, word included."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+def within_one_edit(source: str, target: str):
+    """Whether one insert, delete, substitution or swap turns source into target, in linear time."""
+    if abs(len(source) - len(target)) > 1 or source == target:
+        return False
+    i = 0
+    for i, (source_char, target_char) in enumerate(zip(source, target)):
+        if source_char != target_char:
+            break
+    else:
+        return True  # The longer string has one extra character at the end
+    if len(source) < len(target):
+        return source[i:] == target[i + 1:]
+    if len(source) > len(target):
+        return source[i + 1:] == target[i:]
+    return source[i + 1:] == target[i + 1:] or (
+        source[i + 1:i + 2] == target[i:i + 1] and source[i:i + 1] == target[i + 1:i + 2] and source[i + 2:] == target[i + 2:]
+    )
+
+
+def edit_distance(source: str, target: str, max_distance: int = None):
+    """Damerau-Levenshtein distance with unrestricted adjacent transpositions.
+
+    This is the number of single-character inserts, deletes, substitutions and
+    swaps needed to turn source into target, the same distance pyspellchecker
+    explores by applying one edit after another. With max_distance set, the
+    computation stops early and returns max_distance + 1 for anything farther.
+    """
+    infinity = len(source) + len(target)
+    rows = [[infinity] * (len(target) + 2)]
+    rows += [[infinity, i] + [0] * len(target) for i in range(len(source) + 1)]
+    rows[1][2:] = range(1, len(target) + 1)
+    last_row = {}
+    for i in range(1, len(source) + 1):
+        last_match = 0
+        for j in range(1, len(target) + 1):
+            i_prev, j_prev = last_row.get(target[j - 1], 0), last_match
+            cost = 1
+            if source[i - 1] == target[j - 1]:
+                cost = 0
+                last_match = j
+            rows[i + 1][j + 1] = min(
+                rows[i][j] + cost,
+                rows[i + 1][j] + 1,
+                rows[i][j + 1] + 1,
+                rows[i_prev][j_prev] + (i - i_prev - 1) + 1 + (j - j_prev - 1),
+            )
+        last_row[source[i - 1]] = i
+        # No row ends below the smallest value of the row before it
+        if max_distance is not None and min(rows[i + 1][1:]) > max_distance:
+            return max_distance + 1
+    distance = rows[len(source) + 1][len(target) + 1]
+    return distance if max_distance is None else min(distance, max_distance + 1)
+
+
+def is_delete_table(path):
+    """Return True if the file at path starts with the delete table magic."""
+    with open(path, 'rb') as f:
+        return f.read(len(DELETES_MAGIC)) == DELETES_MAGIC
+
+
+def write_delete_table(numbers, key, output_path):
+    """Write variant -> word numbers as a delete table file.
+
+    Workers building the table at the same time each replace the file whole,
+    so a reader never maps a partly written table.
+
+    Args:
+        numbers (dict): variant -> list of word numbers.
+        key (bytes): Digest of the words and prefix length the table was built from.
+        output_path (str): Where the table is written.
+    """
+    slot_count = max(1, int(len(numbers) / LOAD_FACTOR) + 1)
+    slots = array('I', bytes(SLOT.size * slot_count))
+    records = bytearray(1)  # Offset 0 marks an empty slot
+    for variant, word_numbers in numbers.items():
+        encoded = variant.encode('utf-8')
+        slot = zlib.crc32(encoded) % slot_count
+        while slots[slot]:
+            slot = (slot + 1) % slot_count
+        slots[slot] = len(records)
+        records.extend(RECORD_HEADER.pack(len(encoded), len(word_numbers)))
+        records.extend(encoded)
+        records.extend(array('I', word_numbers).tobytes())
+
+    directory = os.path.dirname(output_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as f:
+        f.write(DELETES_HEADER.pack(DELETES_MAGIC, key, slot_count))
+        f.write(slots.tobytes())
+        f.write(records)
+    os.replace(f.name, output_path)
+    return output_path
+
+
+class DeleteTable:
+    """Read-only, memory-mapped delete table written by write_delete_table.
+
+    Opening the file only reads the header and a lookup hashes the variant
+    into the mapped slots, so every process that opens the table shares its
+    pages through the OS cache instead of loading a copy of its own.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.key, self.slot_count = DELETES_HEADER.unpack_from(self._mmap, 0)
+        if magic != DELETES_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a spelling delete table")
+        self._slots_offset = DELETES_HEADER.size
+        self._records_offset = self._slots_offset + SLOT.size * self.slot_count
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def get(self, variant, default=None):
+        """Return the numbers of the words variant leads to, or default."""
+        encoded = variant.encode('utf-8')
+        slot = zlib.crc32(encoded) % self.slot_count
+        while True:
+            (offset,) = SLOT.unpack_from(self._mmap, self._slots_offset + SLOT.size * slot)
+            if not offset:
+                return default
+            position = self._records_offset + offset
+            length, count = RECORD_HEADER.unpack_from(self._mmap, position)
+            position += RECORD_HEADER.size
+            if self._mmap[position:position + length] == encoded:
+                return struct.unpack_from(f"<{count}I", self._mmap, position + length)
+            slot = (slot + 1) % self.slot_count
+
+
+def remove_diacritics(word: str):
+    return ''.join(char for char in unicodedata.normalize('NFKD', word) if not unicodedata.combining(char))
+
+
+class SpellingCorrector:
+    """Symmetric-delete spelling correction with the results of pyspellchecker.
+
+    Instead of generating every edit of a token and looking each one up, the
+    corrector precomputes which dictionary words lead to each string reachable
+    by up to two deletions from a word's prefix. A misspelled token's own
+    deletions then find every dictionary word within two edits in a handful of
+    lookups, and the few candidates are checked against the full edit
+    distance. Tokens that are already words return at once, and corrections
+    are memoized in a bounded LRU cache. A stored table is memory-mapped, so
+    the workers of a pool read one copy of it.
+
+    The candidate that wins is the one pyspellchecker would pick: the closest
+    words, those matching the token apart from accents first, then the most
+    frequent. Ties go to the alphabetically first word so every run and
+    process corrects the same way.
+    """
+
+    def __init__(self, vocabulary=None, table_path: str = None,
+                 cache_size: int = 100_000, prefix_length: int = PREFIX_LENGTH):
+        """
+        Args:
+            vocabulary (iterable, optional): Restrict corrections to these words,
+                for example the tokens of the indexed content. The delete table
+                of a restricted vocabulary is small and built in memory unless
+                a table_path of its own is given.
+            table_path (str, optional): Where the delete table is stored.
+                Defaults to DELETES_TABLE_PATH, looked up when the corrector
+                is created, for the full dictionary.
+            cache_size (int): Corrections kept in the LRU cache.
+            prefix_length (int): Characters of each word the deletes are taken
+                from; longer prefixes make the table larger and lookups cheaper.
+        """
+        word_frequency = SpellChecker().word_frequency
+        self.frequencies = word_frequency.dictionary
+        self.longest_word_length = word_frequency.longest_word_length
+        if vocabulary is not None:
+            words = {word.lower() for word in vocabulary if isinstance(word, str) and word}
+            self.frequencies = {word: self.frequencies.get(word, 1) for word in words}
+        elif table_path is None:
+            table_path = DELETES_TABLE_PATH
+        self.words = sorted(self.frequencies)
+        self.table_path = table_path
+        self.prefix_length = prefix_length
+        self.table = None
+        self.correction = lru_cache(maxsize=cache_size)(self._correction)
+
+    def load_table(self):
+        """Return the delete table, mapping it from disk or building it on first use.
+
+        The table maps each variant to the numbers of the words it leads to,
+        a DeleteTable when it is stored and a dict otherwise.
+        """
+        if self.table is not None:
+            return self.table
+        key = hashlib.sha256(f"{self.prefix_length}\n".encode('utf-8') + '\n'.join(self.words).encode('utf-8')).digest()
+        if not self.table_path:
+            self.table = {variant: array('I', word_numbers) for variant, word_numbers in self._numbers().items()}
+            return self.table
+
+        self.table = self._stored_table(key)
+        if self.table is None:
+            # The workers of a pool starting together all find the table
+            # missing; the first to take the lock builds it and the others
+            # then map the table it wrote
+            os.makedirs(os.path.dirname(self.table_path) or '.', exist_ok=True)
+            with open(self.table_path + '.lock', 'wb') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                self.table = self._stored_table(key)
+                if self.table is None:
+                    write_delete_table(self._numbers(), key, self.table_path)
+                    self.table = DeleteTable(self.table_path)
+        return self.table
+
+    def _stored_table(self, key):
+        """Map the table at table_path if it was built from the current words."""
+        if not (os.path.exists(self.table_path) and is_delete_table(self.table_path)):
+            return None
+        table = DeleteTable(self.table_path)
+        if table.key == key:
+            return table
+        table.close()
+        return None
+
+    def _numbers(self):
+        numbers = {}
+        for number, word in enumerate(self.words):
+            for variant in deletes(word[:self.prefix_length]):
+                numbers.setdefault(variant, []).append(number)
+        return numbers
+
+    def should_check(self, token: str):
+        """pyspellchecker leaves punctuation marks, numbers and overlong tokens alone."""
+        if len(token) == 1 and token in string.punctuation:
+            return False
+        if len(token) > self.longest_word_length + 3:
+            return False
+        if token.lower() in ('nan', 'inf', 'infinity'):
+            return True
+        try:
+            float(token)
+            return False
+        except ValueError:
+            return True
+
+    def candidates(self, token: str):
+        """Dictionary words within the smallest edit distance of token, up to two edits."""
+        word = token.lower()
+        table = self.load_table()
+        numbers = set()
+        for variant in deletes(word[:self.prefix_length]):
+            numbers.update(table.get(variant, ()))
+
+        # Cheap bounds first: every edit changes the length by at most one and
+        # adds or removes at most one letter on each side
+        letters = set(word)
+        nearby = [
+            candidate for candidate in (self.words[number] for number in numbers)
+            if abs(len(candidate) - len(word)) <= MAX_EDIT_DISTANCE
+            and len(letters.symmetric_difference(candidate)) <= 2 * MAX_EDIT_DISTANCE
+        ]
+        # Words one edit away win outright, and most misspellings have some
+        one_edit = [candidate for candidate in nearby if within_one_edit(word, candidate)]
+        if one_edit:
+            return one_edit
+        return [
+            candidate for candidate in nearby
+            if edit_distance(word, candidate, MAX_EDIT_DISTANCE) <= MAX_EDIT_DISTANCE
+        ]
+
+    def _correction(self, token: str):
+        if token.lower() in self.frequencies or not self.should_check(token):
+            return token
+        candidates = self.candidates(token)
+        if not candidates:
+            return token
+        unaccented = remove_diacritics(token)
+        preferred = [candidate for candidate in candidates if remove_diacritics(candidate) == unaccented]
+        return min(preferred or candidates, key=lambda candidate: (-self.frequencies[candidate], candidate))
+
+    def correct(self, tokens):
+        """Correct every token, keeping tokens that have no correction."""
+        return [self.correction(token) for token in tokens]
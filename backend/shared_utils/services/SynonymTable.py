@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+from nltk.corpus import wordnet
+
+# Written by Indexer.write_synonym_table next to the content index
+SYNONYM_TABLE_PATH = 'backend/nlp_pipeline/data/synonym_table.json'
+SYNONYM_FORMAT = 'synonyms-v1'
+MAX_EXPANSIONS = 5
+
+
+def terms_version(terms):
+    """Derive a version key from the set of index terms a synonym table is built for.
+
+    Expansions only ever name index terms, so a table stays valid exactly as
+    long as the index has the same terms.
+    """
+    digest = hashlib.sha256()
+    for term in sorted(terms):
+        digest.update(term.encode('utf-8') + b'\n')
+    return digest.hexdigest()[:16]
+
+
+def wordnet_synonyms(term: str):
+    """Single-word WordNet lemmas of term with a weight from the rank of their sense.
+
+    WordNet lists a word's senses from most to least common, so a lemma from
+    the first sense weighs 1.0, one from the second 0.5, and so on.
+
+    Returns:
+        dict: lemma -> weight, the best weight when a lemma is in several senses.
+    """
+    synonyms = {}
+    for rank, synset in enumerate(wordnet.synsets(term)):
+        weight = round(1.0 / (rank + 1), 4)
+        for lemma in synset.lemmas():
+            name = lemma.name().lower()
+            if '_' in name or '-' in name:
+                continue  # Phrases never match a single index term
+            synonyms[name] = max(weight, synonyms.get(name, 0.0))
+    return synonyms
+
+
+def build_synonym_table(terms, to_terms, max_expansions: int = MAX_EXPANSIONS, synonyms_of=wordnet_synonyms):
+    """Precompute the expansions of every index term.
+
+    Args:
+        terms (iterable): The terms of the content index.
+        to_terms (callable): Maps a list of words to the index term each one
+            preprocesses to, or None, so synonyms are stored as the stems the
+            index holds.
+        max_expansions (int): Synonyms kept per term, the highest weighted first.
+        synonyms_of (callable): term -> {synonym: weight}. Defaults to WordNet.
+
+    Returns:
+        dict: term -> [[synonym_term, weight], ...] for terms with synonyms in
+            the index.
+    """
+    terms = set(terms)
+    candidates = {}
+    for term in sorted(terms):
+        try:
+            candidates[term] = synonyms_of(term)
+        except LookupError as e:
+            raise RuntimeError(f"WordNet is needed to build the synonym table: {e}")
+
+    words = sorted({word for synonyms in candidates.values() for word in synonyms})
+    word_terms = dict(zip(words, to_terms(words)))
+
+    table = {}
+    for term, synonyms in candidates.items():
+        weights = {}
+        for word, weight in synonyms.items():
+            synonym = word_terms.get(word)
+            if synonym in terms and synonym != term:
+                weights[synonym] = max(weight, weights.get(synonym, 0.0))
+        best = sorted(weights.items(), key=lambda item: (-item[1], item[0]))[:max_expansions]
+        if best:
+            table[term] = [[synonym, weight] for synonym, weight in best]
+    return table
+
+
+class SynonymTable:
+    """Synonym expansions precomputed for the terms of the content index.
+
+    The table is read from its file on the first lookup, so processes that
+    never expand a query never pay for it, and a lookup is a dict access.
+    Every synonym is itself an index term, so expansion cannot add terms that
+    match nothing. The table records the terms_version of the index it was
+    built for and refuses to load for another one.
+    """
+
+    def __init__(self, path: str = SYNONYM_TABLE_PATH, index_version: str = None):
+        """
+        Args:
+            path (str): The table written by Indexer.write_synonym_table.
+            index_version (str, optional): terms_version of the index the
+                queries run against. Loading fails when the table was built
+                for other terms; None skips the check.
+        """
+        self.path = path
+        self.index_version = index_version
+        self.table = None
+
+    def load(self):
+        if self.table is None:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') != SYNONYM_FORMAT:
+                raise ValueError(f"{self.path} is not a {SYNONYM_FORMAT} synonym table")
+            if self.index_version is not None and data.get('index_version') != self.index_version:
+                raise ValueError(f"{self.path} was built for index version {data.get('index_version')}, "
+                                 f"not {self.index_version}; rebuild it with Indexer.write_synonym_table")
+            self.table = data['terms']
+            logging.info(f"Loaded synonyms for {len(self.table)} terms from {self.path}")
+        return self.table
+
+    def get(self, term: str):
+        """Return {synonym: weight} for term, empty when it has none."""
+        return dict(self.load().get(term, ()))
+
+    @staticmethod
+    def write(table, path: str = SYNONYM_TABLE_PATH, max_expansions: int = MAX_EXPANSIONS, index_version: str = None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'format': SYNONYM_FORMAT, 'index_version': index_version, 'max_expansions': max_expansions,
+                       'terms': table}, f, ensure_ascii=False, separators=(',', ':'))
+        return path
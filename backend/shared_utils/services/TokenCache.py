@@ -0,0 +1,97 @@
+import hashlib
+import os
+import sqlite3
+import spellchecker
+from . import suffix_rules
+
+# Cache shared by index builds. Bump PIPELINE_VERSION when a change to the
+# preprocessing code alters what a token turns into.
+TOKEN_CACHE_PATH = 'backend/nlp_pipeline/data/token_cache.sqlite'
+PIPELINE_VERSION = 2
+
+# SQLite limits the number of bound parameters in one statement
+LOOKUP_BATCH_SIZE = 500
+
+
+def pipeline_config_hash(stopwords_path: str = 'stopwords_en.txt', base_words_path: str = 'base_words.txt',
+                         spelling_vocabulary=None):
+    """Hash everything besides the code that decides what a raw token becomes.
+
+    That is the stop words, the stemmer's base words and suffix rules, the
+    spelling dictionary and any vocabulary corrections are restricted to.
+    """
+    digest = hashlib.sha256(f"{PIPELINE_VERSION}:{spellchecker.__version__}".encode('utf-8'))
+    for path in (stopwords_path, base_words_path):
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    rules = (suffix_rules.suffix_map_step2, suffix_rules.suffix_map_step3, suffix_rules.suffix_list_step4)
+    digest.update(repr(rules).encode('utf-8'))
+    if spelling_vocabulary is not None:
+        digest.update('\n'.join(sorted(set(spelling_vocabulary))).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class TokenCache:
+    """On-disk cache of what the preprocessing pipeline makes of each raw token.
+
+    Every row holds a raw token's spelling correction, its lowercased form
+    unless it is a stop word, its normalized form and its stem. The cache
+    records the pipeline config hash it was filled under and empties itself
+    when opened with a different one, so edits to the stop words, base words
+    or suffix rules never serve stale terms. SQLite's locking lets the workers
+    of an index build share one file.
+    """
+
+    def __init__(self, path: str = TOKEN_CACHE_PATH, config: str = None):
+        """
+        Args:
+            path (str): The SQLite file, created on first use.
+            config (str, optional): Pipeline config hash, see pipeline_config_hash.
+                Computed from the default resource files when omitted.
+        """
+        self.path = path
+        self.config = config or pipeline_config_hash()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=60)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                "token TEXT PRIMARY KEY, corrected TEXT, filtered TEXT, normalized TEXT, term TEXT)"
+            )
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+            if row is None or row[0] != self.config:
+                self.connection.execute("DELETE FROM tokens")
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('config', ?)", (self.config,))
+
+    def get_many(self, tokens):
+        """Return {token: (corrected, filtered, normalized, term)} for the cached tokens."""
+        tokens = list(tokens)
+        found = {}
+        for start in range(0, len(tokens), LOOKUP_BATCH_SIZE):
+            batch = tokens[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            for token, *stages in self.connection.execute(
+                f"SELECT token, corrected, filtered, normalized, term FROM tokens WHERE token IN ({placeholders})", batch
+            ):
+                found[token] = tuple(stages)
+        return found
+
+    def put_many(self, entries):
+        """Store {token: (corrected, filtered, normalized, term)} in one transaction.
+
+        filtered is None for stop words and term is None when nothing is left
+        to stem after normalization.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO tokens VALUES (?, ?, ?, ?, ?)",
+                [(token, *stages) for token, stages in entries.items()],
+            )
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,134 @@
+import re
+import string
+import time
+
+# Pictographs, symbols and regional indicator pairs, each optionally followed
+# by a variation selector or skin tone and joined into ZWJ sequences, so a
+# family or a flag stays one token
+_PICTOGRAPH = (
+    "[\u00A9\u00AE\u203C\u2049\u2122\u2139\u2194-\u2199\u21A9\u21AA\u231A\u231B\u2328\u23CF\u23E9-\u23F3"
+    "\u23F8-\u23FA\u24C2\u25AA\u25AB\u25B6\u25C0\u25FB-\u25FE\u2600-\u27BF\u2934\u2935\u2B05-\u2B07"
+    "\u2B1B\u2B1C\u2B50\u2B55\u3030\u303D\u3297\u3299\U0001F000-\U0001FAFF]"
+)
+_MODIFIERS = "[\uFE0F\U0001F3FB-\U0001F3FF]*"
+EMOJI = f"(?:[\U0001F1E6-\U0001F1FF]{{2}}|{_PICTOGRAPH}{_MODIFIERS}(?:\u200D{_PICTOGRAPH}{_MODIFIERS})*)"
+
+# Ge'ez (Fidel) syllables, combining marks and numerals, without the Ethiopic
+# wordspace and punctuation that separate Amharic words
+ETHIOPIC_LETTERS = "\u1200-\u135A\u135D-\u135F\u1369-\u137C\u1380-\u1399\u2D80-\u2DDE\uAB01-\uAB2E"
+ETHIOPIC_WORD = f"[{ETHIOPIC_LETTERS}]+"
+
+# Numbers keep their decimal points and words their inner apostrophes, so
+# contractions still match stop words
+NUMBER = r"\d+(?:[.,]\d+)*"
+WORD = r"[^\W_]+(?:'[^\W_]+)*"
+
+# One alternation scanned left to right; findall returns the tokens without
+# any per-token Python work
+TOKEN_PATTERN = re.compile(f"{EMOJI}|{ETHIOPIC_WORD}|{NUMBER}|{WORD}")
+EMOJI_PATTERN = re.compile(EMOJI)
+ETHIOPIC_PATTERN = re.compile(f"[{ETHIOPIC_LETTERS}]")
+
+# The only punctuation left inside scanned tokens is the apostrophes and
+# number separators the pattern keeps, plus whatever a spelling correction
+# brings back. Normalization deletes all ASCII punctuation but the underscore,
+# which is what the old per-token re.sub(r'[^\w\s]', '') removed from them
+NORMALIZE_TABLE = str.maketrans('', '', string.punctuation.replace('_', ''))
+
+
+def scan(text: str):
+    """Split text into lowercase words, numbers, Ge'ez words and emojis in one pass.
+
+    Punctuation, including Ethiopic word separators such as the wordspace and
+    full stop, ends a token and is dropped, and curly apostrophes become
+    straight ones. Emojis are returned as tokens of their own.
+
+    Returns:
+        list: The tokens in text order.
+    """
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(text.lower().replace('\u2019', "'"))
+
+
+def normalize(tokens):
+    """Remove the punctuation of every token in one pass over the whole list.
+
+    Apostrophes only go after stop word removal, since stop words such as
+    "he'll" and "we'll" would otherwise become "hell" and "well". The tokens
+    are joined and translated at once, so no regular expression or Python
+    loop runs per token. Tokens left empty are returned as ''.
+    """
+    if not tokens:
+        return []
+    return '\n'.join(tokens).translate(NORMALIZE_TABLE).split('\n')
+
+
+def is_emoji(token: str):
+    return EMOJI_PATTERN.fullmatch(token) is not None
+
+
+def is_ethiopic(token: str):
+    return ETHIOPIC_PATTERN.match(token) is not None
+
+
+def has_emoji(text: str):
+    """Whether text contains an emoji, for records without an emoji_presence column."""
+    return isinstance(text, str) and EMOJI_PATTERN.search(text) is not None
+
+
+def per_text_pipeline(preprocessor, text: str):
+    """The chain DataPreprocessor ran per text before the scanner, for benchmarking.
+
+    The text is split on whitespace, corrected, stripped of stop words,
+    normalized with a regular expression per token and stemmed.
+    """
+    filtered = preprocessor.remove_stop_words(preprocessor.correct_spelling(text.split()))
+    normalized = [re.sub(r'[^\w\s]', '', token.strip()) for token in filtered if isinstance(token, str)]
+    return preprocessor.stem_tokens([token for token in normalized if token] or filtered)
+
+
+def benchmark(texts, preprocessor, repeat: int = 5):
+    """Compare the old per-text pipeline with DataPreprocessor.stem_many on texts.
+
+    Both run once untimed first, so the spelling corrector's table and cache
+    are equally warm for each.
+
+    Args:
+        texts (list): The texts to preprocess.
+        preprocessor (DataPreprocessor): Without a token cache, so every
+            batch runs the whole pipeline.
+        repeat (int): Timed runs per pipeline; the best one is reported.
+
+    Returns:
+        list: One row per pipeline with its best time and stemmed tokens per second.
+    """
+    rows = []
+    for name, run in (
+        ('split + re.sub per text', lambda: [per_text_pipeline(preprocessor, text) for text in texts]),
+        ('scan + stem_many', lambda: [result['stemmed_tokens'] for result in preprocessor.stem_many(texts)]),
+    ):
+        token_count = sum(len(stemmed) for stemmed in run())
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        rows.append({
+            'pipeline': name,
+            'texts': len(texts),
+            'tokens': token_count,
+            'seconds': round(best, 4),
+            'tokens_per_second': round(token_count / best) if best else 0,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    import csv
+    from tabulate import tabulate
+    from backend.shared_utils.services.DataPreprocessor import DataPreprocessor
+    with open('backend/nlp_pipeline/data/classified_jokes.csv', 'r') as f:
+        texts = [row['text'] for row in csv.DictReader(f)]
+    rows = benchmark(texts, DataPreprocessor())
+    print(tabulate([list(row.values()) for row in rows], headers=list(rows[0].keys()), tablefmt="grid"))
@@ -4,6 +4,10 @@ import 'package:frontend/models/humor_profile.dart';
 import 'package:frontend/services/engine.dart';
 
 class QueryProfileMatcher {
+  // Postings read per term; pages are stored in descending weight order, so
+  // stopping here keeps the best-weighted content of common terms
+  static const int maxPostingsPerTerm = 2000;
+
   final FirebaseFirestore _firestore = FirebaseFirestore.instance;
 
   Future<List<Map<String, dynamic>>> matchQueryAndProfile({
@@ -41,24 +45,18 @@ class QueryProfileMatcher {
         (k, v) => MapEntry(k.toLowerCase(), (v as num).toDouble()),
       );
 
-      // Step 3: Get matching content IDs from index
-      final termDocs = await Future.wait(
-        termWeights.keys.map(
-          (term) => _firestore.collection('content_index').doc(term).get(),
-        ),
+      // Step 3: Get matching content IDs from the published index version
+      final indexCollection = await _indexCollection();
+      final termPostings = await Future.wait(
+        termWeights.keys.map((term) => _readTermPostings(indexCollection, term)),
       );
 
       List<String> matchedContentIds = [];
 
-      for (final doc in termDocs) {
-        if (doc.exists) {
-          final data = doc.data();
-          final List contentList = data?['content'] ?? [];
-
-          for (final item in contentList) {
-            if (item is Map && item['id'] != null) {
-              matchedContentIds.add(item['id']);
-            }
+      for (final postings in termPostings) {
+        for (final item in postings) {
+          if (item is Map && item['id'] != null) {
+            matchedContentIds.add(item['id']);
           }
         }
       }
@@ -110,6 +108,64 @@ class QueryProfileMatcher {
     }
   }
 
+  // The pointer document names the index version the backend published last;
+  // its collection never changes once written, so reads under it can be cached
+  Future<String> _indexCollection() async {
+    final pointer =
+        await _firestore.collection('index_meta').doc('content_index').get();
+    return pointer.data()?['collection'] ?? 'content_index';
+  }
+
+  // A term's head document holds its best page of postings plus page_count
+  // and page_max_weights; the remaining pages live under {term}/pages/{n}.
+  // Pages are read in order until maxPostingsPerTerm postings are collected
+  // or the next page's maximum weight falls below minWeight
+  Future<List> _readTermPostings(
+    String indexCollection,
+    String term, {
+    int maxPostings = maxPostingsPerTerm,
+    double minWeight = 0.0,
+  }) async {
+    final head = await _firestore.collection(indexCollection).doc(term).get();
+    if (!head.exists) return [];
+
+    final data = head.data() ?? {};
+    final postings = [..._pagePostings(data)];
+    final int pageCount = data['page_count'] ?? 1;
+    final List pageMaxWeights = data['page_max_weights'] ?? [];
+
+    for (var number = 1; number < pageCount; number++) {
+      if (postings.length >= maxPostings) break;
+      if (number < pageMaxWeights.length &&
+          (pageMaxWeights[number] as num).toDouble() < minWeight) {
+        break;
+      }
+      final page = await _firestore
+          .collection('$indexCollection/$term/pages')
+          .doc('$number')
+          .get();
+      if (page.exists) postings.addAll(_pagePostings(page.data() ?? {}));
+    }
+
+    return postings.length > maxPostings
+        ? postings.sublist(0, maxPostings)
+        : postings;
+  }
+
+  // Normalized pages hold [id, weight] pairs under 'postings' instead of
+  // full postings under 'content'; both come back as {'id', 'weight'} maps
+  List _pagePostings(Map<String, dynamic> data) {
+    final List? pairs = data['postings'];
+    if (pairs != null) {
+      return [
+        for (final pair in pairs)
+          if (pair is List && pair.length == 2)
+            {'id': pair[0], 'weight': pair[1]},
+      ];
+    }
+    return data['content'] ?? [];
+  }
+
   // double _scoreText(String text, Map<String, double> weights) {
   //   double score = 0.0;
   //   final lowerText = text.toLowerCase();